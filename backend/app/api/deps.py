@@ -1,16 +1,32 @@
-from collections.abc import Generator
+import uuid
+from collections.abc import AsyncGenerator, Generator
+from contextlib import asynccontextmanager
 from typing import Annotated
 
 import jwt
-from fastapi import Depends, HTTPException, status
+from fastapi import Depends, HTTPException, Request, status
+from fastapi.concurrency import run_in_threadpool
 from fastapi.security import OAuth2PasswordBearer
 from jwt.exceptions import InvalidTokenError
 from pydantic import ValidationError
+from sqlalchemy import Engine, inspect
+from sqlalchemy.ext.asyncio import AsyncEngine
+from sqlalchemy.orm import make_transient_to_detached
 from sqlmodel import Session
+from sqlmodel.ext.asyncio.session import AsyncSession
 
 from app.core import security
+from app.core.cache import user_cache
 from app.core.config import settings
-from app.core.db import engine
+from app.core.db import (
+    Database,
+    async_engine,
+    async_replica_engines,
+    engine,
+    replica_engines,
+)
+from app.core.replicas import replicas
+from app.core.revocation import token_revocations
 from app.models import TokenPayload, User
 
 reusable_oauth2 = OAuth2PasswordBearer(
@@ -23,9 +39,140 @@ def get_db() -> Generator[Session, None, None]:
         yield session
 
 
+@asynccontextmanager
+async def open_database(
+    bind: Engine, async_bind: AsyncEngine
+) -> AsyncGenerator[Database, None]:
+    if settings.DB_ASYNC:
+        async with AsyncSession(async_bind) as async_session:
+            yield Database(async_session)
+    else:
+        session = Session(bind)
+        try:
+            yield Database(session)
+        finally:
+            await run_in_threadpool(session.close)
+
+
+async def get_database() -> AsyncGenerator[Database, None]:
+    async with open_database(engine, async_engine) as db:
+        yield db
+
+
+def get_read_db(request: Request) -> Generator[Session, None, None]:
+    index = replicas.choose(request.headers.get("Authorization"))
+    with Session(engine if index is None else replica_engines[index]) as session:
+        yield session
+
+
+async def get_read_database(request: Request) -> AsyncGenerator[Database, None]:
+    index = None
+    if replicas.engines:
+        # Might have to check the replication lag
+        index = await run_in_threadpool(
+            replicas.choose, request.headers.get("Authorization")
+        )
+    if index is None:
+        binds = engine, async_engine
+    else:
+        binds = replica_engines[index], async_replica_engines[index]
+    async with open_database(*binds) as db:
+        yield db
+
+
 SessionDep = Annotated[Session, Depends(get_db)]
+DatabaseDep = Annotated[Database, Depends(get_database)]
+# Sessions for read-only work, on a read replica when there is one
+ReadSessionDep = Annotated[Session, Depends(get_read_db)]
+ReadDatabaseDep = Annotated[Database, Depends(get_read_database)]
 TokenDep = Annotated[str, Depends(reusable_oauth2)]
 
+# Columns kept in the user cache, enough to authorize a request and to serve
+# UserPublic; anything else (e.g. hashed_password) is loaded on first access.
+# The token_version is cached too, to drop users whose tokens were revoked
+USER_CACHE_FIELDS = {
+    "id",
+    "email",
+    "is_active",
+    "is_superuser",
+    "full_name",
+    "created_at",
+}
+
+
+def get_user_by_subject(
+    *, session: Session, subject: str, fresh: bool = False
+) -> User | None:
+    """
+    The user `subject` refers to, from the user cache unless `fresh`, in which
+    case they're read from the database and the cache updated.
+    """
+    snapshot = None if fresh else user_cache.get(subject)
+    if snapshot is not None:
+        # Changes that matter for authorization (deactivating, demoting or
+        # deleting the user) revoke their tokens, the revocations of other
+        # workers show up in at most AUTH_REVOCATION_REFRESH_SECONDS
+        token_revocations.refresh(session)
+        if token_revocations.is_stale(subject, snapshot["token_version"]):
+            snapshot = None
+    if snapshot is not None:
+        cached_user = User(**{key: snapshot[key] for key in USER_CACHE_FIELDS})
+        # Attach the cached row as if it had just been loaded, without a SELECT
+        make_transient_to_detached(cached_user)
+        merged_user = session.merge(cached_user, load=False)
+        # The other columns hold the model's defaults, e.g. token_version=0
+        # would be written back incremented by crud.revoke_token_claims
+        session.expire(
+            merged_user,
+            [
+                key
+                for key in inspect(User).column_attrs.keys()
+                if key not in USER_CACHE_FIELDS
+            ],
+        )
+        return merged_user
+    user = session.get(User, subject)
+    if user:
+        user_cache.set(
+            subject, user.model_dump(include=USER_CACHE_FIELDS | {"token_version"})
+        )
+    return user
+
+
+# Columns set from the token claims with AUTH_TRUST_TOKEN_CLAIMS, the rest are
+# loaded on first access
+USER_CLAIM_FIELDS = {"id", "is_active", "is_superuser", "token_version"}
+
+
+def get_user_from_claims(*, session: Session, token_data: TokenPayload) -> User | None:
+    if (
+        token_data.sub is None
+        or token_data.ver is None
+        or token_data.is_active is None
+        or token_data.is_superuser is None
+    ):
+        return None
+    token_revocations.refresh(session)
+    if token_revocations.is_stale(token_data.sub, token_data.ver):
+        return None
+    claims_user = User(
+        id=uuid.UUID(token_data.sub),
+        is_active=token_data.is_active,
+        is_superuser=token_data.is_superuser,
+        token_version=token_data.ver,
+    )
+    make_transient_to_detached(claims_user)
+    user = session.merge(claims_user, load=False)
+    session.expire(
+        user,
+        [
+            key
+            for key in inspect(User).column_attrs.keys()
+            if key not in USER_CLAIM_FIELDS
+        ],
+    )
+    return user
+
 
 def get_current_user(session: SessionDep, token: TokenDep) -> User:
     try:
@@ -38,7 +185,20 @@ def get_current_user(session: SessionDep, token: TokenDep) -> User:
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Could not validate credentials",
         )
-    user = session.get(User, token_data.sub)
+    user = None
+    fresh = False
+    if settings.AUTH_TRUST_TOKEN_CLAIMS:
+        user = get_user_from_claims(session=session, token_data=token_data)
+        # The claims are stale because the user changed, e.g. was deactivated,
+        # which the user cache of this worker might not have seen yet
+        fresh = (
+            user is None
+            and token_data.sub is not None
+            and token_data.ver is not None
+            and token_revocations.is_stale(token_data.sub, token_data.ver)
+        )
+    if user is None and token_data.sub:
+        user = get_user_by_subject(session=session, subject=token_data.sub, fresh=fresh)
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
     if not user.is_active:
@@ -49,6 +209,14 @@ def get_current_user(session: SessionDep, token: TokenDep) -> User:
 CurrentUser = Annotated[User, Depends(get_current_user)]
 
 
+async def get_current_user_async(db: DatabaseDep, token: TokenDep) -> User:
+    return await db.run(get_current_user, token=token)
+
+
+# Same as CurrentUser for async routes, bound to DatabaseDep's session
+AsyncCurrentUser = Annotated[User, Depends(get_current_user_async)]
+
+
 def get_current_active_superuser(current_user: CurrentUser) -> User:
     if not current_user.is_superuser:
         raise HTTPException(
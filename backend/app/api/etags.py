@@ -0,0 +1,102 @@
+import hashlib
+import re
+import uuid
+from typing import Any
+
+from fastapi import Response
+from sqlmodel import Session, col, func, select
+
+from app.crud import DELETED_USERS_COUNTER
+from app.models import Counter, User
+
+# Entity tags of an If-Match or If-None-Match header, e.g. `W/"1", "2"`
+ETAG_PATTERN = re.compile(r'(W/)?("[^"]*")')
+
+NOT_MODIFIED: dict[int | str, dict[str, Any]] = {304: {"description": "Not Modified"}}
+
+
+def parse_etags(header: str) -> list[tuple[bool, str]]:
+    """
+    Tags of a conditional header as (weak, opaque tag) pairs, or a single strong
+    "*" tag for any representation.
+    """
+    if header.strip() == "*":
+        return [(False, "*")]
+    return [(bool(weak), tag) for weak, tag in ETAG_PATTERN.findall(header)]
+
+
+def none_match(header: str | None, etag: str) -> bool:
+    """
+    Whether an If-None-Match header lets the request through, i.e. the client
+    doesn't have `etag` yet. Uses the weak comparison.
+    """
+    if header is None:
+        return True
+    opaque = etag.removeprefix("W/")
+    return not any(tag in ("*", opaque) for _, tag in parse_etags(header))
+
+
+def not_modified(etag: str) -> Response:
+    return Response(status_code=304, headers={"ETag": etag})
+
+
+def item_etag(version: int) -> str:
+    # Strong, every version of an item has exactly one representation
+    return f'"{version}"'
+
+
+def item_versions(if_match: str) -> list[int] | None:
+    """
+    Item versions an If-Match header accepts, None for any. Uses the strong
+    comparison, so weak tags never match.
+    """
+    versions = []
+    for weak, tag in parse_etags(if_match):
+        if tag == "*":
+            return None
+        if not weak and tag[1:-1].isdecimal():
+            versions.append(int(tag[1:-1]))
+    return versions
+
+
+def items_etag(version: int) -> str:
+    return f'W/"{version}"'
+
+
+def get_items_version(*, session: Session, owner_id: uuid.UUID) -> int:
+    """
+    Change counter of the items of `owner_id`.
+    """
+    return session.exec(select(User.items_version).where(User.id == owner_id)).one()
+
+
+def get_items_etag(*, session: Session, owner_id: uuid.UUID | None) -> str:
+    """
+    Weak ETag of the items of `owner_id`, or of all items if None, read from
+    the change counters of their owners.
+    """
+    if owner_id is not None:
+        return items_etag(get_items_version(session=session, owner_id=owner_id))
+    # Every change raises the sum of the counters, except deleting a user, which
+    # raises the deleted users counter instead. Neither decreases in between,
+    # so an ETag is never given to two different sets of items
+    deleted = (
+        select(Counter.value)
+        .where(Counter.name == DELETED_USERS_COUNTER)
+        .scalar_subquery()
+    )
+    deleted_users, versions = session.exec(
+        select(
+            func.coalesce(deleted, 0),
+            func.coalesce(func.sum(col(User.items_version)), 0),
+        )
+    ).one()
+    return f'W/"{deleted_users}.{versions}"'
+
+
+def user_etag(content: bytes) -> str:
+    """
+    Weak ETag of a user from their public representation, for users loaded
+    anyway (e.g. from the user cache) that have no version of their own.
+    """
+    return f'W/"{hashlib.blake2b(content, digest_size=16).hexdigest()}"'
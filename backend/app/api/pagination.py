@@ -0,0 +1,184 @@
+import base64
+import json
+import uuid
+from collections.abc import Sequence
+from datetime import datetime
+from typing import Any, TypeVar
+
+from fastapi import HTTPException
+from sqlalchemy import ColumnElement, Row, Select, and_, or_, text
+from sqlalchemy.orm import Mapped
+from sqlmodel import Session, col, func, select
+
+from app.core.cache import TTLCache
+from app.core.config import CountMode, settings
+from app.models import Item, User
+
+S = TypeVar("S", bound=Select[Any])
+
+# Cursor pagination walks rows in the order of the (created_at DESC, id) indexes
+Paginated = Item | User
+
+
+def _encode(data: dict[str, Any]) -> str:
+    return base64.urlsafe_b64encode(json.dumps(data).encode()).decode()
+
+
+def _decode(cursor: str) -> dict[str, Any]:
+    try:
+        data = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    if not isinstance(data, dict):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return data
+
+
+def encode_cursor(row: Paginated | Row[Any]) -> str:
+    return _encode(
+        {
+            "created_at": row.created_at.isoformat() if row.created_at else None,
+            "id": str(row.id),
+        }
+    )
+
+
+def decode_cursor(cursor: str) -> tuple[datetime | None, uuid.UUID]:
+    data = _decode(cursor)
+    try:
+        created_at = data["created_at"]
+        return (
+            datetime.fromisoformat(created_at) if created_at else None,
+            uuid.UUID(data["id"]),
+        )
+    except (ValueError, KeyError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def encode_rank_cursor(rank: float, id: uuid.UUID) -> str:
+    return _encode({"rank": rank, "id": str(id)})
+
+
+def decode_rank_cursor(cursor: str) -> tuple[float, uuid.UUID]:
+    data = _decode(cursor)
+    try:
+        return float(data["rank"]), uuid.UUID(data["id"])
+    except (ValueError, KeyError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def paginate(
+    statement: S,
+    model: type[Paginated],
+    *,
+    cursor: str | None,
+    skip: int,
+    limit: int,
+) -> S:
+    """
+    Order by newest first and return one page, starting after `cursor` when given
+    or at `skip` otherwise.
+    """
+    created_at = col(model.created_at)
+    id_ = col(model.id)
+    statement = statement.order_by(created_at.desc(), id_)
+    if cursor is None:
+        return statement.offset(skip).limit(limit)
+    cursor_created_at, cursor_id = decode_cursor(cursor)
+    # Rows without created_at sort first, as Postgres puts NULLs first in DESC
+    condition: Any
+    if cursor_created_at is None:
+        condition = or_(
+            and_(created_at.is_(None), id_ > cursor_id), created_at.is_not(None)
+        )
+    else:
+        condition = or_(
+            created_at < cursor_created_at,
+            and_(created_at == cursor_created_at, id_ > cursor_id),
+        )
+    return statement.where(condition).limit(limit)
+
+
+def paginate_ranked(
+    statement: S,
+    rank: ColumnElement[float],
+    id_: Mapped[uuid.UUID],
+    *,
+    cursor: str | None,
+    limit: int,
+) -> S:
+    """
+    Order by `rank`, highest first, and return one page, starting after `cursor`
+    when given.
+    """
+    statement = statement.order_by(rank.desc(), id_)
+    if cursor is not None:
+        cursor_rank, cursor_id = decode_rank_cursor(cursor)
+        statement = statement.where(
+            or_(rank < cursor_rank, and_(rank == cursor_rank, id_ > cursor_id))
+        )
+    return statement.limit(limit)
+
+
+def next_cursor(rows: Sequence[Paginated | Row[Any]], limit: int) -> str | None:
+    """
+    Cursor of the page after `rows`, or None if it was the last one.
+    """
+    if not rows or len(rows) < limit:
+        return None
+    return encode_cursor(rows[-1])
+
+
+# Exact counts keyed by the version of the rows, the compiled statement and its
+# parameters
+count_cache: TTLCache[tuple[str | None, str, tuple[Any, ...]], int] = TTLCache(
+    maxsize=10_000, ttl=settings.LIST_COUNT_CACHE_SECONDS
+)
+
+
+def count_rows(
+    session: Session,
+    statement: Select[Any],
+    *,
+    mode: CountMode,
+    version: str | None = None,
+) -> int | None:
+    """
+    Count the rows matched by `statement`.
+
+    "exact" runs COUNT(*) and caches the result briefly, "estimated" uses the
+    planner statistics (pg_class.reltuples for a whole table, the EXPLAIN row
+    estimate otherwise) and "none" skips counting.
+
+    Pass the ETag the count is sent with as `version`, so that an exact count
+    cached before the rows changed isn't sent with the ETag of the changed rows.
+    """
+    if mode == "none":
+        return None
+    compiled = statement.compile(dialect=session.get_bind().dialect)
+    if mode == "estimated":
+        if statement.whereclause is None:
+            (table,) = statement.get_final_froms()
+            estimate = session.execute(
+                text(
+                    "SELECT reltuples FROM pg_class WHERE oid = CAST(:table AS regclass)"
+                ),
+                {"table": f'"{table.name}"'},  # type: ignore[attr-defined]
+            ).scalar_one()
+        else:
+            plan = (
+                session.connection()
+                .exec_driver_sql(f"EXPLAIN (FORMAT JSON) {compiled}", compiled.params)
+                .scalar_one()
+            )
+            estimate = plan[0]["Plan"]["Plan Rows"]
+        # reltuples is -1 for tables that were never vacuumed or analyzed
+        if estimate >= 0:
+            return int(estimate)
+    key = (version, str(compiled), tuple(compiled.params.items()))
+    count = count_cache.get(key)
+    if count is None:
+        count_statement = select(func.count()).select_from(statement.subquery())
+        count = session.exec(count_statement).one()
+        count_cache.set(key, count)
+    return count
@@ -0,0 +1,35 @@
+from typing import Any
+
+import pydantic_core
+from fastapi.responses import JSONResponse
+from sqlalchemy import Row
+from sqlmodel import SQLModel
+
+
+class FastJSONResponse(JSONResponse):
+    """
+    JSON response encoded by pydantic-core, which serializes UUIDs and datetimes
+    natively and is several times faster than the stdlib encoder.
+
+    Returning a response from a route skips the validation against its
+    response_model, which then only documents it, so the content must already
+    match it, e.g. rows selected with `public_columns`.
+    """
+
+    def render(self, content: Any) -> bytes:
+        return pydantic_core.to_json(content)
+
+
+def public_columns(table: type[SQLModel], public: type[SQLModel]) -> list[Any]:
+    """
+    Columns of `table` for the fields of its `public` model, in field order.
+    """
+    return [getattr(table, field) for field in public.model_fields]
+
+
+def public_rows(rows: list[Row[Any]], public: type[SQLModel]) -> list[dict[str, Any]]:
+    """
+    Rows selected with `public_columns` as dicts, ignoring any extra columns.
+    """
+    fields = list(public.model_fields)
+    return [dict(zip(fields, row, strict=False)) for row in rows]
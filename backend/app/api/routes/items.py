@@ -1,112 +1,416 @@
+import csv
+import io
 import uuid
-from typing import Any
+from collections.abc import AsyncIterator, Mapping
+from functools import partial
+from typing import Annotated, Any, Literal, NoReturn
 
-from fastapi import APIRouter, HTTPException
-from sqlmodel import col, func, select
+import pydantic_core
+from fastapi import APIRouter, Body, Header, HTTPException, Query, Response
+from fastapi.responses import StreamingResponse
+from sqlalchemy import Double, Select, cast, or_
+from sqlmodel import Session, col, func, select
 
-from app.api.deps import CurrentUser, SessionDep
-from app.models import Item, ItemCreate, ItemPublic, ItemsPublic, ItemUpdate, Message
+from app import crud
+from app.api.deps import AsyncCurrentUser, DatabaseDep, ReadDatabaseDep
+from app.api.etags import (
+    NOT_MODIFIED,
+    get_items_etag,
+    get_items_version,
+    item_etag,
+    item_versions,
+    items_etag,
+    none_match,
+    not_modified,
+)
+from app.api.pagination import (
+    count_rows,
+    encode_rank_cursor,
+    next_cursor,
+    paginate,
+    paginate_ranked,
+)
+from app.api.responses import FastJSONResponse, public_columns, public_rows
+from app.core.cache import items_cache
+from app.core.config import CountMode, settings
+from app.core.db import Database
+from app.models import (
+    Item,
+    ItemBulkResult,
+    ItemBulkUpdate,
+    ItemCreate,
+    ItemPublic,
+    ItemsBulkResults,
+    ItemsPublic,
+    ItemUpdate,
+    Message,
+)
 
 router = APIRouter(prefix="/items", tags=["items"])
 
 
-@router.get("/", response_model=ItemsPublic)
-def read_items(
-    session: SessionDep, current_user: CurrentUser, skip: int = 0, limit: int = 100
-) -> Any:
+def get_items_page(
+    *,
+    session: Session,
+    owner_id: uuid.UUID | None,
+    skip: int,
+    limit: int,
+    cursor: str | None,
+    count: CountMode,
+    etag: str,
+) -> dict[str, Any]:
+    """
+    Content of an ItemsPublic page, built from the selected rows as they are.
+    """
+    statement = select(*public_columns(Item, ItemPublic))
+    if owner_id is not None:
+        statement = statement.where(col(Item.owner_id) == owner_id)
+    total = count_rows(session, statement, mode=count, version=etag)
+    rows = session.exec(
+        paginate(statement, Item, cursor=cursor, skip=skip, limit=limit)
+    ).all()
+    return {
+        "data": public_rows(rows, ItemPublic),
+        "count": total,
+        "next_cursor": next_cursor(rows, limit),
+    }
+
+
+async def raise_item_not_found(
+    db: Database, id: uuid.UUID, owner_id: uuid.UUID | None = None
+) -> NoReturn:
     """
-    Retrieve items.
+    Raise the error for an item a mutation didn't match, which is either
+    missing, owned by someone other than `owner_id` or, if it was conditional,
+    at another version.
     """
+    found = await db.run(crud.get_item_version, id=id)
+    if not found:
+        raise HTTPException(status_code=404, detail="Item not found")
+    item_owner_id, _ = found
+    if owner_id is None or item_owner_id == owner_id:
+        raise HTTPException(status_code=412, detail="Item has been modified")
+    raise HTTPException(status_code=403, detail="Not enough permissions")
+
 
-    if current_user.is_superuser:
-        count_statement = select(func.count()).select_from(Item)
-        count = session.exec(count_statement).one()
-        statement = (
-            select(Item).order_by(col(Item.created_at).desc()).offset(skip).limit(limit)
+@router.get("/", response_model=ItemsPublic, responses=NOT_MODIFIED)
+async def read_items(
+    db: ReadDatabaseDep,
+    current_user: AsyncCurrentUser,
+    skip: int = 0,
+    limit: int = 100,
+    cursor: str | None = None,
+    count: CountMode | None = None,
+    if_none_match: Annotated[str | None, Header()] = None,
+) -> Any:
+    """
+    Retrieve items, pass the returned next_cursor as cursor to get the next page.
+    """
+    owner_id = None if current_user.is_superuser else current_user.id
+    count_mode = count or settings.LIST_COUNT_MODE
+    cache_key = None
+    if owner_id is not None and items_cache.enabled:
+        cache_key, cached = await items_cache.run(
+            items_cache.get, owner_id, skip, limit, cursor, count_mode
         )
-        items = session.exec(statement).all()
+        if cached is not None:
+            etag, body = cached
+            if not none_match(if_none_match, etag):
+                return not_modified(etag)
+            return Response(body, media_type="application/json", headers={"ETag": etag})
+    # Read before the page, so that a concurrent change can only make it stale
+    version = None
+    if owner_id is None:
+        etag = await db.run(get_items_etag, owner_id=None)
     else:
-        count_statement = (
-            select(func.count())
-            .select_from(Item)
-            .where(Item.owner_id == current_user.id)
-        )
-        count = session.exec(count_statement).one()
-        statement = (
-            select(Item)
-            .where(Item.owner_id == current_user.id)
-            .order_by(col(Item.created_at).desc())
-            .offset(skip)
-            .limit(limit)
+        version = await db.run(get_items_version, owner_id=owner_id)
+        etag = items_etag(version)
+    if not none_match(if_none_match, etag):
+        return not_modified(etag)
+    content = await db.run(
+        get_items_page,
+        owner_id=owner_id,
+        skip=skip,
+        limit=limit,
+        cursor=cursor,
+        count=count_mode,
+        etag=etag,
+    )
+    response = FastJSONResponse(content, headers={"ETag": etag})
+    if cache_key is not None and version is not None:
+        # The page may come from a replica that is behind the generation
+        await items_cache.run(
+            partial(items_cache.set, version=version), cache_key, etag, response.body
         )
-        items = session.exec(statement).all()
+    return response
+
+
+ExportFormat = Literal["ndjson", "csv"]
+BulkBody = Body(min_length=1, max_length=settings.ITEMS_BULK_MAX_SIZE)
+
+
+def bulk_results(
+    ids: list[uuid.UUID], results: Mapping[uuid.UUID, Item | bool | None]
+) -> ItemsBulkResults:
+    data = []
+    for id in ids:
+        result = results.get(id)
+        if id not in results:
+            data.append(ItemBulkResult(id=id, status=404))
+        elif not result:
+            data.append(ItemBulkResult(id=id, status=403))
+        else:
+            item = result if isinstance(result, Item) else None
+            data.append(ItemBulkResult(id=id, status=200, item=item))
+    return ItemsBulkResults(data=data)
 
-    return ItemsPublic(data=items, count=count)
 
+# The bulk routes are declared before the /{id} ones, which would match "bulk"
+@router.post("/bulk", response_model=ItemsBulkResults)
+async def create_items(
+    *,
+    db: DatabaseDep,
+    current_user: AsyncCurrentUser,
+    items_in: Annotated[list[ItemCreate], BulkBody],
+) -> Any:
+    """
+    Create new items in a single transaction.
+    """
+    items = await db.run(crud.create_items, items_in=items_in, owner_id=current_user.id)
+    return bulk_results([item.id for item in items], {item.id: item for item in items})
+
+
+@router.put("/bulk", response_model=ItemsBulkResults)
+async def update_items(
+    *,
+    db: DatabaseDep,
+    current_user: AsyncCurrentUser,
+    items_in: Annotated[list[ItemBulkUpdate], BulkBody],
+) -> Any:
+    """
+    Update items by ID in a single transaction, with a result for each item.
+    """
+    results = await db.run(
+        crud.update_items,
+        items_in=items_in,
+        owner_id=None if current_user.is_superuser else current_user.id,
+    )
+    return bulk_results([item_in.id for item_in in items_in], results)
 
-@router.get("/{id}", response_model=ItemPublic)
-def read_item(session: SessionDep, current_user: CurrentUser, id: uuid.UUID) -> Any:
+
+@router.delete("/bulk", response_model=ItemsBulkResults)
+async def delete_items(
+    *,
+    db: DatabaseDep,
+    current_user: AsyncCurrentUser,
+    ids: Annotated[list[uuid.UUID], BulkBody],
+) -> Any:
+    """
+    Delete items by ID in a single transaction, with a result for each item.
+    """
+    results = await db.run(
+        crud.delete_items,
+        ids=ids,
+        owner_id=None if current_user.is_superuser else current_user.id,
+    )
+    return bulk_results(ids, results)
+
+
+EXPORT_BATCH_SIZE = 1000
+EXPORT_MEDIA_TYPES = {"ndjson": "application/x-ndjson", "csv": "text/csv"}
+
+
+async def export_lines(
+    db: Database, statement: Select[Any], format: ExportFormat
+) -> AsyncIterator[str]:
+    """
+    Encode the rows of `statement` as NDJSON or CSV, one chunk per batch.
+    """
+    fields = list(ItemPublic.model_fields)
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    if format == "csv":
+        writer.writerow(fields)
+    async for rows in db.stream(statement, batch_size=EXPORT_BATCH_SIZE):
+        for row in rows:
+            if format == "csv":
+                data = pydantic_core.to_jsonable_python(dict(row))
+                writer.writerow([data[field] for field in fields])
+            else:
+                buffer.write(pydantic_core.to_json(dict(row)).decode())
+                buffer.write("\n")
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    if format == "csv" and buffer.tell():
+        yield buffer.getvalue()
+
+
+@router.get(
+    "/export",
+    response_class=StreamingResponse,
+    responses={
+        200: {"content": {media_type: {} for media_type in EXPORT_MEDIA_TYPES.values()}}
+    },
+)
+async def export_items(
+    db: ReadDatabaseDep,
+    current_user: AsyncCurrentUser,
+    format: ExportFormat = "ndjson",
+) -> StreamingResponse:
+    """
+    Download all visible items as NDJSON or CSV, streamed in creation order.
+    """
+    statement = select(*public_columns(Item, ItemPublic))
+    if not current_user.is_superuser:
+        statement = statement.where(col(Item.owner_id) == current_user.id)
+    statement = statement.order_by(col(Item.created_at), col(Item.id))
+    return StreamingResponse(
+        export_lines(db, statement, format),
+        media_type=EXPORT_MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="items.{format}"'},
+    )
+
+
+def search_items_page(
+    *,
+    session: Session,
+    owner_id: uuid.UUID | None,
+    q: str,
+    limit: int,
+    cursor: str | None,
+) -> dict[str, Any]:
+    """
+    Content of an ItemsPublic page of search results, built from the selected
+    rows as they are.
+    """
+    # Full-text matches on the title and description, plus fuzzy matches of
+    # the query against parts of the title ("widg" finds "Blue widget"), both
+    # served by GIN indexes
+    query = func.websearch_to_tsquery("simple", q)
+    search_vector = Item.__table__.c.search_vector  # type: ignore[attr-defined]
+    title = col(Item.title)
+    # Ranks are real, cast them so they survive the round trip through cursors
+    rank = cast(
+        func.ts_rank(search_vector, query) + func.word_similarity(q, title), Double
+    )
+    columns = [*public_columns(Item, ItemPublic), rank]
+    statement = select(*columns).where(
+        or_(search_vector.op("@@")(query), title.op("%>")(q))
+    )
+    if owner_id is not None:
+        statement = statement.where(col(Item.owner_id) == owner_id)
+    rows = session.exec(
+        paginate_ranked(statement, rank, col(Item.id), cursor=cursor, limit=limit)
+    ).all()
+    cursor = None
+    if rows and len(rows) == limit:
+        cursor = encode_rank_cursor(rows[-1][-1], rows[-1].id)
+    return {"data": public_rows(rows, ItemPublic), "count": None, "next_cursor": cursor}
+
+
+@router.get("/search", response_model=ItemsPublic)
+async def search_items(
+    db: ReadDatabaseDep,
+    current_user: AsyncCurrentUser,
+    q: Annotated[str, Query(min_length=1, max_length=255)],
+    limit: int = 100,
+    cursor: str | None = None,
+) -> Any:
+    """
+    Search items by title and description, best matches first. The count is
+    always null, pass next_cursor as cursor to get the next page.
+    """
+    content = await db.run(
+        search_items_page,
+        owner_id=None if current_user.is_superuser else current_user.id,
+        q=q,
+        limit=limit,
+        cursor=cursor,
+    )
+    return FastJSONResponse(content)
+
+
+@router.get("/{id}", response_model=ItemPublic, responses=NOT_MODIFIED)
+async def read_item(
+    db: ReadDatabaseDep,
+    current_user: AsyncCurrentUser,
+    response: Response,
+    id: uuid.UUID,
+    if_none_match: Annotated[str | None, Header()] = None,
+) -> Any:
     """
     Get item by ID.
     """
-    item = session.get(Item, id)
-    if not item:
+    item = None
+    if if_none_match is None:
+        item = await db.run(crud.get_item, id=id)
+        found = item and (item.owner_id, item.version)
+    else:
+        # Revalidate without loading the whole item, it's likely unchanged
+        found = await db.run(crud.get_item_version, id=id)
+    if not found:
         raise HTTPException(status_code=404, detail="Item not found")
-    if not current_user.is_superuser and (item.owner_id != current_user.id):
+    owner_id, version = found
+    if not current_user.is_superuser and (owner_id != current_user.id):
         raise HTTPException(status_code=403, detail="Not enough permissions")
+    if not none_match(if_none_match, item_etag(version)):
+        return not_modified(item_etag(version))
+    if item is None:
+        item = await db.run(crud.get_item, id=id)
+        if not item:
+            raise HTTPException(status_code=404, detail="Item not found")
+    response.headers["ETag"] = item_etag(item.version)
     return item
 
 
 @router.post("/", response_model=ItemPublic)
-def create_item(
-    *, session: SessionDep, current_user: CurrentUser, item_in: ItemCreate
+async def create_item(
+    *, db: DatabaseDep, current_user: AsyncCurrentUser, item_in: ItemCreate
 ) -> Any:
     """
     Create new item.
     """
-    item = Item.model_validate(item_in, update={"owner_id": current_user.id})
-    session.add(item)
-    session.commit()
-    session.refresh(item)
-    return item
+    return await db.run(crud.create_item, item_in=item_in, owner_id=current_user.id)
 
 
 @router.put("/{id}", response_model=ItemPublic)
-def update_item(
+async def update_item(
     *,
-    session: SessionDep,
-    current_user: CurrentUser,
+    db: DatabaseDep,
+    current_user: AsyncCurrentUser,
+    response: Response,
     id: uuid.UUID,
     item_in: ItemUpdate,
+    if_match: Annotated[str | None, Header()] = None,
 ) -> Any:
     """
-    Update an item.
+    Update an item. With If-Match, only if it's still at one of the given
+    ETags, otherwise fails with 412.
     """
-    item = session.get(Item, id)
+    owner_id = None if current_user.is_superuser else current_user.id
+    item = await db.run(
+        crud.update_item,
+        id=id,
+        item_in=item_in,
+        owner_id=owner_id,
+        versions=None if if_match is None else item_versions(if_match),
+    )
     if not item:
-        raise HTTPException(status_code=404, detail="Item not found")
-    if not current_user.is_superuser and (item.owner_id != current_user.id):
-        raise HTTPException(status_code=403, detail="Not enough permissions")
-    update_dict = item_in.model_dump(exclude_unset=True)
-    item.sqlmodel_update(update_dict)
-    session.add(item)
-    session.commit()
-    session.refresh(item)
+        await raise_item_not_found(db, id, owner_id)
+    response.headers["ETag"] = item_etag(item.version)
     return item
 
 
 @router.delete("/{id}")
-def delete_item(
-    session: SessionDep, current_user: CurrentUser, id: uuid.UUID
+async def delete_item(
+    db: DatabaseDep, current_user: AsyncCurrentUser, id: uuid.UUID
 ) -> Message:
     """
     Delete an item.
     """
-    item = session.get(Item, id)
-    if not item:
-        raise HTTPException(status_code=404, detail="Item not found")
-    if not current_user.is_superuser and (item.owner_id != current_user.id):
-        raise HTTPException(status_code=403, detail="Not enough permissions")
-    session.delete(item)
-    session.commit()
+    owner_id = None if current_user.is_superuser else current_user.id
+    deleted = await db.run(crud.delete_item, id=id, owner_id=owner_id)
+    if not deleted:
+        await raise_item_not_found(db, id, owner_id)
     return Message(message="Item deleted successfully")
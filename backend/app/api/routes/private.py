@@ -3,8 +3,9 @@ from typing import Any
 from fastapi import APIRouter
 from pydantic import BaseModel
 
-from app.api.deps import SessionDep
-from app.core.security import get_password_hash
+from app import crud
+from app.api.deps import DatabaseDep
+from app.core.hashing import password_hasher
 from app.models import (
     User,
     UserPublic,
@@ -21,7 +22,7 @@ class PrivateUserCreate(BaseModel):
 
 
 @router.post("/users/", response_model=UserPublic)
-def create_user(user_in: PrivateUserCreate, session: SessionDep) -> Any:
+async def create_user(user_in: PrivateUserCreate, db: DatabaseDep) -> Any:
     """
     Create a new user.
     """
@@ -29,10 +30,7 @@ def create_user(user_in: PrivateUserCreate, session: SessionDep) -> Any:
     user = User(
         email=user_in.email,
         full_name=user_in.full_name,
-        hashed_password=get_password_hash(user_in.password),
+        hashed_password=await password_hasher.hash(user_in.password),
     )
 
-    session.add(user)
-    session.commit()
-
-    return user
+    return await db.run(crud.save_user, db_user=user)
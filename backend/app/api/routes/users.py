@@ -1,19 +1,25 @@
 import uuid
-from typing import Any
+from typing import Annotated, Any
 
-from fastapi import APIRouter, Depends, HTTPException
-from sqlmodel import col, delete, func, select
+from fastapi import APIRouter, Depends, Header, HTTPException, Response
+from sqlmodel import Session, select
 
 from app import crud
 from app.api.deps import (
+    AsyncCurrentUser,
     CurrentUser,
+    DatabaseDep,
+    ReadSessionDep,
     SessionDep,
     get_current_active_superuser,
 )
-from app.core.config import settings
-from app.core.security import get_password_hash, verify_password
+from app.api.etags import NOT_MODIFIED, none_match, not_modified, user_etag
+from app.api.pagination import count_rows, next_cursor, paginate
+from app.api.responses import FastJSONResponse, public_columns, public_rows
+from app.core.cache import user_cache
+from app.core.config import CountMode, settings
+from app.core.hashing import password_hasher
 from app.models import (
-    Item,
     Message,
     UpdatePassword,
     User,
@@ -24,7 +30,7 @@ from app.models import (
     UserUpdate,
     UserUpdateMe,
 )
-from app.utils import generate_new_account_email, send_email
+from app.utils import generate_new_account_email, queue_email
 
 router = APIRouter(prefix="/users", tags=["users"])
 
@@ -34,46 +40,71 @@ router = APIRouter(prefix="/users", tags=["users"])
     dependencies=[Depends(get_current_active_superuser)],
     response_model=UsersPublic,
 )
-def read_users(session: SessionDep, skip: int = 0, limit: int = 100) -> Any:
+def read_users(
+    session: ReadSessionDep,
+    skip: int = 0,
+    limit: int = 100,
+    cursor: str | None = None,
+    count: CountMode | None = None,
+) -> Any:
     """
-    Retrieve users.
+    Retrieve users, pass the returned next_cursor as cursor to get the next page.
     """
 
-    count_statement = select(func.count()).select_from(User)
-    count = session.exec(count_statement).one()
+    statement = select(*public_columns(User, UserPublic))
+    total = count_rows(session, statement, mode=count or settings.LIST_COUNT_MODE)
+
+    paginated = paginate(statement, User, cursor=cursor, skip=skip, limit=limit)
+    rows = session.exec(paginated).all()
 
-    statement = (
-        select(User).order_by(col(User.created_at).desc()).offset(skip).limit(limit)
+    return FastJSONResponse(
+        {
+            "data": public_rows(rows, UserPublic),
+            "count": total,
+            "next_cursor": next_cursor(rows, limit),
+        }
     )
-    users = session.exec(statement).all()
 
-    return UsersPublic(data=users, count=count)
+
+def create_user_with_email(
+    *, session: Session, user_in: UserCreate, hashed_password: str
+) -> User:
+    """
+    Create the user and queue their new account email, committed together.
+    """
+    if settings.emails_enabled and user_in.email:
+        email_data = generate_new_account_email(
+            email_to=user_in.email, username=user_in.email, password=user_in.password
+        )
+        queue_email(
+            session=session,
+            email_to=user_in.email,
+            subject=email_data.subject,
+            html_content=email_data.html_content,
+        )
+    return crud.create_user(
+        session=session, user_create=user_in, hashed_password=hashed_password
+    )
 
 
 @router.post(
     "/", dependencies=[Depends(get_current_active_superuser)], response_model=UserPublic
 )
-def create_user(*, session: SessionDep, user_in: UserCreate) -> Any:
+async def create_user(*, db: DatabaseDep, user_in: UserCreate) -> Any:
     """
     Create new user.
     """
-    user = crud.get_user_by_email(session=session, email=user_in.email)
+    user = await db.run(crud.get_user_by_email, email=user_in.email)
     if user:
         raise HTTPException(
             status_code=400,
             detail="The user with this email already exists in the system.",
         )
 
-    user = crud.create_user(session=session, user_create=user_in)
-    if settings.emails_enabled and user_in.email:
-        email_data = generate_new_account_email(
-            email_to=user_in.email, username=user_in.email, password=user_in.password
-        )
-        send_email(
-            email_to=user_in.email,
-            subject=email_data.subject,
-            html_content=email_data.html_content,
-        )
+    hashed_password = await password_hasher.hash(user_in.password)
+    user = await db.run(
+        create_user_with_email, user_in=user_in, hashed_password=hashed_password
+    )
     return user
 
 
@@ -95,37 +126,44 @@ def update_user_me(
     current_user.sqlmodel_update(user_data)
     session.add(current_user)
     session.commit()
+    user_cache.delete(str(current_user.id))
     session.refresh(current_user)
     return current_user
 
 
 @router.patch("/me/password", response_model=Message)
-def update_password_me(
-    *, session: SessionDep, body: UpdatePassword, current_user: CurrentUser
+async def update_password_me(
+    *, db: DatabaseDep, body: UpdatePassword, current_user: AsyncCurrentUser
 ) -> Any:
     """
     Update own password.
     """
-    verified, _ = verify_password(body.current_password, current_user.hashed_password)
+    hashed_password = await db.run(crud.get_hashed_password, db_user=current_user)
+    verified, _ = await password_hasher.verify(body.current_password, hashed_password)
     if not verified:
         raise HTTPException(status_code=400, detail="Incorrect password")
     if body.current_password == body.new_password:
         raise HTTPException(
             status_code=400, detail="New password cannot be the same as the current one"
         )
-    hashed_password = get_password_hash(body.new_password)
-    current_user.hashed_password = hashed_password
-    session.add(current_user)
-    session.commit()
+    current_user.hashed_password = await password_hasher.hash(body.new_password)
+    await db.run(crud.save_user, db_user=current_user)
+    user_cache.delete(str(current_user.id))
     return Message(message="Password updated successfully")
 
 
-@router.get("/me", response_model=UserPublic)
-def read_user_me(current_user: CurrentUser) -> Any:
+@router.get("/me", response_model=UserPublic, responses=NOT_MODIFIED)
+def read_user_me(
+    current_user: CurrentUser, if_none_match: Annotated[str | None, Header()] = None
+) -> Any:
     """
     Get current user.
     """
-    return current_user
+    content = UserPublic.model_validate(current_user).model_dump_json().encode()
+    etag = user_etag(content)
+    if not none_match(if_none_match, etag):
+        return not_modified(etag)
+    return Response(content, media_type="application/json", headers={"ETag": etag})
 
 
 @router.delete("/me", response_model=Message)
@@ -137,42 +175,41 @@ def delete_user_me(session: SessionDep, current_user: CurrentUser) -> Any:
         raise HTTPException(
             status_code=403, detail="Super users are not allowed to delete themselves"
         )
-    session.delete(current_user)
-    session.commit()
+    crud.delete_user(session=session, db_user=current_user)
     return Message(message="User deleted successfully")
 
 
 @router.post("/signup", response_model=UserPublic)
-def register_user(session: SessionDep, user_in: UserRegister) -> Any:
+async def register_user(db: DatabaseDep, user_in: UserRegister) -> Any:
     """
     Create new user without the need to be logged in.
     """
-    user = crud.get_user_by_email(session=session, email=user_in.email)
+    user = await db.run(crud.get_user_by_email, email=user_in.email)
     if user:
         raise HTTPException(
             status_code=400,
             detail="The user with this email already exists in the system",
         )
     user_create = UserCreate.model_validate(user_in)
-    user = crud.create_user(session=session, user_create=user_create)
+    user = await crud.create_user_async(db=db, user_create=user_create)
     return user
 
 
 @router.get("/{user_id}", response_model=UserPublic)
 def read_user_by_id(
-    user_id: uuid.UUID, session: SessionDep, current_user: CurrentUser
+    user_id: uuid.UUID, session: ReadSessionDep, current_user: CurrentUser
 ) -> Any:
     """
     Get a specific user by id.
     """
-    user = session.get(User, user_id)
-    if user == current_user:
-        return user
+    if user_id == current_user.id:
+        return current_user
     if not current_user.is_superuser:
         raise HTTPException(
             status_code=403,
             detail="The user doesn't have enough privileges",
         )
+    user = session.get(User, user_id)
     if user is None:
         raise HTTPException(status_code=404, detail="User not found")
     return user
@@ -183,9 +220,9 @@ def read_user_by_id(
     dependencies=[Depends(get_current_active_superuser)],
     response_model=UserPublic,
 )
-def update_user(
+async def update_user(
     *,
-    session: SessionDep,
+    db: DatabaseDep,
     user_id: uuid.UUID,
     user_in: UserUpdate,
 ) -> Any:
@@ -193,20 +230,20 @@ def update_user(
     Update a user.
     """
 
-    db_user = session.get(User, user_id)
+    db_user = await db.run(crud.get_user, id=user_id)
     if not db_user:
         raise HTTPException(
             status_code=404,
             detail="The user with this id does not exist in the system",
         )
     if user_in.email:
-        existing_user = crud.get_user_by_email(session=session, email=user_in.email)
+        existing_user = await db.run(crud.get_user_by_email, email=user_in.email)
         if existing_user and existing_user.id != user_id:
             raise HTTPException(
                 status_code=409, detail="User with this email already exists"
             )
 
-    db_user = crud.update_user(session=session, db_user=db_user, user_in=user_in)
+    db_user = await crud.update_user_async(db=db, db_user=db_user, user_in=user_in)
     return db_user
 
 
@@ -224,8 +261,5 @@ def delete_user(
         raise HTTPException(
             status_code=403, detail="Super users are not allowed to delete themselves"
         )
-    statement = delete(Item).where(col(Item.owner_id) == user_id)
-    session.exec(statement)
-    session.delete(user)
-    session.commit()
+    crud.delete_user(session=session, db_user=user)
     return Message(message="User deleted successfully")
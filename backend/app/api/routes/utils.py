@@ -1,9 +1,12 @@
 from fastapi import APIRouter, Depends
 from pydantic.networks import EmailStr
 
-from app.api.deps import get_current_active_superuser
-from app.models import Message
-from app.utils import generate_test_email, send_email
+from app.api.deps import SessionDep, get_current_active_superuser
+from app.core.cache import items_cache
+from app.core.config import settings
+from app.core.db import async_engine, engine, get_pool_stats
+from app.models import DatabasePoolStats, Message, ResponseCacheStats
+from app.utils import generate_test_email, queue_email
 
 router = APIRouter(prefix="/utils", tags=["utils"])
 
@@ -13,19 +16,48 @@ router = APIRouter(prefix="/utils", tags=["utils"])
     dependencies=[Depends(get_current_active_superuser)],
     status_code=201,
 )
-def test_email(email_to: EmailStr) -> Message:
+def test_email(session: SessionDep, email_to: EmailStr) -> Message:
     """
     Test emails.
     """
     email_data = generate_test_email(email_to=email_to)
-    send_email(
+    queue_email(
+        session=session,
         email_to=email_to,
         subject=email_data.subject,
         html_content=email_data.html_content,
     )
+    session.commit()
     return Message(message="Test email sent")
 
 
+@router.get(
+    "/db-pool/",
+    dependencies=[Depends(get_current_active_superuser)],
+)
+def db_pool() -> dict[str, DatabasePoolStats]:
+    """
+    Connection pool usage of this worker, for the sync and async engines.
+    """
+    return {
+        "sync": DatabasePoolStats(**get_pool_stats(engine)),
+        "async": DatabasePoolStats(**get_pool_stats(async_engine)),
+    }
+
+
+@router.get(
+    "/items-cache/",
+    dependencies=[Depends(get_current_active_superuser)],
+)
+def items_cache_stats() -> ResponseCacheStats:
+    """
+    Lookups of the GET /items/ cache made by this worker.
+    """
+    return ResponseCacheStats(
+        backend=settings.ITEMS_CACHE_BACKEND, **items_cache.stats()
+    )
+
+
 @router.get("/health-check/")
 async def health_check() -> bool:
     return True
@@ -0,0 +1,323 @@
+import logging
+import secrets
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from collections.abc import Callable, Hashable, Iterable, Mapping
+from typing import Any, Generic, NamedTuple, Protocol, TypeVar, cast
+
+import redis
+from fastapi.concurrency import run_in_threadpool
+from redis.backoff import NoBackoff
+from redis.retry import Retry
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+K = TypeVar("K", bound=Hashable)
+V = TypeVar("V")
+T = TypeVar("T")
+
+
+class TTLCache(Generic[K, V]):
+    """
+    Thread-safe, size-bounded LRU cache whose entries expire after `ttl` seconds.
+
+    A `maxsize` or `ttl` of 0 disables the cache: every lookup is a miss and
+    nothing is stored.
+    """
+
+    def __init__(self, *, maxsize: int, ttl: float) -> None:
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._data: OrderedDict[K, tuple[float, V]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return self.maxsize > 0 and self.ttl > 0
+
+    def get(self, key: K) -> V | None:
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None and entry[0] < time.monotonic():
+                del self._data[key]
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def set(self, key: K, value: V, ttl: float | None = None) -> None:
+        """
+        Store `value`, expiring after `ttl` seconds instead of the cache's ttl
+        when given.
+        """
+        if not self.enabled:
+            return
+        with self._lock:
+            self._set(key, value, ttl)
+
+    def add(self, key: K, value: V, ttl: float | None = None) -> bool:
+        """
+        Store `value` unless `key` already has an unexpired entry, returns
+        whether it was stored.
+        """
+        if not self.enabled:
+            return False
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None and entry[0] >= time.monotonic():
+                return False
+            self._set(key, value, ttl)
+            return True
+
+    def _set(self, key: K, value: V, ttl: float | None) -> None:
+        self._data[key] = (time.monotonic() + (self.ttl if ttl is None else ttl), value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def delete(self, key: K) -> None:
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self) -> dict[str, int]:
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "size": len(self._data)}
+
+
+# Column values of recently authenticated users, keyed by the token subject
+# (the user id as a string). Each worker process has its own copy. Writes made
+# through another worker that revoke the user's tokens (deactivating, demoting
+# or deleting them) are picked up within AUTH_REVOCATION_REFRESH_SECONDS, other
+# changes (e.g. the name or email) once the entry expires.
+user_cache: TTLCache[str, dict[str, Any]] = TTLCache(
+    maxsize=settings.USER_CACHE_MAXSIZE, ttl=settings.USER_CACHE_TTL_SECONDS
+)
+
+
+class CacheBackend(Protocol):
+    """
+    Key-value store of a ResponseCache.
+    """
+
+    # Whether calls wait on the network, async code runs them in the threadpool
+    blocking: bool
+
+    def get(self, key: str) -> bytes | None: ...
+
+    def set(self, key: str, value: bytes, ttl: float) -> None: ...
+
+    def add(self, key: str, value: bytes, ttl: float) -> bool: ...
+
+
+class MemoryCacheBackend(TTLCache[str, bytes]):
+    """
+    Cache backend in the memory of this worker process.
+    """
+
+    blocking = False
+
+
+class RedisCacheBackend:
+    """
+    Cache backend in a server speaking the Redis protocol, shared by all
+    workers. Errors are logged and handled as misses, so the cache is bypassed
+    while the server is unreachable.
+    """
+
+    blocking = True
+
+    def __init__(self, client: redis.Redis) -> None:
+        self.client = client
+
+    def get(self, key: str) -> bytes | None:
+        try:
+            # Values stay bytes, the client is made without decode_responses
+            return cast(bytes | None, self.client.get(key))
+        except redis.RedisError as e:
+            logger.warning(f"Cache backend unavailable: {e}")
+            return None
+
+    def set(self, key: str, value: bytes, ttl: float) -> None:
+        try:
+            self.client.set(key, value, px=int(ttl * 1000))
+        except redis.RedisError as e:
+            logger.warning(f"Cache backend unavailable: {e}")
+
+    def add(self, key: str, value: bytes, ttl: float) -> bool:
+        try:
+            return bool(self.client.set(key, value, px=int(ttl * 1000), nx=True))
+        except redis.RedisError as e:
+            logger.warning(f"Cache backend unavailable: {e}")
+            return False
+
+
+class CacheKey(NamedTuple):
+    key: str
+    # Version of the owner's data when the generation of the key was made,
+    # responses built from older versions aren't stored under it
+    min_version: int
+
+
+class ResponseCache:
+    """
+    Response bodies and their ETags cached per owner, e.g. of the pages of
+    their items.
+
+    Every owner has a generation, a random token that is part of the keys of
+    their entries. Invalidating gives the owner a new generation, which leaves
+    the entries of the old one unreachable until they expire. The generation
+    carries the version of the owner's data after the change, so that responses
+    read from a replica that hasn't replayed it yet aren't stored under it.
+    """
+
+    # Losing a generation early only costs misses, a new one is made
+    generation_ttl = 24 * 60 * 60
+
+    def __init__(
+        self, backend: CacheBackend | None, *, prefix: str, ttl: float
+    ) -> None:
+        self.backend = backend
+        self.prefix = prefix
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return self.backend is not None
+
+    async def run(self, fn: Callable[..., T], *args: Any) -> T:
+        """
+        Call `fn(*args)`, one of the methods of the cache, from async code.
+        """
+        if self.backend is not None and self.backend.blocking:
+            return await run_in_threadpool(fn, *args)
+        return fn(*args)
+
+    def _generation(self, owner_id: uuid.UUID) -> bytes | None:
+        assert self.backend is not None
+        key = f"{self.prefix}:{owner_id}"
+        generation = self.backend.get(key)
+        if generation is None:
+            generation = self._new_generation(0)
+            if not self.backend.add(key, generation, self.generation_ttl):
+                # Made by a concurrent request, or the backend is unavailable
+                generation = self.backend.get(key)
+        return generation
+
+    @staticmethod
+    def _new_generation(version: int) -> bytes:
+        return f"{secrets.token_hex(8)}.{version}".encode()
+
+    def get(
+        self, owner_id: uuid.UUID, *params: Any
+    ) -> tuple[CacheKey | None, tuple[str, bytes] | None]:
+        """
+        Key of the entry of `owner_id` for `params`, or None if it can't be
+        cached, and the ETag and body stored in it, if any.
+
+        Store a response under the returned key rather than looking it up again
+        after building it, the owner might have changed in between.
+        """
+        if self.backend is None:
+            return None, None
+        generation = self._generation(owner_id)
+        if generation is None:
+            return None, None
+        token = generation.decode()
+        key = CacheKey(
+            ":".join([self.prefix, str(owner_id), token, *map(str, params)]),
+            int(token.partition(".")[2] or 0),
+        )
+        value = self.backend.get(key.key)
+        with self._lock:
+            if value is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        if value is None:
+            return key, None
+        etag, body = value.split(b"\n", 1)
+        return key, (etag.decode(), body)
+
+    def set(self, key: CacheKey, etag: str, body: bytes, *, version: int) -> None:
+        """
+        Store a response built from `version` of the owner's data, unless it's
+        older than the generation of `key`.
+        """
+        if self.backend is not None and version >= key.min_version:
+            self.backend.set(key.key, etag.encode() + b"\n" + body, self.ttl)
+
+    def invalidate(
+        self,
+        owner_ids: Iterable[uuid.UUID],
+        versions: Mapping[uuid.UUID, int] | None = None,
+    ) -> None:
+        """
+        Drop the entries of the owners, call after committing their changes so
+        that concurrent requests can't cache what they read before. `versions`
+        are the versions of the owners' data after the changes.
+        """
+        if self.backend is None:
+            return
+        for owner_id in owner_ids:
+            self.backend.set(
+                f"{self.prefix}:{owner_id}",
+                self._new_generation((versions or {}).get(owner_id, 0)),
+                self.generation_ttl,
+            )
+
+    def stats(self) -> dict[str, float]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": self.hits / lookups if lookups else 0.0,
+            }
+
+
+def get_cache_backend(
+    name: str, *, redis_url: str, maxsize: int, ttl: float
+) -> CacheBackend | None:
+    if name == "memory":
+        return MemoryCacheBackend(maxsize=maxsize, ttl=ttl)
+    if name == "redis":
+        # Fail fast without retries, a slow cache would be worse than none
+        client = redis.Redis.from_url(
+            redis_url,
+            socket_timeout=1,
+            socket_connect_timeout=1,
+            retry=Retry(NoBackoff(), 0),
+        )
+        return RedisCacheBackend(client)
+    return None
+
+
+# Pages of GET /items/ of regular users, see settings.ITEMS_CACHE_BACKEND
+items_cache = ResponseCache(
+    get_cache_backend(
+        settings.ITEMS_CACHE_BACKEND,
+        redis_url=settings.ITEMS_CACHE_REDIS_URL,
+        maxsize=settings.ITEMS_CACHE_MAXSIZE,
+        ttl=settings.ITEMS_CACHE_TTL_SECONDS,
+    ),
+    prefix="items",
+    ttl=settings.ITEMS_CACHE_TTL_SECONDS,
+)
@@ -1,10 +1,208 @@
+import logging
+import threading
+import time
+from collections.abc import AsyncIterator, Callable, Sequence
+from typing import Any, TypeVar
+
+import anyio
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import Engine, Executable, RowMapping
+from sqlalchemy import exc as sa_exc
+from sqlalchemy.ext.asyncio import AsyncEngine, create_async_engine
+from sqlalchemy.pool import AsyncAdaptedQueuePool, ConnectionPoolEntry, QueuePool
 from sqlmodel import Session, create_engine, select
+from sqlmodel.ext.asyncio.session import AsyncSession
 
 from app import crud
 from app.core.config import settings
 from app.models import User, UserCreate
 
-engine = create_engine(str(settings.SQLALCHEMY_DATABASE_URI))
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+class PoolMetrics:
+    """
+    Connection checkouts of a pool and how long callers waited for them,
+    including the time to open new connections.
+    """
+
+    def __init__(self) -> None:
+        self.checkouts = 0
+        self.timeouts = 0
+        self.wait_seconds = 0.0
+        self.max_wait_seconds = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, wait_seconds: float, *, timed_out: bool) -> None:
+        with self._lock:
+            if timed_out:
+                self.timeouts += 1
+            else:
+                self.checkouts += 1
+            self.wait_seconds += wait_seconds
+            self.max_wait_seconds = max(self.max_wait_seconds, wait_seconds)
+
+
+class InstrumentedQueuePool(QueuePool):
+    def __init__(self, *args: Any, **kwargs: Any) -> None:
+        super().__init__(*args, **kwargs)
+        self.metrics = PoolMetrics()
+
+    def recreate(self) -> QueuePool:
+        pool = super().recreate()
+        assert isinstance(pool, InstrumentedQueuePool)
+        # Shared by the pools an engine recreates, e.g. on dispose()
+        pool.metrics = self.metrics
+        return pool
+
+    def _do_get(self) -> ConnectionPoolEntry:
+        start = time.perf_counter()
+        timed_out = False
+        try:
+            return super()._do_get()
+        except sa_exc.TimeoutError:
+            timed_out = True
+            raise
+        finally:
+            self.metrics.observe(time.perf_counter() - start, timed_out=timed_out)
+
+
+class InstrumentedAsyncQueuePool(InstrumentedQueuePool, AsyncAdaptedQueuePool):
+    pass
+
+
+pool_options: dict[str, Any] = {
+    "pool_size": settings.DB_POOL_SIZE,
+    "max_overflow": settings.DB_MAX_OVERFLOW,
+    "pool_timeout": settings.DB_POOL_TIMEOUT,
+    "pool_recycle": settings.DB_POOL_RECYCLE,
+    "pool_pre_ping": settings.DB_POOL_PRE_PING,
+}
+
+engine = create_engine(
+    str(settings.SQLALCHEMY_DATABASE_URI),
+    poolclass=InstrumentedQueuePool,
+    **pool_options,
+)
+# Same database through psycopg's asyncio driver, used when DB_ASYNC is enabled
+async_engine = create_async_engine(
+    str(settings.SQLALCHEMY_DATABASE_URI),
+    poolclass=InstrumentedAsyncQueuePool,
+    **pool_options,
+)
+
+# Read replicas, see app.core.replicas. An unreachable replica fails fast so
+# that requests and lag checks don't hang on it
+replica_options: dict[str, Any] = {
+    **pool_options,
+    "connect_args": {"connect_timeout": settings.DB_REPLICA_TIMEOUT_SECONDS},
+}
+replica_engines = [
+    create_engine(uri, poolclass=InstrumentedQueuePool, **replica_options)
+    for uri in settings.DB_REPLICA_URIS
+]
+async_replica_engines = [
+    create_async_engine(uri, poolclass=InstrumentedAsyncQueuePool, **replica_options)
+    for uri in settings.DB_REPLICA_URIS
+]
+
+
+def get_pool_stats(db_engine: Engine | AsyncEngine) -> dict[str, Any]:
+    pool = db_engine.pool
+    assert isinstance(pool, InstrumentedQueuePool)
+    metrics = pool.metrics
+    return {
+        "size": pool.size(),
+        "checked_out": pool.checkedout(),
+        "overflow": max(pool.overflow(), 0),
+        "checkouts": metrics.checkouts,
+        "timeouts": metrics.timeouts,
+        "wait_seconds": metrics.wait_seconds,
+        "max_wait_seconds": metrics.max_wait_seconds,
+    }
+
+
+def check_pool_capacity() -> None:
+    """
+    Warn when more threads can use the sync engine than its pool can serve.
+
+    Must be called from the event loop, e.g. at startup.
+    """
+    threads = anyio.to_thread.current_default_thread_limiter().total_tokens
+    capacity = settings.DB_POOL_SIZE + settings.DB_MAX_OVERFLOW
+    if threads > capacity:
+        logger.warning(
+            f"The threadpool has {threads} threads but the database pool only "
+            f"{capacity} connections (DB_POOL_SIZE + DB_MAX_OVERFLOW), requests "
+            f"may wait up to DB_POOL_TIMEOUT={settings.DB_POOL_TIMEOUT}s for one"
+        )
+
+
+class Database:
+    """
+    Session wrapper for async routes, running ORM code written for a sync Session
+    without blocking the event loop.
+
+    With a Session each call runs in the threadpool and releases its connection
+    when done. With an AsyncSession it runs on the async engine through
+    AsyncSession.run_sync, so waiting on the database doesn't hold a thread.
+    """
+
+    def __init__(self, session: Session | AsyncSession) -> None:
+        self.session = session
+
+    async def run(self, fn: Callable[..., T], **kwargs: Any) -> T:
+        """
+        Call `fn(session=session, **kwargs)` with a sync Session.
+        """
+        if isinstance(self.session, AsyncSession):
+            return await self.session.run_sync(
+                lambda session: fn(session=session, **kwargs)
+            )
+        return await run_in_threadpool(self._run_sync, fn, self.session, **kwargs)
+
+    async def stream(
+        self, statement: Executable, *, batch_size: int
+    ) -> AsyncIterator[Sequence[RowMapping]]:
+        """
+        Yield the rows of `statement` in batches of `batch_size`, read through a
+        server-side cursor so memory use doesn't grow with the result.
+
+        Rows come from a connection of their own to the session's database rather
+        than the session, so the iterator can outlive the request's dependencies,
+        e.g. in a StreamingResponse.
+        """
+        statement = statement.execution_options(yield_per=batch_size)
+        if isinstance(self.session, AsyncSession):
+            async_bind = self.session.bind
+            assert isinstance(async_bind, AsyncEngine)
+            async with async_bind.connect() as async_connection:
+                async_result = await async_connection.stream(statement)
+                async for partition in async_result.mappings().partitions():
+                    yield partition
+            return
+        bind = self.session.get_bind()
+        assert isinstance(bind, Engine)
+        connection = await run_in_threadpool(bind.connect)
+        try:
+            result = await run_in_threadpool(connection.execute, statement)
+            partitions = result.mappings().partitions()
+            while partition := await run_in_threadpool(lambda: next(partitions, ())):
+                yield partition
+        finally:
+            await run_in_threadpool(connection.close)
+
+    @staticmethod
+    def _run_sync(fn: Callable[..., T], session: Session, /, **kwargs: Any) -> T:
+        try:
+            return fn(session=session, **kwargs)
+        finally:
+            # Return the connection to the pool between calls. Otherwise a
+            # request waiting for a free thread could hold a connection that
+            # the threads themselves are waiting for. Loaded objects stay usable.
+            session.close()
 
 
 # make sure all SQLModel models are imported (app.models) before initializing DB
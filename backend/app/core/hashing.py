@@ -0,0 +1,86 @@
+import asyncio
+import os
+import threading
+from collections.abc import Callable
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, TypeVar
+
+from app.core import security
+from app.core.config import settings
+
+T = TypeVar("T")
+
+
+class PasswordHashQueueFull(Exception):
+    """
+    Too many password hashes are pending, the request should be retried later.
+    """
+
+
+class PasswordHasherPool:
+    """
+    Run password hashing and verification outside of the request threadpool.
+
+    At most `concurrency` hashes run at once, limited by `workers` and by how
+    many Argon2 hashes fit in `memory_limit_mb`. Up to `max_queue` more calls
+    wait for a free slot, anything beyond that raises PasswordHashQueueFull.
+    With `workers` set to 0 a thread pool is used instead of subprocesses.
+    """
+
+    def __init__(self, *, workers: int, max_queue: int, memory_limit_mb: int) -> None:
+        hash_memory_mb = max(1, security.ARGON2_MEMORY_COST // 1024)
+        self.workers = workers
+        self.concurrency = max(
+            1, min(workers or os.cpu_count() or 1, memory_limit_mb // hash_memory_mb)
+        )
+        self.max_queue = max_queue
+        self.pending = 0
+        self._executor: Executor | None = None
+        self._lock = threading.Lock()
+
+    def _get_executor(self) -> Executor:
+        with self._lock:
+            if self._executor is None:
+                if self.workers:
+                    self._executor = ProcessPoolExecutor(max_workers=self.concurrency)
+                else:
+                    self._executor = ThreadPoolExecutor(
+                        max_workers=self.concurrency,
+                        thread_name_prefix="password-hash",
+                    )
+            return self._executor
+
+    async def _run(self, fn: Callable[..., T], *args: Any) -> T:
+        with self._lock:
+            if self.pending >= self.concurrency + self.max_queue:
+                raise PasswordHashQueueFull()
+            self.pending += 1
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._get_executor(), fn, *args)
+        finally:
+            with self._lock:
+                self.pending -= 1
+
+    async def hash(self, password: str) -> str:
+        return await self._run(security.get_password_hash, password)
+
+    async def verify(
+        self, plain_password: str, hashed_password: str
+    ) -> tuple[bool, str | None]:
+        return await self._run(
+            security.verify_password, plain_password, hashed_password
+        )
+
+    def shutdown(self) -> None:
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown()
+                self._executor = None
+
+
+password_hasher = PasswordHasherPool(
+    workers=settings.PASSWORD_HASH_WORKERS,
+    max_queue=settings.PASSWORD_HASH_MAX_QUEUE,
+    memory_limit_mb=settings.PASSWORD_HASH_MEMORY_LIMIT_MB,
+)
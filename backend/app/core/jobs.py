@@ -0,0 +1,107 @@
+import logging
+import random
+from collections.abc import Callable
+from datetime import datetime, timedelta, timezone
+from typing import Any
+
+from sqlmodel import Session, col, func, select
+
+from app.core.config import settings
+from app.models import Job
+
+logger = logging.getLogger(__name__)
+
+MAX_RETRY_SECONDS = 60 * 60
+
+JobFunction = Callable[..., None]
+
+# Functions that can run as jobs by name, registered with the `job` decorator
+jobs: dict[str, JobFunction] = {}
+
+
+def job(fn: JobFunction) -> JobFunction:
+    """
+    Register `fn` as a job named after it, to be called with a session and the
+    arguments it was enqueued with.
+
+    Jobs run in the transaction that claimed them and must not commit, their
+    changes are committed together with the removal of the job. Work too large
+    for one transaction can be split by enqueueing the rest as another job.
+    """
+    jobs[fn.__name__] = fn
+    return fn
+
+
+def enqueue_job(
+    *,
+    session: Session,
+    name: str,
+    args: dict[str, Any] | None = None,
+    priority: int = 0,
+    delay: float = 0,
+    max_attempts: int | None = None,
+) -> Job:
+    """
+    Enqueue the job `name` to be called with `args`, which must be JSON
+    serializable. It's run by app.job_worker once the session commits, and not
+    before `delay` seconds.
+    """
+    db_job = Job(
+        name=name,
+        args=args or {},
+        priority=priority,
+        max_attempts=max_attempts or settings.JOB_MAX_ATTEMPTS,
+        run_at=datetime.now(timezone.utc) + timedelta(seconds=delay),
+    )
+    session.add(db_job)
+    return db_job
+
+
+def claim_job(session: Session) -> Job | None:
+    """
+    Lock the next job that is due, skipping jobs locked by other workers.
+    """
+    statement = (
+        select(Job)
+        .where(col(Job.failed_at).is_(None), col(Job.run_at) <= func.now())
+        .order_by(col(Job.priority).desc(), col(Job.run_at))
+        .limit(1)
+        .with_for_update(skip_locked=True)
+    )
+    return session.exec(statement).first()
+
+
+def retry_delay(attempts: int) -> float:
+    # Exponential backoff with jitter, so failed jobs don't retry in lockstep
+    delay = settings.JOB_RETRY_SECONDS * 2.0 ** (attempts - 1)
+    return min(delay, MAX_RETRY_SECONDS) * random.uniform(0.5, 1)
+
+
+def run_next_job(session: Session) -> bool:
+    """
+    Run the next job that is due, returns whether there was one.
+    """
+    db_job = claim_job(session)
+    if db_job is None:
+        # Don't stay idle in the transaction
+        session.rollback()
+        return False
+    try:
+        # Failed jobs are rolled back to the savepoint, keeping their lock
+        with session.begin_nested():
+            jobs[db_job.name](session, **db_job.args)
+    except Exception as e:
+        db_job.attempts += 1
+        db_job.last_error = repr(e)
+        now = datetime.now(timezone.utc)
+        if db_job.attempts >= db_job.max_attempts:
+            logger.exception(f"Giving up on job {db_job.id} ({db_job.name})")
+            db_job.failed_at = now
+        else:
+            logger.warning(f"Job {db_job.id} ({db_job.name}) failed: {e!r}")
+            db_job.run_at = now + timedelta(seconds=retry_delay(db_job.attempts))
+        session.add(db_job)
+    else:
+        session.delete(db_job)
+    session.commit()
+    return True
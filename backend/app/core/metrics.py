@@ -0,0 +1,206 @@
+"""
+Prometheus metrics, served by GET /metrics.
+
+Every worker process of `fastapi run --workers N` records its own metrics. With
+PROMETHEUS_MULTIPROC_DIR set, as scripts/start.sh does, they are written to
+files in that directory and /metrics adds up the metrics of all the workers,
+whichever worker serves the scrape. The directory must be emptied before the
+server starts.
+"""
+
+import os
+import time
+from collections import defaultdict
+
+import anyio
+from prometheus_client import (
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+    multiprocess,
+)
+from starlette.routing import BaseRoute, Match, Router
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.core.db import async_engine, engine, get_pool_stats
+from app.core.hashing import password_hasher
+
+MULTIPROCESS_DIR = os.environ.get("PROMETHEUS_MULTIPROC_DIR")
+
+REQUEST_DURATION = Histogram(
+    "http_request_duration_seconds",
+    "Time to handle a request, until its response is sent",
+    ["operation", "method", "status"],
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30),
+)
+# Gauges of live processes are added up, the values of workers that exited are
+# dropped
+REQUESTS_IN_PROGRESS = Gauge(
+    "http_requests_in_progress",
+    "Requests being handled",
+    ["operation", "method"],
+    multiprocess_mode="livesum",
+)
+DB_POOL_SIZE = Gauge(
+    "db_pool_size",
+    "Connections kept open by the pool",
+    ["engine"],
+    multiprocess_mode="livesum",
+)
+DB_POOL_CHECKED_OUT = Gauge(
+    "db_pool_checked_out",
+    "Connections in use",
+    ["engine"],
+    multiprocess_mode="livesum",
+)
+DB_POOL_OVERFLOW = Gauge(
+    "db_pool_overflow",
+    "Connections open beyond the pool size",
+    ["engine"],
+    multiprocess_mode="livesum",
+)
+DB_POOL_CHECKOUTS = Counter(
+    "db_pool_checkouts", "Connections handed out by the pool", ["engine"]
+)
+DB_POOL_TIMEOUTS = Counter(
+    "db_pool_timeouts", "Callers that gave up waiting for a connection", ["engine"]
+)
+DB_POOL_WAIT = Counter(
+    "db_pool_wait_seconds", "Time callers waited for a connection", ["engine"]
+)
+THREADPOOL_THREADS = Gauge(
+    "threadpool_threads",
+    "Threads available to sync routes and dependencies",
+    multiprocess_mode="livesum",
+)
+THREADPOOL_BUSY = Gauge(
+    "threadpool_threads_busy",
+    "Threads running sync routes and dependencies",
+    multiprocess_mode="livesum",
+)
+THREADPOOL_WAITING = Gauge(
+    "threadpool_tasks_waiting",
+    "Calls waiting for a free thread",
+    multiprocess_mode="livesum",
+)
+PASSWORD_HASH_PENDING = Gauge(
+    "password_hash_pending",
+    "Password hashes and verifications running or waiting",
+    multiprocess_mode="livesum",
+)
+PASSWORD_HASH_QUEUED = Gauge(
+    "password_hash_queued",
+    "Password hashes and verifications waiting for a free slot",
+    multiprocess_mode="livesum",
+)
+
+# Pool totals already added to the counters, per engine
+_counted: defaultdict[tuple[str, str], float] = defaultdict(float)
+
+
+def _count(counter: Counter, engine_name: str, key: str, total: float) -> None:
+    increment = total - _counted[engine_name, key]
+    if increment > 0:
+        counter.labels(engine_name).inc(increment)
+        _counted[engine_name, key] = total
+
+
+def observe_process() -> None:
+    """
+    Record the state of this worker's pools.
+
+    Must be called from the event loop. It's called after every request, so
+    that the files of idle workers are up to date when another one is scraped.
+    """
+    for engine_name, db_engine in (("sync", engine), ("async", async_engine)):
+        stats = get_pool_stats(db_engine)
+        DB_POOL_SIZE.labels(engine_name).set(stats["size"])
+        DB_POOL_CHECKED_OUT.labels(engine_name).set(stats["checked_out"])
+        DB_POOL_OVERFLOW.labels(engine_name).set(stats["overflow"])
+        _count(DB_POOL_CHECKOUTS, engine_name, "checkouts", stats["checkouts"])
+        _count(DB_POOL_TIMEOUTS, engine_name, "timeouts", stats["timeouts"])
+        _count(DB_POOL_WAIT, engine_name, "wait_seconds", stats["wait_seconds"])
+    limiter = anyio.to_thread.current_default_thread_limiter()
+    THREADPOOL_THREADS.set(limiter.total_tokens)
+    THREADPOOL_BUSY.set(limiter.borrowed_tokens)
+    THREADPOOL_WAITING.set(limiter.statistics().tasks_waiting)
+    pending = password_hasher.pending
+    PASSWORD_HASH_PENDING.set(pending)
+    PASSWORD_HASH_QUEUED.set(max(pending - password_hasher.concurrency, 0))
+
+
+def generate_metrics() -> bytes:
+    """
+    The metrics of all workers in the Prometheus text format.
+    """
+    observe_process()
+    if MULTIPROCESS_DIR:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)  # type: ignore[no-untyped-call]
+        return generate_latest(registry)
+    return generate_latest()
+
+
+def mark_process_dead() -> None:
+    """
+    Drop the gauges of this worker, to be called when it shuts down.
+    """
+    if MULTIPROCESS_DIR:
+        multiprocess.mark_process_dead(os.getpid())  # type: ignore[no-untyped-call]
+
+
+def match_route(router: Router, scope: Scope) -> BaseRoute | None:
+    """
+    The route that will handle the request of `scope`, before the router runs.
+    """
+    for route in router.routes:
+        match, _ = route.matches(scope)
+        if match == Match.FULL:
+            return route
+    return None
+
+
+def operation_id(route: BaseRoute | None) -> str:
+    if route is None:
+        return "unmatched"
+    # Routes that aren't API routes, e.g. /docs, by their name
+    return str(getattr(route, "unique_id", getattr(route, "name", "")))
+
+
+class MetricsMiddleware:
+    """
+    Record the duration and number of in progress requests of each route, by its
+    operation id, e.g. "items-read_items". Requests that don't match any route
+    are recorded as "unmatched".
+    """
+
+    def __init__(self, app: ASGIApp, router: Router) -> None:
+        self.app = app
+        self.router = router
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        operation = operation_id(match_route(self.router, scope))
+        in_progress = REQUESTS_IN_PROGRESS.labels(operation, scope["method"])
+        in_progress.inc()
+        start = time.perf_counter()
+        status = 500
+
+        async def send_with_status(message: Message) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            in_progress.dec()
+            REQUEST_DURATION.labels(operation, scope["method"], str(status)).observe(
+                time.perf_counter() - start
+            )
+            observe_process()
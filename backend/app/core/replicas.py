@@ -0,0 +1,156 @@
+import hashlib
+import itertools
+import logging
+import math
+import threading
+import time
+
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import Engine, text
+from sqlalchemy import exc as sa_exc
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from app.core.cache import CacheBackend, MemoryCacheBackend, get_cache_backend
+from app.core.config import settings
+from app.core.db import replica_engines
+
+logger = logging.getLogger(__name__)
+
+# Seconds the replica is behind the primary, 0 when it has replayed everything
+# it received or isn't a replica at all. NULL when it isn't streaming from the
+# primary, e.g. its WAL receiver disconnected, as it might then have replayed
+# everything it received long ago
+LAG_QUERY = """
+SELECT CASE
+    WHEN NOT pg_is_in_recovery() THEN 0
+    WHEN NOT EXISTS (
+        SELECT FROM pg_stat_wal_receiver WHERE status = 'streaming'
+    ) THEN NULL
+    WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+    ELSE extract(epoch FROM now() - pg_last_xact_replay_timestamp())
+END
+"""
+
+
+class ReplicaRouter:
+    """
+    Picks the database for read-only work.
+
+    Replicas take turns, skipping those that lag behind the primary by more
+    than `max_lag` seconds or can't be reached within `timeout` seconds.
+    Clients that made a write request in the last `sticky_seconds` read from
+    the primary, so they see their own writes, as does everyone when no
+    replica is usable. The clients that wrote are kept in `writers`, by default
+    in the memory of this worker.
+    """
+
+    def __init__(
+        self,
+        engines: list[Engine],
+        *,
+        max_lag: float,
+        lag_check_seconds: float,
+        sticky_seconds: float,
+        timeout: float = 2,
+        writers: CacheBackend | None = None,
+    ) -> None:
+        self.engines = engines
+        self.max_lag = max_lag
+        self.lag_check_seconds = lag_check_seconds
+        self.sticky_seconds = sticky_seconds
+        self.timeout = timeout
+        self.writers = writers or MemoryCacheBackend(
+            maxsize=100_000, ttl=sticky_seconds
+        )
+        self._lags = [0.0] * len(engines)
+        self._next_check = [0.0] * len(engines)
+        self._turns = itertools.count()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _writer_key(client: str) -> str:
+        # Clients are identified by their Authorization header, hashed so that
+        # no token is stored
+        return f"writers:{hashlib.sha256(client.encode()).hexdigest()}"
+
+    def mark_write(self, client: str) -> None:
+        if self.sticky_seconds > 0:
+            self.writers.set(self._writer_key(client), b"1", self.sticky_seconds)
+
+    def choose(self, client: str | None) -> int | None:
+        """
+        Index of the replica to read from, or None for the primary.
+        """
+        if not self.engines:
+            return None
+        if client is not None and self.writers.get(self._writer_key(client)):
+            return None
+        start = next(self._turns)
+        for offset in range(len(self.engines)):
+            index = (start + offset) % len(self.engines)
+            if self.lag(index) <= self.max_lag:
+                return index
+        return None
+
+    def lag(self, index: int) -> float:
+        with self._lock:
+            check = time.monotonic() >= self._next_check[index]
+            if check:
+                # Other threads keep using the previous value in the meantime
+                self._next_check[index] = time.monotonic() + self.lag_check_seconds
+        if check:
+            self._lags[index] = self._measure_lag(self.engines[index])
+        return self._lags[index]
+
+    def _measure_lag(self, engine: Engine) -> float:
+        try:
+            with engine.connect() as connection:
+                # Only for the check, the setting ends with its transaction
+                connection.execute(
+                    text("SELECT set_config('statement_timeout', :timeout, true)"),
+                    {"timeout": f"{self.timeout}s"},
+                )
+                lag = connection.execute(text(LAG_QUERY)).scalar_one()
+        except sa_exc.DBAPIError as e:
+            logger.warning(f"Replica {engine.url!r} is unavailable: {e}")
+            return math.inf
+        return math.inf if lag is None else float(lag)
+
+
+SAFE_METHODS = {"GET", "HEAD", "OPTIONS"}
+
+
+class ReadYourWritesMiddleware:
+    """
+    Send the reads of clients to the primary after they make a write request,
+    i.e. any request that isn't GET, HEAD or OPTIONS.
+    """
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] == "http" and scope["method"] not in SAFE_METHODS:
+            for name, value in scope["headers"]:
+                if name == b"authorization":
+                    client = value.decode("latin-1")
+                    if replicas.writers.blocking:
+                        await run_in_threadpool(replicas.mark_write, client)
+                    else:
+                        replicas.mark_write(client)
+        await self.app(scope, receive, send)
+
+
+replicas = ReplicaRouter(
+    replica_engines,
+    max_lag=settings.DB_REPLICA_MAX_LAG_SECONDS,
+    lag_check_seconds=settings.DB_REPLICA_LAG_CHECK_SECONDS,
+    sticky_seconds=settings.DB_READ_YOUR_WRITES_SECONDS,
+    timeout=settings.DB_REPLICA_TIMEOUT_SECONDS,
+    writers=get_cache_backend(
+        settings.DB_READ_YOUR_WRITES_BACKEND,
+        redis_url=settings.DB_READ_YOUR_WRITES_REDIS_URL,
+        maxsize=100_000,
+        ttl=settings.DB_READ_YOUR_WRITES_SECONDS,
+    ),
+)
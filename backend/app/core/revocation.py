@@ -0,0 +1,60 @@
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+
+from sqlmodel import Session, col, select
+
+from app.core.config import settings
+from app.models import TokenRevocation
+
+
+class TokenRevocationSet:
+    """
+    Latest token_version of every user whose claims changed recently.
+
+    Tokens carrying an older version must be checked against the database.
+    The set is filled from the tokenrevocation table at most once every
+    `refresh_seconds`, reading only rows added since the previous refresh, and
+    from revocations made by this worker, which are visible immediately.
+    """
+
+    # Re-read rows slightly older than the last refresh, in case they were
+    # committed after it by a slower transaction
+    overlap = timedelta(minutes=1)
+
+    def __init__(self, *, refresh_seconds: float) -> None:
+        self.refresh_seconds = refresh_seconds
+        self.versions: dict[str, int] = {}
+        self._refreshed_at: datetime | None = None
+        self._next_refresh = 0.0
+        self._lock = threading.Lock()
+
+    def add(self, user_id: str, token_version: int) -> None:
+        with self._lock:
+            self.versions[user_id] = max(token_version, self.versions.get(user_id, 0))
+
+    def refresh(self, session: Session) -> None:
+        if time.monotonic() < self._next_refresh:
+            return
+        now = datetime.now(timezone.utc)
+        # Revocations older than the token lifetime can't affect valid tokens
+        since = (
+            self._refreshed_at - self.overlap
+            if self._refreshed_at
+            else now - timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
+        )
+        statement = select(TokenRevocation).where(
+            col(TokenRevocation.created_at) > since
+        )
+        for revocation in session.exec(statement).all():
+            self.add(str(revocation.user_id), revocation.token_version)
+        self._refreshed_at = now
+        self._next_refresh = time.monotonic() + self.refresh_seconds
+
+    def is_stale(self, user_id: str, token_version: int) -> bool:
+        return token_version < self.versions.get(user_id, 0)
+
+
+token_revocations = TokenRevocationSet(
+    refresh_seconds=settings.AUTH_REVOCATION_REFRESH_SECONDS
+)
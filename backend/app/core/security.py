@@ -8,9 +8,12 @@ from pwdlib.hashers.bcrypt import BcryptHasher
 
 from app.core.config import settings
 
+# Memory used by a single Argon2 hash, in KiB
+ARGON2_MEMORY_COST = 65536
+
 password_hash = PasswordHash(
     (
-        Argon2Hasher(),
+        Argon2Hasher(memory_cost=ARGON2_MEMORY_COST),
         BcryptHasher(),
     )
 )
@@ -19,9 +22,13 @@ password_hash = PasswordHash(
 ALGORITHM = "HS256"
 
 
-def create_access_token(subject: str | Any, expires_delta: timedelta) -> str:
+def create_access_token(
+    subject: str | Any,
+    expires_delta: timedelta,
+    claims: dict[str, Any] | None = None,
+) -> str:
     expire = datetime.now(timezone.utc) + expires_delta
-    to_encode = {"exp": expire, "sub": str(subject)}
+    to_encode = {**(claims or {}), "exp": expire, "sub": str(subject)}
     encoded_jwt = jwt.encode(to_encode, settings.SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
@@ -0,0 +1,140 @@
+import logging
+import time
+from collections import Counter
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Any
+
+from sqlalchemy import Connection, Engine, event
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class SQLStats:
+    """
+    SQL statements executed while handling a request and the time spent on
+    them, including the statements' network round trips.
+    """
+
+    statements: int = 0
+    seconds: float = 0.0
+    # Statements are counted by their SQL, which has placeholders for the
+    # parameters, so the same query with different parameters counts once
+    shapes: Counter[str] = field(default_factory=Counter)
+
+    def record(self, statement: str, seconds: float) -> None:
+        self.statements += 1
+        self.seconds += seconds
+        self.shapes[statement] += 1
+
+    def repeated(self, threshold: int) -> list[tuple[str, int]]:
+        return [
+            (statement, count)
+            for statement, count in self.shapes.most_common()
+            if count > threshold
+        ]
+
+
+# Set by SQLStatsMiddleware for the duration of a request. Threadpool calls and
+# AsyncSession.run_sync get a copy of the context, which refers to the same
+# SQLStats
+sql_stats: ContextVar[SQLStats | None] = ContextVar("sql_stats", default=None)
+
+
+# Listening on the Engine class covers every engine, including the sync engines
+# behind the async ones
+@event.listens_for(Engine, "before_cursor_execute")
+def _before_cursor_execute(
+    conn: Connection,
+    *args: Any,  # noqa: ARG001
+) -> None:
+    if sql_stats.get() is not None:
+        conn.info["sql_stats_start"] = time.perf_counter()
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _after_cursor_execute(
+    conn: Connection,
+    cursor: Any,  # noqa: ARG001
+    statement: str,
+    *args: Any,  # noqa: ARG001
+) -> None:
+    stats = sql_stats.get()
+    start = conn.info.pop("sql_stats_start", None)
+    if stats is not None and start is not None:
+        stats.record(statement, time.perf_counter() - start)
+
+
+class SQLStatsMiddleware:
+    """
+    Count the SQL statements of each request and the time spent on them.
+
+    They are reported in a Server-Timing header, e.g.
+    `db;dur=4.2;desc="3 queries"`, and logged once the response is sent, so
+    statements run while streaming the response are only in the log. Outside
+    production, requests running the same statement more than
+    SQL_REPEATED_STATEMENT_THRESHOLD times, likely an N+1 query, log a warning.
+    """
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        stats = SQLStats()
+        token = sql_stats.set(stats)
+        start = time.perf_counter()
+        status = None
+
+        async def send_with_server_timing(message: Message) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                headers = MutableHeaders(scope=message)
+                headers.append(
+                    "Server-Timing",
+                    f"db;dur={stats.seconds * 1000:.1f};"
+                    f'desc="{stats.statements} queries"',
+                )
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_server_timing)
+        finally:
+            sql_stats.reset(token)
+            self.log(scope, status, stats, time.perf_counter() - start)
+
+    @staticmethod
+    def log(scope: Scope, status: int | None, stats: SQLStats, seconds: float) -> None:
+        # The path of the matched route, so that requests to the same route log
+        # the same path
+        route = scope.get("route")
+        path = getattr(route, "path", scope["path"])
+        logger.info(
+            f"{scope['method']} {path} {status}: {stats.statements} queries in "
+            f"{stats.seconds * 1000:.1f} ms, {seconds * 1000:.1f} ms total",
+            extra={
+                "method": scope["method"],
+                "path": path,
+                "status": status,
+                "queries": stats.statements,
+                "db_ms": round(stats.seconds * 1000, 1),
+                "duration_ms": round(seconds * 1000, 1),
+            },
+        )
+        if settings.ENVIRONMENT == "production":
+            return
+        for statement, count in stats.repeated(
+            settings.SQL_REPEATED_STATEMENT_THRESHOLD
+        ):
+            logger.warning(
+                f"{scope['method']} {path} ran the same statement {count} times, "
+                f"likely an N+1 query: {statement[:500]}"
+            )
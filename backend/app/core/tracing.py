@@ -0,0 +1,86 @@
+import random
+import threading
+import time
+from typing import Any
+
+from sentry_sdk.types import Event, Hint
+from starlette.routing import Router
+
+from app.core.metrics import match_route, operation_id
+
+
+class TracesSampler:
+    """
+    Sentry `traces_sampler` choosing which requests are traced.
+
+    Requests are traced at the rate of their route, by operation id, e.g.
+    {"utils-health_check": 0.001}, or at `default_rate`. Requests continuing a
+    trace follow the decision of its parent. A route that reported an error in
+    the last `error_seconds` is traced at a rate of 1, so that the requests
+    failing after the first error have traces.
+
+    Whatever the rates, at most `max_per_second` transactions per second are
+    traced by each process, in bursts of up to a second's worth.
+    """
+
+    def __init__(
+        self,
+        router: Router,
+        *,
+        default_rate: float,
+        rates: dict[str, float],
+        max_per_second: float | None,
+        error_seconds: float,
+    ) -> None:
+        self.router = router
+        self.default_rate = default_rate
+        self.rates = rates
+        self.max_per_second = max_per_second
+        self.error_seconds = error_seconds
+        # Routes by path, as in the transaction of their events, with the time
+        # until which they are traced after an error
+        self._erroring: dict[str, float] = {}
+        self._tokens = max(max_per_second or 0.0, 1)
+        self._refilled = time.monotonic()
+        self._lock = threading.Lock()
+
+    def __call__(self, sampling_context: dict[str, Any]) -> float:
+        parent_sampled = sampling_context.get("parent_sampled")
+        if parent_sampled is not None:
+            sampled = bool(parent_sampled)
+        else:
+            sampled = random.random() < self.rate(sampling_context.get("asgi_scope"))
+        return 1.0 if sampled and self._take() else 0.0
+
+    def rate(self, scope: dict[str, Any] | None) -> float:
+        if scope is None or scope["type"] != "http":
+            return self.default_rate
+        route = match_route(self.router, scope)
+        path = getattr(route, "path", None)
+        if path is not None and self._erroring.get(path, 0) > time.monotonic():
+            return 1.0
+        return self.rates.get(operation_id(route), self.default_rate)
+
+    def before_send(self, event: Event, hint: Hint) -> Event:  # noqa: ARG002
+        """
+        Sentry `before_send` hook, tracing the route of errors for a while.
+        """
+        transaction = event.get("transaction")
+        if transaction:
+            self._erroring[transaction] = time.monotonic() + self.error_seconds
+        return event
+
+    def _take(self) -> bool:
+        if self.max_per_second is None:
+            return True
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(
+                max(self.max_per_second, 1),
+                self._tokens + (now - self._refilled) * self.max_per_second,
+            )
+            self._refilled = now
+            if self._tokens < 1:
+                return False
+            self._tokens -= 1
+            return True
@@ -1,15 +1,64 @@
 import uuid
-from typing import Any
+from collections.abc import Collection
+from typing import TYPE_CHECKING, Any, cast
 
-from sqlmodel import Session, select
+from sqlalchemy import CursorResult, any_, delete, func, update
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import aliased
+from sqlmodel import Session, col, select
 
+from app.core.cache import items_cache, user_cache
+from app.core.config import settings
+from app.core.hashing import password_hasher
+from app.core.jobs import enqueue_job
+from app.core.revocation import token_revocations
 from app.core.security import get_password_hash, verify_password
-from app.models import Item, ItemCreate, User, UserCreate, UserUpdate
+from app.models import (
+    Counter,
+    Item,
+    ItemBulkUpdate,
+    ItemCreate,
+    ItemUpdate,
+    TokenRevocation,
+    User,
+    UserCreate,
+    UserUpdate,
+)
 
+if TYPE_CHECKING:
+    from app.core.db import Database
 
-def create_user(*, session: Session, user_create: UserCreate) -> User:
+# Users deleted so far, counted in the ETag of all items since a deletion lowers
+# the sum of the items versions
+DELETED_USERS_COUNTER = "deleted_users"
+
+
+def increment_counter(*, session: Session, name: str) -> None:
+    """
+    Increment the counter `name`, without committing.
+    """
+    statement = insert(Counter).values(name=name, value=1)
+    session.execute(
+        statement.on_conflict_do_update(
+            index_elements=[Counter.name],
+            set_={"value": Counter.value + statement.excluded.value},
+        )
+    )
+
+
+def create_user(
+    *, session: Session, user_create: UserCreate, hashed_password: str | None = None
+) -> User:
+    """
+    Create the user, with the password hashed right away unless its hash from
+    `password_hasher` is given.
+    """
     db_obj = User.model_validate(
-        user_create, update={"hashed_password": get_password_hash(user_create.password)}
+        user_create,
+        update={
+            "hashed_password": hashed_password
+            or get_password_hash(user_create.password)
+        },
     )
     session.add(db_obj)
     session.commit()
@@ -17,20 +66,131 @@ def create_user(*, session: Session, user_create: UserCreate) -> User:
     return db_obj
 
 
-def update_user(*, session: Session, db_user: User, user_in: UserUpdate) -> Any:
+def save_user(*, session: Session, db_user: User) -> User:
+    session.add(db_user)
+    session.commit()
+    session.refresh(db_user)
+    return db_user
+
+
+async def create_user_async(*, db: "Database", user_create: UserCreate) -> User:
+    hashed_password = await password_hasher.hash(user_create.password)
+    return await db.run(
+        create_user, user_create=user_create, hashed_password=hashed_password
+    )
+
+
+def get_user(*, session: Session, id: uuid.UUID) -> User | None:
+    return session.get(User, id)
+
+
+def get_hashed_password(*, session: Session, db_user: User) -> str:
+    # Selected on its own, cached users are loaded without it
+    return session.exec(select(User.hashed_password).where(User.id == db_user.id)).one()
+
+
+def revoke_token_claims(*, session: Session, db_user: User) -> None:
+    db_user.token_version += 1
+    session.add(db_user)
+    session.add(
+        TokenRevocation(user_id=db_user.id, token_version=db_user.token_version)
+    )
+    # Recorded before the commit, if it fails this only causes extra DB lookups
+    token_revocations.add(str(db_user.id), db_user.token_version)
+
+
+def update_user(
+    *,
+    session: Session,
+    db_user: User,
+    user_in: UserUpdate,
+    hashed_password: str | None = None,
+) -> Any:
+    """
+    Update the user, with a new password hashed right away unless its hash from
+    `password_hasher` is given.
+    """
     user_data = user_in.model_dump(exclude_unset=True)
+    if any(
+        field in user_data and user_data[field] != getattr(db_user, field)
+        for field in ("is_active", "is_superuser")
+    ):
+        revoke_token_claims(session=session, db_user=db_user)
     extra_data = {}
     if "password" in user_data:
         password = user_data["password"]
-        hashed_password = get_password_hash(password)
-        extra_data["hashed_password"] = hashed_password
+        extra_data["hashed_password"] = hashed_password or get_password_hash(password)
     db_user.sqlmodel_update(user_data, update=extra_data)
     session.add(db_user)
     session.commit()
+    user_cache.delete(str(db_user.id))
     session.refresh(db_user)
     return db_user
 
 
+async def update_user_async(
+    *, db: "Database", db_user: User, user_in: UserUpdate
+) -> User:
+    hashed_password = None
+    if user_in.password is not None:
+        hashed_password = await password_hasher.hash(user_in.password)
+    return await db.run(
+        update_user, db_user=db_user, user_in=user_in, hashed_password=hashed_password
+    )
+
+
+def delete_user_batch(*, session: Session, db_user: User) -> bool:
+    """
+    Delete the next settings.USER_DELETE_BATCH_SIZE items of the user, and the
+    user once they have no items left, without committing. If items are left,
+    the user is deactivated and the delete_user job enqueued for the next batch.
+
+    Returns whether the user was deleted.
+    """
+    batch = (
+        select(Item.id)
+        .where(Item.owner_id == db_user.id)
+        .limit(settings.USER_DELETE_BATCH_SIZE)
+    )
+    # As an array the batch is selected once and its items deleted through the
+    # primary key. With IN, stale statistics (e.g. right after a bulk insert)
+    # can lead to a plan scanning the items again for every item in the batch
+    result = cast(
+        CursorResult[Any],
+        session.execute(
+            delete(Item)
+            .where(col(Item.id) == any_(func.array(batch.scalar_subquery())))
+            .execution_options(synchronize_session=False)
+        ),
+    )
+    if result.rowcount < settings.USER_DELETE_BATCH_SIZE:
+        # Items created meanwhile are deleted by the database with the user
+        session.delete(db_user)
+        increment_counter(session=session, name=DELETED_USERS_COUNTER)
+        return True
+    db_user.is_active = False
+    session.add(db_user)
+    mark_items_changed(session=session, owner_ids=[db_user.id])
+    enqueue_job(session=session, name="delete_user", args={"user_id": str(db_user.id)})
+    return False
+
+
+def delete_user(*, session: Session, db_user: User) -> bool:
+    """
+    Delete the user and their items, in batches so that no transaction locks
+    all of the items of a user with many. Users with more than one batch are
+    deactivated and deleted in the background by the delete_user job.
+
+    Returns whether the user was deleted right away.
+    """
+    revoke_token_claims(session=session, db_user=db_user)
+    deleted = delete_user_batch(session=session, db_user=db_user)
+    session.commit()
+    user_cache.delete(str(db_user.id))
+    items_cache.invalidate([db_user.id])
+    return deleted
+
+
 def get_user_by_email(*, session: Session, email: str) -> User | None:
     statement = select(User).where(User.email == email)
     session_user = session.exec(statement).first()
@@ -60,9 +220,256 @@ def authenticate(*, session: Session, email: str, password: str) -> User | None:
     return db_user
 
 
+async def authenticate_async(
+    *, db: "Database", email: str, password: str
+) -> User | None:
+    db_user = await db.run(get_user_by_email, email=email)
+    if not db_user:
+        await password_hasher.verify(password, DUMMY_HASH)
+        return None
+    verified, updated_password_hash = await password_hasher.verify(
+        password, db_user.hashed_password
+    )
+    if not verified:
+        return None
+    if updated_password_hash:
+        db_user.hashed_password = updated_password_hash
+        await db.run(save_user, db_user=db_user)
+    return db_user
+
+
+def _mark_items_changed(owner_ids: Any) -> Any:
+    """
+    Statement marking the items of the owners as changed for ETags, returning
+    their new versions. `owner_ids` is a collection of ids or a SELECT of them.
+
+    The owners are locked in id order first, so concurrent writes to the items
+    of several owners lock them in the same order and can't deadlock.
+    """
+    locked = (
+        select(User.id)
+        .where(col(User.id).in_(owner_ids))
+        .order_by(col(User.id))
+        .with_for_update()
+        .subquery("locked")
+    )
+    return (
+        update(User)
+        .where(col(User.id) == locked.c.id)
+        .values(items_version=col(User.items_version) + 1)
+        .returning(col(User.id), col(User.items_version))
+        .execution_options(synchronize_session=False)
+    )
+
+
+def mark_items_changed(
+    *, session: Session, owner_ids: Collection[uuid.UUID]
+) -> dict[uuid.UUID, int]:
+    """
+    Mark the items of the owners as changed for ETags, without committing.
+
+    Returns the new versions of the owners' items.
+    """
+    if not owner_ids:
+        return {}
+    result = session.execute(_mark_items_changed(owner_ids))
+    return dict(result.tuples().all())
+
+
+def commit_item_versions(*, session: Session, versions: dict[uuid.UUID, int]) -> None:
+    """
+    Commit changes to the items of owners already marked as changed, with
+    their new `versions`, invalidating them in the items cache.
+    """
+    session.commit()
+    items_cache.invalidate(versions.keys(), versions)
+
+
+def commit_item_changes(*, session: Session, owner_ids: Collection[uuid.UUID]) -> None:
+    """
+    Commit changes to the items of the owners, marking their items as changed
+    for ETags and the items cache.
+    """
+    versions = mark_items_changed(session=session, owner_ids=owner_ids)
+    commit_item_versions(session=session, versions=versions)
+
+
 def create_item(*, session: Session, item_in: ItemCreate, owner_id: uuid.UUID) -> Item:
+    """
+    Create the item and mark its owner's items as changed in a single
+    statement. Every column is set client-side, so nothing is selected back.
+    """
     db_item = Item.model_validate(item_in, update={"owner_id": owner_id})
-    session.add(db_item)
-    session.commit()
-    session.refresh(db_item)
+    created = insert(Item).values(db_item.model_dump()).returning(col(Item.owner_id))
+    created_cte = created.cte("created")
+    marked = _mark_items_changed(select(created_cte.c.owner_id)).cte("marked")
+    statement = select(marked.c.id, marked.c.items_version)
+    versions = dict(session.execute(statement).tuples().all())
+    commit_item_versions(session=session, versions=versions)
     return db_item
+
+
+def get_item(*, session: Session, id: uuid.UUID) -> Item | None:
+    return session.get(Item, id)
+
+
+def _owned_by(owner_id: uuid.UUID | None) -> list[Any]:
+    return [] if owner_id is None else [col(Item.owner_id) == owner_id]
+
+
+def get_item_version(
+    *, session: Session, id: uuid.UUID
+) -> tuple[uuid.UUID, int] | None:
+    """
+    Owner and version of the item, without loading the rest of it.
+    """
+    statement = select(Item.owner_id, Item.version).where(Item.id == id)
+    return session.exec(statement).first()
+
+
+def update_item(
+    *,
+    session: Session,
+    id: uuid.UUID,
+    item_in: ItemUpdate,
+    owner_id: uuid.UUID | None = None,
+    versions: Collection[int] | None = None,
+) -> Item | None:
+    """
+    Update the item and mark its owner's items as changed in a single statement,
+    restricted to the items of `owner_id` when given and to an item at one of
+    `versions` when given. Returns None if no item matched.
+    """
+    conditions = [col(Item.id) == id, *_owned_by(owner_id)]
+    if versions is not None:
+        conditions.append(col(Item.version).in_(versions))
+    update_dict = item_in.model_dump(exclude_unset=True)
+    if not update_dict:
+        return session.exec(select(Item).where(*conditions)).first()
+    changed = (
+        update(Item)
+        .where(*conditions)
+        .values({**update_dict, "version": col(Item.version) + 1})
+        .returning(Item)
+        .cte("changed")
+    )
+    marked = _mark_items_changed(select(changed.c.owner_id)).cte("marked")
+    statement = select(aliased(Item, changed), marked.c.items_version).join(
+        marked, marked.c.id == changed.c.owner_id
+    )
+    row = session.execute(statement).tuples().first()
+    if row is None:
+        session.commit()
+        return None
+    db_item: Item = row[0]
+    items_version: int = row[1]
+    session.expunge(db_item)
+    commit_item_versions(session=session, versions={db_item.owner_id: items_version})
+    return db_item
+
+
+def delete_item(
+    *, session: Session, id: uuid.UUID, owner_id: uuid.UUID | None = None
+) -> bool:
+    """
+    Delete the item and mark its owner's items as changed in a single
+    statement, restricted to the items of `owner_id` when given. Returns
+    whether an item was deleted.
+    """
+    deleted = (
+        delete(Item)
+        .where(col(Item.id) == id, *_owned_by(owner_id))
+        .returning(col(Item.owner_id))
+        .cte("deleted")
+    )
+    marked = _mark_items_changed(select(deleted.c.owner_id)).cte("marked")
+    statement = select(marked.c.id, marked.c.items_version)
+    versions = dict(session.execute(statement).tuples().all())
+    commit_item_versions(session=session, versions=versions)
+    return bool(versions)
+
+
+def create_items(
+    *, session: Session, items_in: list[ItemCreate], owner_id: uuid.UUID
+) -> list[Item]:
+    """
+    Create all items in one transaction, the flush batches them into multi-row
+    INSERTs.
+    """
+    db_items = [Item(**item_in.model_dump(), owner_id=owner_id) for item_in in items_in]
+    session.add_all(db_items)
+    session.flush()
+    for db_item in db_items:
+        session.expunge(db_item)
+    commit_item_changes(session=session, owner_ids=[owner_id])
+    return db_items
+
+
+def update_items(
+    *,
+    session: Session,
+    items_in: list[ItemBulkUpdate],
+    owner_id: uuid.UUID | None = None,
+) -> dict[uuid.UUID, Item | None]:
+    """
+    Update all items in one transaction, restricted to the items of `owner_id`
+    when given.
+
+    Maps the id of every existing item to the updated item, or to None if it
+    belongs to someone else. Ids of missing items are left out.
+    """
+    ids = [item_in.id for item_in in items_in]
+    # Locked in id order, like the owners, so concurrent bulk updates can't
+    # deadlock
+    statement = (
+        select(Item)
+        .where(col(Item.id).in_(ids))
+        .order_by(col(Item.id))
+        .with_for_update()
+    )
+    db_items = {db_item.id: db_item for db_item in session.exec(statement)}
+    results: dict[uuid.UUID, Item | None] = {}
+    for item_in in items_in:
+        db_item = db_items.get(item_in.id)
+        if db_item is None:
+            continue
+        if owner_id is not None and db_item.owner_id != owner_id:
+            results[db_item.id] = None
+            continue
+        db_item.sqlmodel_update(item_in.model_dump(exclude_unset=True, exclude={"id"}))
+        db_item.version += 1
+        results[db_item.id] = db_item
+    session.flush()
+    for result in results.values():
+        if result is not None:
+            session.expunge(result)
+    commit_item_changes(
+        session=session,
+        owner_ids={result.owner_id for result in results.values() if result},
+    )
+    return results
+
+
+def delete_items(
+    *, session: Session, ids: list[uuid.UUID], owner_id: uuid.UUID | None = None
+) -> dict[uuid.UUID, bool]:
+    """
+    Delete all items in one transaction, restricted to the items of `owner_id`
+    when given.
+
+    Maps the id of every existing item to whether it was deleted, which it
+    isn't if it belongs to someone else. Ids of missing items are left out.
+    """
+    statement = (
+        delete(Item)
+        .where(col(Item.id).in_(ids), *_owned_by(owner_id))
+        .returning(col(Item.id), col(Item.owner_id))
+    )
+    deleted = session.execute(statement).all()
+    results = dict.fromkeys((row.id for row in deleted), True)
+    if len(results) < len(set(ids)):
+        remaining = [id for id in ids if id not in results]
+        statement_ids = select(Item.id).where(col(Item.id).in_(remaining))
+        results.update(dict.fromkeys(session.exec(statement_ids), False))
+    commit_item_changes(session=session, owner_ids={row.owner_id for row in deleted})
+    return results
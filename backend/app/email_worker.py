@@ -0,0 +1,131 @@
+"""
+Send the emails queued with `app.utils.queue_email`.
+
+Due emails are claimed in batches with SELECT ... FOR UPDATE SKIP LOCKED, so
+several workers can run side by side, and sent over an SMTP connection that
+stays open while there are emails to send. Sent emails are deleted. Emails the
+server rejects permanently, or that failed EMAIL_OUTBOX_MAX_ATTEMPTS times, are
+marked as dead and kept for inspection.
+
+A batch is committed once all of its emails were tried, so emails of a batch
+interrupted by a crash are sent again.
+
+Run it from the backend directory with `python app/email_worker.py`.
+"""
+
+import logging
+import random
+import signal
+import time
+from collections.abc import Sequence
+from datetime import datetime, timedelta, timezone
+
+from emails.backend.smtp.backend import SMTPBackend
+from sqlmodel import Session, col, func, select
+
+from app.core.config import settings
+from app.core.db import engine
+from app.models import EmailOutbox
+from app.utils import get_smtp_options, send_email
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+MAX_RETRY_SECONDS = 60 * 60
+
+
+def claim_emails(session: Session, *, limit: int) -> Sequence[EmailOutbox]:
+    statement = (
+        select(EmailOutbox)
+        .where(
+            col(EmailOutbox.dead_at).is_(None),
+            col(EmailOutbox.next_attempt_at) <= func.now(),
+        )
+        .order_by(col(EmailOutbox.next_attempt_at))
+        .limit(limit)
+        .with_for_update(skip_locked=True)
+    )
+    return session.exec(statement).all()
+
+
+def retry_delay(attempts: int) -> float:
+    # Exponential backoff with jitter, so failed batches don't retry in lockstep
+    delay = settings.EMAIL_OUTBOX_RETRY_SECONDS * 2.0 ** (attempts - 1)
+    return min(delay, MAX_RETRY_SECONDS) * random.uniform(0.5, 1)
+
+
+def record_failure(email: EmailOutbox, *, error: str, permanent: bool) -> None:
+    email.attempts += 1
+    email.last_error = error
+    now = datetime.now(timezone.utc)
+    if permanent or email.attempts >= settings.EMAIL_OUTBOX_MAX_ATTEMPTS:
+        logger.error(f"Giving up on email {email.id}: {error}")
+        email.dead_at = now
+    else:
+        logger.warning(f"Failed to send email {email.id}: {error}")
+        email.next_attempt_at = now + timedelta(seconds=retry_delay(email.attempts))
+
+
+def send_batch(session: Session, smtp: SMTPBackend) -> int:
+    """
+    Send the next batch of due emails, returns how many were tried.
+    """
+    batch = claim_emails(session, limit=settings.EMAIL_OUTBOX_BATCH_SIZE)
+    for email in batch:
+        try:
+            response = send_email(
+                email_to=email.email_to,
+                subject=email.subject,
+                html_content=email.html_content,
+                smtp=smtp,
+            )
+        except Exception as e:
+            # Retried like a failed response, so that one email can't stop the
+            # batch and have the emails sent before it sent again
+            logger.exception(f"Error sending email {email.id}")
+            # The connection might be left in an unknown state
+            smtp.close()
+            record_failure(email, error=repr(e), permanent=False)
+            session.add(email)
+            continue
+        if response.success:
+            session.delete(email)
+            continue
+        # 5xx replies are permanent failures, retrying won't help
+        record_failure(
+            email,
+            error=str(
+                response.error or f"{response.status_code} {response.status_text!r}"
+            ),
+            permanent=response.status_code is not None and response.status_code >= 500,
+        )
+        session.add(email)
+    session.commit()
+    return len(batch)
+
+
+def main() -> None:
+    if not settings.emails_enabled:
+        # Nothing is queued without an email configuration. Waiting instead of
+        # exiting keeps a service that's always restarted from crash-looping
+        logger.warning(
+            "Emails are not configured, set SMTP_HOST and EMAILS_FROM_EMAIL to "
+            "send them"
+        )
+        signal.pause()
+        return
+    logger.info("Sending queued emails")
+    smtp = SMTPBackend(**get_smtp_options())
+    try:
+        with Session(engine) as session:
+            while True:
+                if not send_batch(session, smtp):
+                    # Servers drop idle connections anyway
+                    smtp.close()
+                    time.sleep(settings.EMAIL_OUTBOX_POLL_SECONDS)
+    finally:
+        smtp.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+"""
+Run the jobs enqueued with `app.core.jobs.enqueue_job`.
+
+Runs JOB_WORKER_CONCURRENCY jobs at once, each in its own thread and database
+connection. Jobs are claimed with SELECT ... FOR UPDATE SKIP LOCKED, so several
+workers can run side by side, and their changes are committed together with
+their removal from the queue. A job interrupted by a crash is rolled back and
+run again.
+
+Jobs that run periodically, e.g. delete_token_revocations, are enqueued when
+the worker starts if they aren't queued already, and enqueue their next run.
+
+Run it from the backend directory with `python app/job_worker.py`, it stops
+after the running jobs on SIGTERM or SIGINT.
+"""
+
+import logging
+import signal
+import threading
+from typing import Any
+
+from sqlmodel import Session
+
+from app.core.config import settings
+from app.core.db import engine
+from app.core.jobs import jobs, run_next_job
+from app.jobs import enqueue_periodic_jobs
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def work(stop: threading.Event) -> None:
+    with Session(engine) as session:
+        while not stop.is_set():
+            try:
+                ran = run_next_job(session)
+            except Exception:
+                # E.g. the database is unreachable, try again after polling
+                logger.exception("Failed to run jobs")
+                session.rollback()
+                ran = False
+            if not ran:
+                stop.wait(settings.JOB_POLL_SECONDS)
+
+
+def main() -> None:
+    logger.info(f"Running jobs: {', '.join(sorted(jobs))}")
+    with Session(engine) as session:
+        enqueue_periodic_jobs(session)
+    stop = threading.Event()
+
+    def handle_signal(*_: Any) -> None:
+        logger.info("Stopping after the running jobs")
+        stop.set()
+
+    signal.signal(signal.SIGTERM, handle_signal)
+    signal.signal(signal.SIGINT, handle_signal)
+    threads = [
+        threading.Thread(target=work, args=(stop,), name=f"job-worker-{i}")
+        for i in range(settings.JOB_WORKER_CONCURRENCY)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+
+if __name__ == "__main__":
+    main()
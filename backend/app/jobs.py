@@ -0,0 +1,65 @@
+"""
+Jobs run by app.job_worker, enqueued with `app.core.jobs.enqueue_job`.
+"""
+
+import uuid
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import delete
+from sqlmodel import Session, col, func, select
+
+from app import crud
+from app.core.config import settings
+from app.core.jobs import enqueue_job, job
+from app.models import Job, TokenRevocation, User
+
+# Seconds between runs of delete_token_revocations
+TOKEN_REVOCATIONS_CLEANUP_SECONDS = 60 * 60
+
+
+@job
+def delete_token_revocations(session: Session) -> None:
+    """
+    Delete token revocations older than the access token lifetime, they can't
+    affect valid tokens anymore. Runs again TOKEN_REVOCATIONS_CLEANUP_SECONDS
+    later.
+    """
+    expired = datetime.now(timezone.utc) - timedelta(
+        minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES
+    )
+    session.execute(
+        delete(TokenRevocation).where(col(TokenRevocation.created_at) < expired)
+    )
+    enqueue_job(
+        session=session,
+        name="delete_token_revocations",
+        delay=TOKEN_REVOCATIONS_CLEANUP_SECONDS,
+    )
+
+
+@job
+def delete_user(session: Session, user_id: str) -> None:
+    """
+    Delete the next batch of items of a user deleted with `crud.delete_user`,
+    and the user once they have no items left.
+    """
+    db_user = session.get(User, uuid.UUID(user_id))
+    if db_user is not None:
+        crud.delete_user_batch(session=session, db_user=db_user)
+
+
+def enqueue_periodic_jobs(session: Session) -> None:
+    """
+    Enqueue the jobs that re-enqueue themselves, unless they're queued already,
+    e.g. on a new database or after they failed every attempt. Commits.
+    """
+    # Workers starting together wait for each other, so they don't both enqueue
+    session.execute(select(func.pg_advisory_xact_lock(func.hashtext("periodic_jobs"))))
+    queued = session.exec(
+        select(Job.id).where(
+            Job.name == "delete_token_revocations", col(Job.failed_at).is_(None)
+        )
+    ).first()
+    if queued is None:
+        enqueue_job(session=session, name="delete_token_revocations")
+    session.commit()
@@ -1,25 +1,65 @@
+import secrets
+from collections.abc import AsyncGenerator
+from contextlib import asynccontextmanager
+from typing import Annotated
+
 import sentry_sdk
-from fastapi import FastAPI
+from fastapi import FastAPI, Header, HTTPException, Request
+from fastapi.responses import JSONResponse, Response
 from fastapi.routing import APIRoute
+from prometheus_client import CONTENT_TYPE_LATEST
 from starlette.middleware.cors import CORSMiddleware
 
 from app.api.main import api_router
 from app.core.config import settings
+from app.core.db import async_engine, async_replica_engines, check_pool_capacity
+from app.core.hashing import PasswordHashQueueFull, password_hasher
+from app.core.metrics import MetricsMiddleware, generate_metrics, mark_process_dead
+from app.core.replicas import ReadYourWritesMiddleware
+from app.core.sql_stats import SQLStatsMiddleware
+from app.core.tracing import TracesSampler
+from app.utils import load_email_templates
 
 
 def custom_generate_unique_id(route: APIRoute) -> str:
     return f"{route.tags[0]}-{route.name}"
 
 
-if settings.SENTRY_DSN and settings.ENVIRONMENT != "local":
-    sentry_sdk.init(dsn=str(settings.SENTRY_DSN), enable_tracing=True)
+@asynccontextmanager
+async def lifespan(app: FastAPI) -> AsyncGenerator[None, None]:  # noqa: ARG001
+    check_pool_capacity()
+    load_email_templates()
+    yield
+    # Async connections are tied to the event loop that opened them
+    await async_engine.dispose()
+    for async_replica_engine in async_replica_engines:
+        await async_replica_engine.dispose()
+    password_hasher.shutdown()
+    mark_process_dead()
+
 
 app = FastAPI(
     title=settings.PROJECT_NAME,
     openapi_url=f"{settings.API_V1_STR}/openapi.json",
     generate_unique_id_function=custom_generate_unique_id,
+    lifespan=lifespan,
 )
 
+if settings.SENTRY_DSN and settings.ENVIRONMENT != "local":
+    # Before the middleware and routes are added, so that they are instrumented
+    traces_sampler = TracesSampler(
+        app.router,
+        default_rate=settings.SENTRY_TRACES_SAMPLE_RATE,
+        rates=settings.SENTRY_TRACES_SAMPLE_RATES,
+        max_per_second=settings.SENTRY_TRACES_MAX_PER_SECOND,
+        error_seconds=settings.SENTRY_TRACES_ERROR_SECONDS,
+    )
+    sentry_sdk.init(
+        dsn=str(settings.SENTRY_DSN),
+        traces_sampler=traces_sampler,
+        before_send=traces_sampler.before_send,
+    )
+
 # Set all CORS enabled origins
 if settings.all_cors_origins:
     app.add_middleware(
@@ -28,6 +68,44 @@ if settings.all_cors_origins:
         allow_credentials=True,
         allow_methods=["*"],
         allow_headers=["*"],
+        # Needed by clients to send If-Match
+        expose_headers=["ETag"],
     )
 
+if settings.DB_REPLICA_URIS:
+    app.add_middleware(ReadYourWritesMiddleware)
+
+if settings.SQL_STATS_ENABLED:
+    app.add_middleware(SQLStatsMiddleware)
+
+if settings.metrics_enabled:
+    app.add_middleware(MetricsMiddleware, router=app.router)
+
+    @app.get("/metrics", tags=["metrics"], include_in_schema=False)
+    async def metrics(
+        authorization: Annotated[str | None, Header()] = None,
+    ) -> Response:
+        if settings.METRICS_TOKEN and not secrets.compare_digest(
+            (authorization or "").encode(), f"Bearer {settings.METRICS_TOKEN}".encode()
+        ):
+            raise HTTPException(
+                status_code=401,
+                detail="Not authenticated",
+                headers={"WWW-Authenticate": "Bearer"},
+            )
+        return Response(generate_metrics(), media_type=CONTENT_TYPE_LATEST)
+
+
+@app.exception_handler(PasswordHashQueueFull)
+async def password_hash_queue_full_handler(
+    request: Request,  # noqa: ARG001
+    exc: PasswordHashQueueFull,  # noqa: ARG001
+) -> JSONResponse:
+    return JSONResponse(
+        status_code=503,
+        content={"detail": "Server is busy, please try again later"},
+        headers={"Retry-After": "1"},
+    )
+
+
 app.include_router(api_router, prefix=settings.API_V1_STR)
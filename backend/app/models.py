@@ -1,8 +1,10 @@
 import uuid
 from datetime import datetime, timezone
+from typing import Any
 
 from pydantic import EmailStr
-from sqlalchemy import DateTime
+from sqlalchemy import Column, Computed, DateTime, Index, text
+from sqlalchemy.dialects.postgresql import JSONB, TSVECTOR
 from sqlmodel import Field, Relationship, SQLModel
 
 
@@ -47,13 +49,25 @@ class UpdatePassword(SQLModel):
 
 # Database model, database table inferred from class name
 class User(UserBase, table=True):
+    __table_args__ = (
+        # Support cursor pagination, see app.api.pagination
+        Index("ix_user_created_at_id", text("created_at DESC"), "id"),
+    )
+
     id: uuid.UUID = Field(default_factory=uuid.uuid4, primary_key=True)
     hashed_password: str
     created_at: datetime | None = Field(
         default_factory=get_datetime_utc,
         sa_type=DateTime(timezone=True),  # type: ignore
     )
-    items: list["Item"] = Relationship(back_populates="owner", cascade_delete=True)
+    # Incremented whenever is_active or is_superuser change, see TokenRevocation
+    token_version: int = Field(default=0, sa_column_kwargs={"server_default": "0"})
+    # Incremented whenever any item of the user changes, see app.api.etags
+    items_version: int = Field(default=0, sa_column_kwargs={"server_default": "0"})
+    # Deleted by the database's ON DELETE CASCADE, without loading them
+    items: list["Item"] = Relationship(
+        back_populates="owner", cascade_delete=True, passive_deletes=True
+    )
 
 
 # Properties to return via API, id is always required
@@ -64,7 +78,8 @@ class UserPublic(UserBase):
 
 class UsersPublic(SQLModel):
     data: list[UserPublic]
-    count: int
+    count: int | None
+    next_cursor: str | None = None
 
 
 # Shared properties
@@ -83,8 +98,39 @@ class ItemUpdate(ItemBase):
     title: str | None = Field(default=None, min_length=1, max_length=255)  # type: ignore
 
 
+# Text search document of an item, the title ranks above the description
+ITEM_SEARCH_VECTOR = (
+    "setweight(to_tsvector('simple', coalesce(title, '')), 'A') || "
+    "setweight(to_tsvector('simple', coalesce(description, '')), 'B')"
+)
+
+
 # Database model, database table inferred from class name
 class Item(ItemBase, table=True):
+    __table_args__ = (
+        # Support cursor pagination, see app.api.pagination
+        Index("ix_item_created_at_id", text("created_at DESC"), "id"),
+        Index(
+            "ix_item_owner_id_created_at_id", "owner_id", text("created_at DESC"), "id"
+        ),
+        # Support search, see app.api.routes.items. The generated column is only
+        # used in queries, so it isn't loaded with the items
+        Column(
+            "search_vector",
+            TSVECTOR,
+            Computed(ITEM_SEARCH_VECTOR, persisted=True),
+            nullable=True,
+        ),
+        Index("ix_item_search_vector", "search_vector", postgresql_using="gin"),
+        Index(
+            "ix_item_title_trgm",
+            "title",
+            postgresql_using="gin",
+            postgresql_ops={"title": "gin_trgm_ops"},
+        ),
+    )
+    __mapper_args__ = {"exclude_properties": ["search_vector"]}
+
     id: uuid.UUID = Field(default_factory=uuid.uuid4, primary_key=True)
     created_at: datetime | None = Field(
         default_factory=get_datetime_utc,
@@ -93,6 +139,8 @@ class Item(ItemBase, table=True):
     owner_id: uuid.UUID = Field(
         foreign_key="user.id", nullable=False, ondelete="CASCADE"
     )
+    # Incremented on every update, see app.api.etags
+    version: int = Field(default=0, sa_column_kwargs={"server_default": "0"})
     owner: User | None = Relationship(back_populates="items")
 
 
@@ -105,7 +153,25 @@ class ItemPublic(ItemBase):
 
 class ItemsPublic(SQLModel):
     data: list[ItemPublic]
-    count: int
+    count: int | None
+    next_cursor: str | None = None
+
+
+# Properties to receive on bulk item update
+class ItemBulkUpdate(ItemUpdate):
+    id: uuid.UUID
+
+
+# Outcome of one row of a bulk item request, status is the HTTP status the
+# single item endpoint would have returned
+class ItemBulkResult(SQLModel):
+    id: uuid.UUID
+    status: int
+    item: ItemPublic | None = None
+
+
+class ItemsBulkResults(SQLModel):
+    data: list[ItemBulkResult]
 
 
 # Generic message
@@ -113,15 +179,122 @@ class Message(SQLModel):
     message: str
 
 
+# Connection pool usage of a database engine in the current worker
+class DatabasePoolStats(SQLModel):
+    size: int
+    checked_out: int
+    overflow: int
+    checkouts: int
+    timeouts: int
+    wait_seconds: float
+    max_wait_seconds: float
+
+
+# Lookups of a response cache in the current worker
+class ResponseCacheStats(SQLModel):
+    backend: str
+    hits: int
+    misses: int
+    hit_ratio: float
+
+
 # JSON payload containing access token
 class Token(SQLModel):
     access_token: str
     token_type: str = "bearer"
 
 
-# Contents of JWT token
+# Contents of JWT token, the user flags are only set with AUTH_TRUST_TOKEN_CLAIMS
 class TokenPayload(SQLModel):
     sub: str | None = None
+    is_active: bool | None = None
+    is_superuser: bool | None = None
+    ver: int | None = None
+
+
+# Database model, one row per change that makes older token claims stale
+class TokenRevocation(SQLModel, table=True):
+    id: int | None = Field(default=None, primary_key=True)
+    user_id: uuid.UUID
+    token_version: int
+    created_at: datetime | None = Field(
+        default_factory=get_datetime_utc,
+        sa_type=DateTime(timezone=True),  # type: ignore
+        index=True,
+    )
+
+
+# Database model, emails waiting to be sent by app.email_worker. Sent emails are
+# deleted, ones that can't be sent are kept with dead_at set
+class EmailOutbox(SQLModel, table=True):
+    __table_args__ = (
+        # Support claiming the emails that are due, see app.email_worker
+        Index(
+            "ix_emailoutbox_next_attempt_at",
+            "next_attempt_at",
+            postgresql_where=text("dead_at IS NULL"),
+        ),
+    )
+
+    id: int | None = Field(default=None, primary_key=True)
+    email_to: str = Field(max_length=255)
+    subject: str
+    html_content: str
+    attempts: int = 0
+    last_error: str | None = None
+    created_at: datetime | None = Field(
+        default_factory=get_datetime_utc,
+        sa_type=DateTime(timezone=True),  # type: ignore
+    )
+    next_attempt_at: datetime = Field(
+        default_factory=get_datetime_utc,
+        sa_type=DateTime(timezone=True),  # type: ignore
+    )
+    dead_at: datetime | None = Field(
+        default=None,
+        sa_type=DateTime(timezone=True),  # type: ignore
+    )
+
+
+# Database model, jobs waiting to be run by app.job_worker. Finished jobs are
+# deleted, ones that failed every attempt are kept with failed_at set
+class Job(SQLModel, table=True):
+    __table_args__ = (
+        # Support claiming the next job that is due, see app.core.jobs
+        Index(
+            "ix_job_priority_run_at",
+            text("priority DESC"),
+            "run_at",
+            postgresql_where=text("failed_at IS NULL"),
+        ),
+    )
+
+    id: int | None = Field(default=None, primary_key=True)
+    name: str = Field(max_length=255)
+    args: dict[str, Any] = Field(default_factory=dict, sa_type=JSONB)
+    # Jobs with a higher priority run first
+    priority: int = 0
+    attempts: int = 0
+    max_attempts: int
+    last_error: str | None = None
+    created_at: datetime | None = Field(
+        default_factory=get_datetime_utc,
+        sa_type=DateTime(timezone=True),  # type: ignore
+    )
+    run_at: datetime = Field(
+        default_factory=get_datetime_utc,
+        sa_type=DateTime(timezone=True),  # type: ignore
+    )
+    failed_at: datetime | None = Field(
+        default=None,
+        sa_type=DateTime(timezone=True),  # type: ignore
+    )
+
+
+# Database model, counters that only ever increase, e.g. DELETED_USERS_COUNTER
+class Counter(SQLModel, table=True):
+    name: str = Field(primary_key=True, max_length=255)
+    value: int = 0
 
 
 class NewPassword(SQLModel):
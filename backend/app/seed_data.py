@@ -0,0 +1,221 @@
+"""
+Seed a performance environment with `--users` users owning `--items` items each
+on average, e.g. 10M items from the backend directory:
+
+    python app/seed_data.py --users 100000 --items 100
+
+Items per user follow a Pareto distribution, so like in a real deployment most
+users have a few items and a few users have most of them. Everything but the
+password hash is derived from `--seed`: the same arguments always generate the
+same users and items. All users share the password `--password`, hashed once.
+
+Rows are loaded with COPY in transactions of about LOAD_BATCH_SIZE items, each
+with the users it covers and all of their items. Seeded users that already exist
+are skipped, so running it again does nothing and an interrupted run can be
+resumed.
+"""
+
+import argparse
+import logging
+import math
+import random
+import time
+import uuid
+from collections.abc import Iterator
+from datetime import datetime, timedelta, timezone
+from typing import Any
+
+import psycopg
+from sqlmodel import Session, col, select, text
+
+from app.core.db import engine
+from app.core.security import get_password_hash
+from app.models import User
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Items loaded per transaction
+LOAD_BATCH_SIZE = 100_000
+# Shape of the Pareto distribution of items per user, 1.16 gives 80% of the items
+# to 20% of the users
+PARETO_ALPHA = 1.16
+# Users are created during the year before SEED_END, and their items between
+# their creation and SEED_END
+SEED_END = datetime(2025, 1, 1, tzinfo=timezone.utc)
+SEED_SPAN_SECONDS = 365 * 24 * 60 * 60
+
+FIRST_NAMES = ["Alice", "Bob", "Carol", "Dave", "Erin", "Frank", "Grace", "Heidi"]
+LAST_NAMES = ["Smith", "Jones", "Garcia", "Chen", "Müller", "Rossi", "Silva", "Kim"]
+ADJECTIVES = ["red", "green", "blue", "small", "large", "round", "square", "old"]
+NOUNS = ["chair", "lamp", "book", "bike", "phone", "table", "plant", "clock"]
+DESCRIPTIONS = [
+    "Bought last year, barely used",
+    "A gift from a friend",
+    "Needs some repairs",
+    "Kept in the garage",
+]
+
+
+def seed_email(seed: int, n: int) -> str:
+    return f"seed-{seed}-{n}@example.com"
+
+
+def items_per_user(*, users: int, items: int, seed: int) -> list[int]:
+    """
+    Split `users * items` items between `users` users, with Pareto distributed
+    weights.
+    """
+    rng = random.Random(seed)
+    weights = [rng.paretovariate(PARETO_ALPHA) for _ in range(users)]
+    total = users * items
+    scale = total / sum(weights)
+    shares = [weight * scale for weight in weights]
+    counts = [math.floor(share) for share in shares]
+    # Hand the items lost to rounding down to the largest remainders
+    remainders = sorted(range(users), key=lambda n: shares[n] - counts[n], reverse=True)
+    for n in remainders[: total - sum(counts)]:
+        counts[n] += 1
+    return counts
+
+
+def generate_user(
+    *, seed: int, n: int, item_count: int, hashed_password: str
+) -> tuple[tuple[Any, ...], list[tuple[Any, ...]]]:
+    """
+    The user row and item rows of the `n`th seeded user.
+    """
+    rng = random.Random(f"{seed}:{n}")
+    user_id = uuid.UUID(int=rng.getrandbits(128), version=4)
+    age = rng.random() * SEED_SPAN_SECONDS
+    user = (
+        user_id,
+        seed_email(seed, n),
+        f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}",
+        hashed_password,
+        SEED_END - timedelta(seconds=age),
+    )
+    items = [
+        (
+            uuid.UUID(int=rng.getrandbits(128), version=4),
+            f"{rng.choice(ADJECTIVES)} {rng.choice(NOUNS)} {i}",
+            rng.choice(DESCRIPTIONS) if rng.random() < 0.5 else None,
+            user_id,
+            SEED_END - timedelta(seconds=rng.random() * age),
+        )
+        for i in range(item_count)
+    ]
+    return user, items
+
+
+def batches(counts: list[int], existing: set[str], seed: int) -> Iterator[list[int]]:
+    """
+    Group the users still to be seeded in batches of about LOAD_BATCH_SIZE items.
+    """
+    batch: list[int] = []
+    batch_items = 0
+    for n, count in enumerate(counts):
+        if seed_email(seed, n) in existing:
+            continue
+        batch.append(n)
+        batch_items += count
+        if batch_items >= LOAD_BATCH_SIZE:
+            yield batch
+            batch, batch_items = [], 0
+    if batch:
+        yield batch
+
+
+def load(
+    session: Session,
+    *,
+    seed: int,
+    ns: list[int],
+    counts: list[int],
+    hashed_password: str,
+) -> int:
+    """
+    COPY the users `ns` and their items, in the session's transaction.
+    """
+    connection = session.connection().connection.driver_connection
+    assert isinstance(connection, psycopg.Connection)
+    cursor = connection.cursor()
+    loaded = 0
+    with cursor.copy(
+        'COPY "user" (id, email, full_name, hashed_password, created_at, '
+        "is_active, is_superuser) FROM STDIN"
+    ) as user_copy:
+        items = []
+        for n in ns:
+            user, user_items = generate_user(
+                seed=seed, n=n, item_count=counts[n], hashed_password=hashed_password
+            )
+            user_copy.write_row((*user, True, False))
+            items.append(user_items)
+    with cursor.copy(
+        "COPY item (id, title, description, owner_id, created_at) FROM STDIN"
+    ) as item_copy:
+        for user_items in items:
+            for item in user_items:
+                item_copy.write_row(item)
+            loaded += len(user_items)
+    return loaded
+
+
+def seed_data(
+    session: Session, *, users: int, items: int, seed: int, password: str
+) -> None:
+    counts = items_per_user(users=users, items=items, seed=seed)
+    prefix = f"seed-{seed}-"
+    existing = set(
+        session.exec(select(User.email).where(col(User.email).startswith(prefix)))
+    )
+    if existing:
+        logger.info(f"Skipping {len(existing)} users seeded before")
+    hashed_password = get_password_hash(password)
+    start = time.perf_counter()
+    loaded_users = loaded_items = 0
+    for ns in batches(counts, existing, seed):
+        loaded_items += load(
+            session,
+            seed=seed,
+            ns=ns,
+            counts=counts,
+            hashed_password=hashed_password,
+        )
+        session.commit()
+        loaded_users += len(ns)
+        elapsed = time.perf_counter() - start
+        logger.info(
+            f"Loaded {loaded_users} users and {loaded_items} items in "
+            f"{elapsed:.0f} s ({loaded_items / elapsed:.0f} items/s)"
+        )
+    if loaded_users:
+        # Flush the pending lists of the GIN indexes and refresh the statistics
+        with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+            conn.execute(text('VACUUM ANALYZE "user", item'))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--users", type=int, default=10_000)
+    parser.add_argument("--items", type=int, default=100)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--password", default="changethis")
+    args = parser.parse_args()
+    logger.info("Seeding data")
+    with Session(engine) as session:
+        seed_data(
+            session,
+            users=args.users,
+            items=args.items,
+            seed=args.seed,
+            password=args.password,
+        )
+    logger.info("Data seeded")
+
+
+if __name__ == "__main__":
+    main()
@@ -6,11 +6,14 @@ from typing import Any
 
 import emails  # type: ignore
 import jwt
-from jinja2 import Template
+from emails.backend.smtp.backend import SMTPBackend
+from jinja2 import Environment, FileSystemBytecodeCache, FileSystemLoader
 from jwt.exceptions import InvalidTokenError
+from sqlmodel import Session
 
 from app.core import security
 from app.core.config import settings
+from app.models import EmailOutbox
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -22,37 +25,85 @@ class EmailData:
     subject: str
 
 
+# Compiled email templates, shared by the whole process. Templates are only
+# checked for changes on disk in local development
+email_templates = Environment(
+    loader=FileSystemLoader(Path(__file__).parent / "email-templates" / "build"),
+    auto_reload=settings.ENVIRONMENT == "local",
+    bytecode_cache=(
+        FileSystemBytecodeCache() if settings.EMAIL_TEMPLATES_BYTECODE_CACHE else None
+    ),
+)
+
+
+def load_email_templates() -> None:
+    """
+    Compile all email templates, so the first emails don't have to.
+    """
+    for template_name in email_templates.list_templates():
+        email_templates.get_template(template_name)
+
+
 def render_email_template(*, template_name: str, context: dict[str, Any]) -> str:
-    template_str = (
-        Path(__file__).parent / "email-templates" / "build" / template_name
-    ).read_text()
-    html_content = Template(template_str).render(context)
+    html_content = email_templates.get_template(template_name).render(context)
     return html_content
 
 
+def get_smtp_options() -> dict[str, Any]:
+    smtp_options: dict[str, Any] = {
+        "host": settings.SMTP_HOST,
+        "port": settings.SMTP_PORT,
+    }
+    if settings.SMTP_TLS:
+        smtp_options["tls"] = True
+    elif settings.SMTP_SSL:
+        smtp_options["ssl"] = True
+    if settings.SMTP_USER:
+        smtp_options["user"] = settings.SMTP_USER
+    if settings.SMTP_PASSWORD:
+        smtp_options["password"] = settings.SMTP_PASSWORD
+    return smtp_options
+
+
 def send_email(
     *,
     email_to: str,
     subject: str = "",
     html_content: str = "",
-) -> None:
+    smtp: SMTPBackend | None = None,
+) -> Any:
+    """
+    Send an email right away, over the connection of the `smtp` backend if
+    given. Returns the SMTP response. Requests should use `queue_email` instead.
+    """
     assert settings.emails_enabled, "no provided configuration for email variables"
     message = emails.Message(
         subject=subject,
         html=html_content,
         mail_from=(settings.EMAILS_FROM_NAME, settings.EMAILS_FROM_EMAIL),
     )
-    smtp_options = {"host": settings.SMTP_HOST, "port": settings.SMTP_PORT}
-    if settings.SMTP_TLS:
-        smtp_options["tls"] = True
-    elif settings.SMTP_SSL:
-        smtp_options["ssl"] = True
-    if settings.SMTP_USER:
-        smtp_options["user"] = settings.SMTP_USER
-    if settings.SMTP_PASSWORD:
-        smtp_options["password"] = settings.SMTP_PASSWORD
-    response = message.send(to=email_to, smtp=smtp_options)
+    response = message.send(to=email_to, smtp=smtp or get_smtp_options())
     logger.info(f"send email result: {response}")
+    return response
+
+
+def queue_email(
+    *,
+    session: Session,
+    email_to: str,
+    subject: str = "",
+    html_content: str = "",
+) -> None:
+    """
+    Queue an email for app.email_worker, it's sent once the session commits.
+    Without an email configuration there's no worker to send it, it's dropped.
+    """
+    if not settings.emails_enabled:
+        logger.warning(f"Emails are not configured, not sending {subject!r}")
+        return
+    session.add(
+        EmailOutbox(email_to=email_to, subject=subject, html_content=html_content)
+    )
 
 
 def generate_test_email(email_to: str) -> EmailData:
@@ -0,0 +1,95 @@
+"""
+Compare the sync (threadpool) and async (DB_ASYNC) database modes.
+
+Runs bursts of concurrent `GET /items/` requests in-process against the app
+for both modes and logs throughput and latency percentiles. Needs the same
+database as the app, e.g. from the backend directory:
+
+    python -m benchmarks.db_modes --requests 2000 --concurrency 200
+"""
+
+import argparse
+import asyncio
+import logging
+import statistics
+import time
+from unittest.mock import patch
+
+import httpx
+
+from app.core.config import settings
+from app.core.db import async_engine
+from app.main import app
+
+logging.basicConfig(level=logging.INFO)
+logging.getLogger("httpx").setLevel(logging.WARNING)
+logger = logging.getLogger(__name__)
+
+
+async def get_token(client: httpx.AsyncClient) -> str:
+    r = await client.post(
+        f"{settings.API_V1_STR}/login/access-token",
+        data={
+            "username": settings.FIRST_SUPERUSER,
+            "password": settings.FIRST_SUPERUSER_PASSWORD,
+        },
+    )
+    r.raise_for_status()
+    return str(r.json()["access_token"])
+
+
+async def run_mode(
+    client: httpx.AsyncClient, headers: dict[str, str], requests: int, concurrency: int
+) -> dict[str, float]:
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies: list[float] = []
+
+    async def one() -> None:
+        async with semaphore:
+            start = time.perf_counter()
+            r = await client.get(
+                f"{settings.API_V1_STR}/items/",
+                headers=headers,
+                params={"limit": 20, "count": "none"},
+            )
+            r.raise_for_status()
+            latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one() for _ in range(requests)))
+    elapsed = time.perf_counter() - start
+    quantiles = statistics.quantiles(latencies, n=100)
+    return {
+        "requests_per_second": requests / elapsed,
+        "p50_ms": quantiles[49] * 1000,
+        "p95_ms": quantiles[94] * 1000,
+        "p99_ms": quantiles[98] * 1000,
+    }
+
+
+async def main(requests: int, concurrency: int) -> None:
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(
+        transport=transport, base_url="http://bench"
+    ) as client:
+        headers = {"Authorization": f"Bearer {await get_token(client)}"}
+        for db_async in (False, True):
+            with patch.object(settings, "DB_ASYNC", db_async):
+                # Warm up connection pools before measuring
+                await run_mode(client, headers, concurrency, concurrency)
+                result = await run_mode(client, headers, requests, concurrency)
+            mode = "async" if db_async else "sync"
+            logger.info(
+                f"{mode}: {result['requests_per_second']:.0f} req/s, "
+                f"p50 {result['p50_ms']:.1f} ms, p95 {result['p95_ms']:.1f} ms, "
+                f"p99 {result['p99_ms']:.1f} ms"
+            )
+    await async_engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=200)
+    args = parser.parse_args()
+    asyncio.run(main(args.requests, args.concurrency))
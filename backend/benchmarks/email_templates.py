@@ -0,0 +1,60 @@
+"""
+Compare the CPU time spent rendering an email with and without the compiled
+template cache.
+
+Times generate_reset_password_email, which renders from app.utils.email_templates,
+against reading the template file and compiling it on every call, as it was
+done before. Doesn't need a database, e.g. from the backend directory:
+
+    python -m benchmarks.email_templates --calls 1000
+"""
+
+import argparse
+import logging
+from pathlib import Path
+from typing import Any
+
+from jinja2 import Template
+
+import app.utils
+from app.core.config import settings
+from app.utils import EmailData, generate_reset_password_email
+from benchmarks.serialization import cpu_time_per_call
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def render_uncached(*, template_name: str, context: dict[str, Any]) -> str:
+    template_str = (
+        Path(app.utils.__file__).parent / "email-templates" / "build" / template_name
+    ).read_text()
+    return Template(template_str).render(context)
+
+
+def generate(*_: Any) -> EmailData:
+    return generate_reset_password_email(
+        email_to="user@example.com", email="user@example.com", token="token"
+    )
+
+
+def main(calls: int) -> None:
+    cached = cpu_time_per_call(calls, generate)
+    render_email_template = app.utils.render_email_template
+    app.utils.render_email_template = render_uncached
+    try:
+        uncached = cpu_time_per_call(calls, generate)
+    finally:
+        app.utils.render_email_template = render_email_template
+    logger.info(
+        f"generate_reset_password_email ({settings.ENVIRONMENT}): "
+        f"uncached {uncached * 1e6:.0f} us, cached {cached * 1e6:.0f} us, "
+        f"{uncached / cached:.1f}x"
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--calls", type=int, default=1000)
+    args = parser.parse_args()
+    main(args.calls)
@@ -0,0 +1,130 @@
+"""
+Measure `GET /items/search` lookups on a large item table.
+
+Seeds `--rows` items owned by the first superuser with a single INSERT ...
+SELECT, then times the search query behind the endpoint for selective words,
+fuzzy title prefixes and common words, as a superuser so that every item is
+searched. Needs the same database as the app, e.g. from the backend directory:
+
+    python -m benchmarks.item_search --rows 10000000
+
+Each common word matches an eighth of the table and every match is ranked, so
+those lookups grow with the table while the selective ones stay flat.
+
+The seeded items are deleted afterwards unless --keep is given, and reused by
+later runs if kept.
+"""
+
+import argparse
+import logging
+import random
+import statistics
+import time
+from collections.abc import Callable
+
+from sqlmodel import Session, col, delete, func, select, text
+
+from app.api.routes.items import search_items_page
+from app.core.config import settings
+from app.core.db import engine
+from app.models import Item, User
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+DESCRIPTION = "search benchmark"
+COMMON_WORDS = ["red", "green", "blue", "small", "large", "round", "square", "old"]
+
+
+def seed(session: Session, rows: int) -> None:
+    owner = session.exec(
+        select(User).where(User.email == settings.FIRST_SUPERUSER)
+    ).one()
+    existing = session.exec(
+        select(func.count()).select_from(Item).where(Item.description == DESCRIPTION)
+    ).one()
+    if existing >= rows:
+        return
+    logger.info(f"Seeding {rows - existing} items")
+    start = time.perf_counter()
+    # Titles are a common word and a unique one, e.g. "blue 5f3c2a9e"
+    session.execute(
+        text(
+            "INSERT INTO item (id, title, description, owner_id, created_at) "
+            "SELECT gen_random_uuid(), "
+            "(CAST(:words AS text[]))[1 + g % :count] || ' ' || left(md5(g::text), 8), "
+            ":description, :owner_id, now() "
+            "FROM generate_series(:start, :stop) AS g"
+        ),
+        {
+            "words": COMMON_WORDS,
+            "count": len(COMMON_WORDS),
+            "description": DESCRIPTION,
+            "owner_id": owner.id,
+            "start": existing + 1,
+            "stop": rows,
+        },
+    )
+    session.commit()
+    # Flush the pending lists of the GIN indexes and refresh the statistics
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        conn.execute(text("VACUUM ANALYZE item"))
+    logger.info(f"Seeded in {time.perf_counter() - start:.0f} s")
+
+
+def measure(
+    session: Session, queries: Callable[[], str], lookups: int
+) -> dict[str, float]:
+    latencies: list[float] = []
+    for _ in range(lookups):
+        q = queries()
+        start = time.perf_counter()
+        search_items_page(session=session, owner_id=None, q=q, limit=20, cursor=None)
+        latencies.append(time.perf_counter() - start)
+    quantiles = statistics.quantiles(latencies, n=100)
+    return {
+        "p50_ms": quantiles[49] * 1000,
+        "p95_ms": quantiles[94] * 1000,
+        "p99_ms": quantiles[98] * 1000,
+    }
+
+
+def main(rows: int, lookups: int, keep: bool) -> None:
+    with Session(engine) as session:
+        seed(session, rows)
+
+        def unique_word() -> str:
+            title = session.exec(
+                select(col(Item.title))
+                .where(Item.description == DESCRIPTION)
+                .offset(random.randrange(min(rows, 10_000)))
+                .limit(1)
+            ).one()
+            return title.split()[-1]
+
+        words = [unique_word() for _ in range(lookups)]
+        scenarios: dict[str, Callable[[], str]] = {
+            "unique word": lambda: random.choice(words),
+            "fuzzy prefix": lambda: random.choice(words)[:6],
+            "common word": lambda: random.choice(COMMON_WORDS),
+        }
+        for name, queries in scenarios.items():
+            # Warm up caches before measuring
+            measure(session, queries, 10)
+            result = measure(session, queries, lookups)
+            logger.info(
+                f"{name}: p50 {result['p50_ms']:.1f} ms, "
+                f"p95 {result['p95_ms']:.1f} ms, p99 {result['p99_ms']:.1f} ms"
+            )
+        if not keep:
+            session.exec(delete(Item).where(col(Item.description) == DESCRIPTION))
+            session.commit()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--lookups", type=int, default=200)
+    parser.add_argument("--keep", action="store_true")
+    args = parser.parse_args()
+    main(args.rows, args.lookups, args.keep)
@@ -0,0 +1,366 @@
+"""
+Load test a running backend with realistic API scenarios.
+
+- login: a login storm on /login/access-token, every request verifies a
+  password hash
+- pagination: walks the pages of /items/ by cursor and fetches deep pages by
+  offset
+- crud: creates, reads, updates and deletes an item
+- signup: a burst of new users signing up
+
+Every scenario runs for --duration seconds with --concurrency virtual users
+looping over it. The latency percentiles, throughput, error rate and status
+codes of each request are written to a JSON file with stable keys, so that runs
+can be diffed between commits. The users and items it creates are deleted
+afterwards. E.g. against the local Docker Compose stack, from the backend
+directory:
+
+    python -m benchmarks.loadtest --url http://localhost:8000 --output before.json
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import math
+import random
+import subprocess
+import time
+import uuid
+from collections import Counter
+from collections.abc import Awaitable, Callable
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from typing import Any
+
+import httpx
+
+from app.core.config import settings
+
+logging.basicConfig(level=logging.INFO)
+logging.getLogger("httpx").setLevel(logging.WARNING)
+logger = logging.getLogger(__name__)
+
+PASSWORD = "loadtest-password"
+
+
+def percentile(values: list[float], q: float) -> float:
+    """
+    Nearest-rank percentile of sorted `values`.
+    """
+    return values[max(math.ceil(q / 100 * len(values)) - 1, 0)]
+
+
+@dataclass
+class RequestStats:
+    latencies: list[float] = field(default_factory=list)
+    errors: int = 0
+    status_codes: Counter[str] = field(default_factory=Counter)
+
+    def report(self, duration: float) -> dict[str, Any]:
+        latencies = sorted(self.latencies)
+        requests = len(latencies)
+        return {
+            "requests": requests,
+            "throughput_rps": round(requests / duration, 1),
+            "errors": self.errors,
+            "error_rate": round(self.errors / requests, 4) if requests else 0.0,
+            "status_codes": dict(sorted(self.status_codes.items())),
+            "latency_ms": {
+                name: round(value * 1000, 2)
+                for name, value in (
+                    ("p50", percentile(latencies, 50)),
+                    ("p95", percentile(latencies, 95)),
+                    ("p99", percentile(latencies, 99)),
+                    ("mean", sum(latencies) / requests),
+                    ("max", latencies[-1]),
+                )
+            }
+            if requests
+            else None,
+        }
+
+
+class LoadClient:
+    """
+    HTTP client recording the outcome of every request under a label.
+    """
+
+    def __init__(self, client: httpx.AsyncClient) -> None:
+        self.client = client
+        self.stats: dict[str, RequestStats] = {}
+
+    async def request(
+        self, label: str, method: str, path: str, **kwargs: Any
+    ) -> httpx.Response | None:
+        stats = self.stats.setdefault(label, RequestStats())
+        start = time.perf_counter()
+        try:
+            response = await self.client.request(
+                method, f"{settings.API_V1_STR}{path}", **kwargs
+            )
+        except httpx.HTTPError as e:
+            stats.latencies.append(time.perf_counter() - start)
+            stats.errors += 1
+            stats.status_codes[type(e).__name__] += 1
+            return None
+        stats.latencies.append(time.perf_counter() - start)
+        stats.status_codes[str(response.status_code)] += 1
+        if response.is_error:
+            stats.errors += 1
+            return None
+        return response
+
+
+@dataclass
+class Context:
+    """
+    The load test user, their items and the users created by the scenarios.
+    """
+
+    email: str
+    headers: dict[str, str]
+    items: int
+    created_user_ids: list[str] = field(default_factory=list)
+
+
+async def login(client: LoadClient, context: Context) -> None:
+    await client.request(
+        "POST /login/access-token",
+        "POST",
+        "/login/access-token",
+        data={"username": context.email, "password": PASSWORD},
+    )
+
+
+async def pagination(client: LoadClient, context: Context) -> None:
+    cursor = None
+    for _ in range(5):
+        params: dict[str, Any] = {"limit": 100, "count": "none"}
+        if cursor:
+            params["cursor"] = cursor
+        r = await client.request(
+            "GET /items/ (cursor)",
+            "GET",
+            "/items/",
+            headers=context.headers,
+            params=params,
+        )
+        cursor = r.json()["next_cursor"] if r else None
+        if not cursor:
+            break
+    await client.request(
+        "GET /items/ (offset)",
+        "GET",
+        "/items/",
+        headers=context.headers,
+        params={
+            "skip": random.randrange(max(context.items - 100, 1)),
+            "limit": 100,
+            "count": "none",
+        },
+    )
+
+
+async def crud(client: LoadClient, context: Context) -> None:
+    r = await client.request(
+        "POST /items/",
+        "POST",
+        "/items/",
+        headers=context.headers,
+        json={"title": "Load test", "description": "Created by the load test"},
+    )
+    if r is None:
+        return
+    path = f"/items/{r.json()['id']}"
+    await client.request("GET /items/{id}", "GET", path, headers=context.headers)
+    await client.request(
+        "PUT /items/{id}",
+        "PUT",
+        path,
+        headers=context.headers,
+        json={"title": "Load test, updated"},
+    )
+    await client.request("DELETE /items/{id}", "DELETE", path, headers=context.headers)
+
+
+async def signup(client: LoadClient, context: Context) -> None:
+    r = await client.request(
+        "POST /users/signup",
+        "POST",
+        "/users/signup",
+        json={
+            "email": f"loadtest-{uuid.uuid4().hex}@example.com",
+            "password": PASSWORD,
+        },
+    )
+    if r is not None:
+        context.created_user_ids.append(r.json()["id"])
+
+
+SCENARIOS: dict[str, Callable[[LoadClient, Context], Awaitable[None]]] = {
+    "login": login,
+    "pagination": pagination,
+    "crud": crud,
+    "signup": signup,
+}
+
+
+async def run_scenario(
+    client: httpx.AsyncClient,
+    context: Context,
+    scenario: Callable[[LoadClient, Context], Awaitable[None]],
+    *,
+    concurrency: int,
+    duration: float,
+) -> dict[str, Any]:
+    load_client = LoadClient(client)
+    iterations = 0
+    deadline = time.perf_counter() + duration
+
+    async def virtual_user() -> None:
+        nonlocal iterations
+        while time.perf_counter() < deadline:
+            await scenario(load_client, context)
+            iterations += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(virtual_user() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+    requests = RequestStats()
+    for stats in load_client.stats.values():
+        requests.latencies += stats.latencies
+        requests.errors += stats.errors
+        requests.status_codes += stats.status_codes
+    return {
+        "duration_s": round(elapsed, 2),
+        "iterations": iterations,
+        "total": requests.report(elapsed),
+        "requests": {
+            label: stats.report(elapsed)
+            for label, stats in sorted(load_client.stats.items())
+        },
+    }
+
+
+async def set_up(
+    client: httpx.AsyncClient, superuser_headers: dict[str, str], items: int
+) -> Context:
+    email = f"loadtest-{uuid.uuid4().hex}@example.com"
+    r = await client.post(
+        f"{settings.API_V1_STR}/users/",
+        headers=superuser_headers,
+        json={"email": email, "password": PASSWORD},
+    )
+    r.raise_for_status()
+    context = Context(email=email, headers={}, items=items)
+    context.created_user_ids.append(r.json()["id"])
+    r = await client.post(
+        f"{settings.API_V1_STR}/login/access-token",
+        data={"username": email, "password": PASSWORD},
+    )
+    r.raise_for_status()
+    context.headers = {"Authorization": f"Bearer {r.json()['access_token']}"}
+    for start in range(0, items, settings.ITEMS_BULK_MAX_SIZE):
+        batch = min(settings.ITEMS_BULK_MAX_SIZE, items - start)
+        r = await client.post(
+            f"{settings.API_V1_STR}/items/bulk",
+            headers=context.headers,
+            json=[{"title": f"Load test {start + i}"} for i in range(batch)],
+        )
+        r.raise_for_status()
+    return context
+
+
+def git_commit() -> str | None:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            check=True,
+            text=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+async def main(
+    url: str,
+    scenarios: list[str],
+    concurrency: int,
+    duration: float,
+    items: int,
+    output: str,
+) -> None:
+    limits = httpx.Limits(max_connections=concurrency)
+    async with httpx.AsyncClient(base_url=url, limits=limits, timeout=30) as client:
+        r = await client.post(
+            f"{settings.API_V1_STR}/login/access-token",
+            data={
+                "username": settings.FIRST_SUPERUSER,
+                "password": settings.FIRST_SUPERUSER_PASSWORD,
+            },
+        )
+        r.raise_for_status()
+        superuser_headers = {"Authorization": f"Bearer {r.json()['access_token']}"}
+        context = await set_up(client, superuser_headers, items)
+        report: dict[str, Any] = {
+            "url": url,
+            "commit": git_commit(),
+            "started_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "concurrency": concurrency,
+            "duration_s": duration,
+            "items": items,
+            "scenarios": {},
+        }
+        try:
+            for name in scenarios:
+                result = await run_scenario(
+                    client,
+                    context,
+                    SCENARIOS[name],
+                    concurrency=concurrency,
+                    duration=duration,
+                )
+                report["scenarios"][name] = result
+                total = result["total"]
+                latency = total["latency_ms"] or {}
+                logger.info(
+                    f"{name}: {total['throughput_rps']} req/s, "
+                    f"p50 {latency.get('p50')} ms, p95 {latency.get('p95')} ms, "
+                    f"p99 {latency.get('p99')} ms, error rate {total['error_rate']}"
+                )
+        finally:
+            for user_id in context.created_user_ids:
+                await client.delete(
+                    f"{settings.API_V1_STR}/users/{user_id}", headers=superuser_headers
+                )
+    with open(output, "w") as f:
+        json.dump(report, f, indent=2)
+        f.write("\n")
+    logger.info(f"Report written to {output}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--url", default="http://localhost:8000")
+    parser.add_argument(
+        "--scenarios", nargs="+", choices=list(SCENARIOS), default=list(SCENARIOS)
+    )
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--duration", type=float, default=30)
+    parser.add_argument("--items", type=int, default=5000)
+    parser.add_argument("--output", default="loadtest.json")
+    args = parser.parse_args()
+    asyncio.run(
+        main(
+            args.url,
+            args.scenarios,
+            args.concurrency,
+            args.duration,
+            args.items,
+            args.output,
+        )
+    )
@@ -0,0 +1,127 @@
+"""
+Compare the CPU time spent serializing list endpoint responses.
+
+For each list endpoint, fetches one page of content and times encoding it
+the default FastAPI way (validate against the response model, dump it and
+encode with the stdlib JSON encoder) and with FastJSONResponse, which the
+endpoints return. Also measures the CPU time of whole requests. Needs the same
+database as the app, e.g. from the backend directory:
+
+    python -m benchmarks.serialization --limit 100 --requests 500
+"""
+
+import argparse
+import json
+import logging
+import time
+from collections.abc import Callable
+from functools import partial
+from typing import Any
+
+from fastapi.testclient import TestClient
+from pydantic import TypeAdapter
+from sqlmodel import Session, col, delete, select
+
+from app.api.responses import FastJSONResponse, public_columns, public_rows
+from app.api.routes.items import get_items_page, search_items_page
+from app.core.config import settings
+from app.core.db import engine
+from app.main import app
+from app.models import Item, ItemsPublic, User, UserPublic, UsersPublic
+
+logging.basicConfig(level=logging.INFO)
+logging.getLogger("httpx").setLevel(logging.WARNING)
+logger = logging.getLogger(__name__)
+
+DESCRIPTION = "serialization benchmark"
+
+
+def cpu_time_per_call(calls: int, fn: Callable[..., Any], *args: Any) -> float:
+    start = time.process_time()
+    for _ in range(calls):
+        fn(*args)
+    return (time.process_time() - start) / calls
+
+
+def validated_json(model: type[Any], content: dict[str, Any]) -> bytes:
+    adapter = TypeAdapter(model)
+    data = adapter.dump_python(adapter.validate_python(content), mode="json")
+    return json.dumps(data, separators=(",", ":")).encode()
+
+
+def main(limit: int, requests: int) -> None:
+    with Session(engine) as session:
+        owner = session.exec(
+            select(User).where(User.email == settings.FIRST_SUPERUSER)
+        ).one()
+        session.add_all(
+            Item(title=f"Widget {i}", description=DESCRIPTION, owner_id=owner.id)
+            for i in range(limit)
+        )
+        session.commit()
+        pages: dict[str, tuple[type[Any], dict[str, Any]]] = {
+            "/items/": (
+                ItemsPublic,
+                get_items_page(
+                    session=session,
+                    owner_id=None,
+                    skip=0,
+                    limit=limit,
+                    cursor=None,
+                    count="none",
+                ),
+            ),
+            "/items/search": (
+                ItemsPublic,
+                search_items_page(
+                    session=session, owner_id=None, q="widget", limit=limit, cursor=None
+                ),
+            ),
+        }
+        users = session.exec(select(*public_columns(User, UserPublic)).limit(limit))
+        pages["/users/"] = (
+            UsersPublic,
+            {"data": public_rows(users.all(), UserPublic), "count": None},
+        )
+        for path, (model, content) in pages.items():
+            validated = cpu_time_per_call(requests, validated_json, model, content)
+            fast = cpu_time_per_call(requests, FastJSONResponse, content)
+            logger.info(
+                f"{path} ({len(content['data'])} rows) serialization: "
+                f"validated {validated * 1e6:.0f} us, fast {fast * 1e6:.0f} us, "
+                f"{validated / fast:.1f}x"
+            )
+
+        with TestClient(app) as client:
+            r = client.post(
+                f"{settings.API_V1_STR}/login/access-token",
+                data={
+                    "username": settings.FIRST_SUPERUSER,
+                    "password": settings.FIRST_SUPERUSER_PASSWORD,
+                },
+            )
+            headers = {"Authorization": f"Bearer {r.json()['access_token']}"}
+            # Routes other than /items/search ignore q
+            params: dict[str, str | int] = {
+                "limit": limit,
+                "count": "none",
+                "q": "widget",
+            }
+            for path in pages:
+                per_request = cpu_time_per_call(
+                    requests,
+                    partial(client.get, headers=headers, params=params),
+                    f"{settings.API_V1_STR}{path}",
+                )
+                logger.info(f"{path} request: {per_request * 1e3:.2f} ms CPU")
+
+        session.exec(delete(Item).where(col(Item.description) == DESCRIPTION))
+        session.commit()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--limit", type=int, default=100)
+    parser.add_argument("--requests", type=int, default=500)
+    args = parser.parse_args()
+    main(args.limit, args.requests)
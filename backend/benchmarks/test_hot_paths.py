@@ -0,0 +1,120 @@
+"""
+Microbenchmarks of functions on the CPU path of most requests, run with
+pytest-benchmark by scripts/benchmark.sh. Needs the same database as the app.
+"""
+
+import uuid
+from collections.abc import Generator
+from datetime import timedelta
+from typing import Any
+
+import jwt
+import pydantic_core
+import pytest
+from pytest_benchmark.fixture import BenchmarkFixture  # type: ignore
+from sqlmodel import Session
+
+from app import crud
+from app.api.deps import get_current_user
+from app.api.responses import FastJSONResponse
+from app.core import security
+from app.core.config import settings
+from app.core.db import engine, init_db
+from app.models import Item, ItemsPublic, TokenPayload, User
+from app.utils import render_email_template
+
+
+@pytest.fixture(scope="module")
+def db() -> Generator[Session, None, None]:
+    with Session(engine) as session:
+        init_db(session)
+        yield session
+
+
+@pytest.fixture(scope="module")
+def superuser(db: Session) -> User:
+    user = crud.get_user_by_email(session=db, email=settings.FIRST_SUPERUSER)
+    assert user
+    return user
+
+
+@pytest.fixture(scope="module")
+def token(superuser: User) -> str:
+    return security.create_access_token(superuser.id, timedelta(minutes=60))
+
+
+@pytest.fixture(scope="module")
+def items_page() -> dict[str, Any]:
+    owner_id = uuid.uuid4()
+    items = [
+        Item(title=f"Item {i}", description="Description", owner_id=owner_id)
+        for i in range(100)
+    ]
+    return {
+        "data": [item.model_dump(exclude={"version"}) for item in items],
+        "count": None,
+        "next_cursor": None,
+    }
+
+
+def decode_token(token: str) -> TokenPayload:
+    payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[security.ALGORITHM])
+    return TokenPayload(**payload)
+
+
+def validated_json(content: dict[str, Any]) -> bytes:
+    return pydantic_core.to_json(
+        ItemsPublic.model_validate(content).model_dump(mode="json")
+    )
+
+
+def test_create_access_token(benchmark: BenchmarkFixture) -> None:
+    benchmark(security.create_access_token, uuid.uuid4(), timedelta(minutes=60))
+
+
+def test_decode_token(benchmark: BenchmarkFixture, token: str) -> None:
+    assert benchmark(decode_token, token).sub
+
+
+def test_get_current_user(
+    benchmark: BenchmarkFixture, db: Session, superuser: User, token: str
+) -> None:
+    # With the user cached, as for all but the first request of a user
+    assert benchmark(get_current_user, session=db, token=token).id == superuser.id
+
+
+def test_item_model_validate(benchmark: BenchmarkFixture) -> None:
+    data = {"title": "Item", "description": "Description", "owner_id": uuid.uuid4()}
+    benchmark(Item.model_validate, data)
+
+
+def test_items_public_validated(
+    benchmark: BenchmarkFixture, items_page: dict[str, Any]
+) -> None:
+    benchmark(validated_json, items_page)
+
+
+def test_items_public_fast(
+    benchmark: BenchmarkFixture, items_page: dict[str, Any]
+) -> None:
+    benchmark(FastJSONResponse, items_page)
+
+
+def test_render_email_template(benchmark: BenchmarkFixture) -> None:
+    context = {
+        "project_name": settings.PROJECT_NAME,
+        "username": "user@example.com",
+        "email": "user@example.com",
+        "valid_hours": settings.EMAIL_RESET_TOKEN_EXPIRE_HOURS,
+        "link": f"{settings.FRONTEND_HOST}/reset-password?token=token",
+    }
+    benchmark(
+        render_email_template, template_name="reset_password.html", context=context
+    )
+
+
+def test_get_user_by_email(
+    benchmark: BenchmarkFixture, db: Session, superuser: User
+) -> None:
+    user = benchmark(crud.get_user_by_email, session=db, email=superuser.email)
+    assert user == superuser
@@ -0,0 +1,157 @@
+"""
+Measure the per-request overhead of Sentry tracing.
+
+Times requests to a few endpoints, made in-process through httpx's ASGI
+transport, with Sentry:
+
+- off: not initialized, as without SENTRY_DSN
+- errors: reporting errors only
+- sampled: tracing with TracesSampler and the SENTRY_TRACES_* settings
+- full: tracing every request, as `enable_tracing=True` did
+
+Events are dropped instead of being sent. Each mode runs in a process of its
+own, since Sentry instruments the app when it's initialized. Needs the same
+database as the app, e.g. from the backend directory:
+
+    python -m benchmarks.tracing --requests 2000
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import statistics
+import subprocess
+import sys
+import time
+from typing import Any
+
+import httpx
+import sentry_sdk
+from sentry_sdk.envelope import Envelope
+from sentry_sdk.transport import Transport
+
+from app.core.config import settings
+from app.core.tracing import TracesSampler
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+MODES = ["off", "errors", "sampled", "full"]
+PATHS = ["/utils/health-check/", "/items/?limit=10", "/users/me"]
+
+
+class NullTransport(Transport):
+    def capture_envelope(self, envelope: Envelope) -> None:
+        pass
+
+
+def init_sentry(mode: str, samplers: list[TracesSampler]) -> None:
+    if mode == "off":
+        return
+    options: dict[str, Any] = {
+        "dsn": "https://public@sentry.example.com/1",
+        "transport": NullTransport,
+    }
+    if mode == "sampled":
+        # The sampler needs the app's routes, which must be added after Sentry
+        # is initialized to be instrumented
+        options["traces_sampler"] = lambda context: samplers[0](context)
+    elif mode == "full":
+        options["traces_sample_rate"] = 1.0
+    sentry_sdk.init(**options)
+
+
+async def measure(mode: str, requests: int) -> dict[str, Any]:
+    samplers: list[TracesSampler] = []
+    init_sentry(mode, samplers)
+    from app.main import app
+
+    samplers.append(
+        TracesSampler(
+            app.router,
+            default_rate=settings.SENTRY_TRACES_SAMPLE_RATE,
+            rates=settings.SENTRY_TRACES_SAMPLE_RATES,
+            max_per_second=settings.SENTRY_TRACES_MAX_PER_SECOND,
+            error_seconds=settings.SENTRY_TRACES_ERROR_SECONDS,
+        )
+    )
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(
+        transport=transport, base_url=f"http://test{settings.API_V1_STR}"
+    ) as client:
+        r = await client.post(
+            "/login/access-token",
+            data={
+                "username": settings.FIRST_SUPERUSER,
+                "password": settings.FIRST_SUPERUSER_PASSWORD,
+            },
+        )
+        r.raise_for_status()
+        client.headers["Authorization"] = f"Bearer {r.json()['access_token']}"
+        results = {}
+        for path in PATHS:
+            for _ in range(requests // 10):
+                (await client.get(path)).raise_for_status()
+            latencies = []
+            cpu_start = time.process_time()
+            for _ in range(requests):
+                start = time.perf_counter()
+                r = await client.get(path)
+                latencies.append(time.perf_counter() - start)
+                r.raise_for_status()
+            results[path] = {
+                "mean_us": statistics.mean(latencies) * 1e6,
+                "p50_us": statistics.median(latencies) * 1e6,
+                "cpu_us": (time.process_time() - cpu_start) / requests * 1e6,
+            }
+    return results
+
+
+def main(requests: int, modes: list[str]) -> None:
+    results = {}
+    for mode in modes:
+        process = subprocess.run(
+            [
+                sys.executable,
+                "-m",
+                "benchmarks.tracing",
+                "--mode",
+                mode,
+                "--requests",
+                str(requests),
+            ],
+            capture_output=True,
+            check=True,
+            text=True,
+        )
+        results[mode] = json.loads(process.stdout)
+    for path in PATHS:
+        baseline = results.get("off", {}).get(path)
+        for mode in modes:
+            result = results[mode][path]
+            overhead = (
+                f", {result['cpu_us'] - baseline['cpu_us']:+.0f} µs CPU vs off"
+                if baseline
+                else ""
+            )
+            logger.info(
+                f"{path} {mode}: mean {result['mean_us']:.0f} µs, "
+                f"p50 {result['p50_us']:.0f} µs, CPU {result['cpu_us']:.0f} µs"
+                f"{overhead}"
+            )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--modes", nargs="+", choices=MODES, default=MODES)
+    # Runs a single mode and prints its results, used by the other modes
+    parser.add_argument("--mode", choices=MODES, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.mode:
+        sys.stdout.write(json.dumps(asyncio.run(measure(args.mode, args.requests))))
+    else:
+        main(args.requests, args.modes)
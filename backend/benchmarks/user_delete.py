@@ -0,0 +1,126 @@
+"""
+Compare ways of deleting a user with many items.
+
+For each mode, creates a user with `--items` items and deletes them:
+
+- orm: loads the items of the user and deletes them through the ORM, as
+  session.delete(user) did with the items relationship cascading in Python
+- single: deletes all items and the user in one transaction, as the superuser
+  delete route did
+- batched: crud.delete_user, then runs the delete_user jobs it enqueues, as
+  app.job_worker would
+
+Logs the total time, the longest transaction (which holds the locks of the
+items it deleted until it ends) and the peak memory allocated by Python. Needs
+the same database as the app, e.g. from the backend directory:
+
+    python -m benchmarks.user_delete --items 1000000 --modes single batched
+"""
+
+import argparse
+import logging
+import time
+import tracemalloc
+import uuid
+from collections.abc import Callable
+
+from sqlalchemy import text
+from sqlmodel import Session, delete, select
+
+import app.jobs  # noqa: F401  Registers the jobs
+from app import crud
+from app.core.config import settings
+from app.core.db import engine
+from app.core.jobs import run_next_job
+from app.models import Item, Job, User, UserCreate
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def create_user_with_items(session: Session, items: int) -> uuid.UUID:
+    user = crud.create_user(
+        session=session,
+        user_create=UserCreate(
+            email=f"benchmark-{uuid.uuid4().hex}@example.com", password="benchmark"
+        ),
+    )
+    session.execute(
+        text(
+            "INSERT INTO item (id, title, owner_id, created_at, version) "
+            "SELECT gen_random_uuid(), 'Item ' || i, :owner_id, now(), 0 "
+            "FROM generate_series(1, :items) AS i"
+        ),
+        {"owner_id": user.id, "items": items},
+    )
+    # Like the statistics of a user who created their items over time
+    session.execute(text("ANALYZE item"))
+    session.commit()
+    return user.id
+
+
+def delete_orm(session: Session, user_id: uuid.UUID) -> list[float]:
+    start = time.perf_counter()
+    user = session.get_one(User, user_id)
+    for item in user.items:
+        session.delete(item)
+    session.delete(user)
+    session.commit()
+    return [time.perf_counter() - start]
+
+
+def delete_single(session: Session, user_id: uuid.UUID) -> list[float]:
+    start = time.perf_counter()
+    session.exec(delete(Item).where(Item.owner_id == user_id))
+    session.delete(session.get_one(User, user_id))
+    session.commit()
+    return [time.perf_counter() - start]
+
+
+def delete_batched(session: Session, user_id: uuid.UUID) -> list[float]:
+    start = time.perf_counter()
+    crud.delete_user(session=session, db_user=session.get_one(User, user_id))
+    transactions = [time.perf_counter() - start]
+    while True:
+        start = time.perf_counter()
+        if not run_next_job(session):
+            break
+        transactions.append(time.perf_counter() - start)
+    return transactions
+
+
+MODES: dict[str, Callable[[Session, uuid.UUID], list[float]]] = {
+    "orm": delete_orm,
+    "single": delete_single,
+    "batched": delete_batched,
+}
+
+
+def main(items: int, modes: list[str]) -> None:
+    with Session(engine) as session:
+        # Only the jobs of this benchmark should run
+        assert not session.exec(select(Job)).first(), "The job queue isn't empty"
+        for mode in modes:
+            user_id = create_user_with_items(session, items)
+            session.expunge_all()
+            tracemalloc.start()
+            start = time.perf_counter()
+            transactions = MODES[mode](session, user_id)
+            elapsed = time.perf_counter() - start
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            assert session.get(User, user_id) is None
+            logger.info(
+                f"{mode}: {items} items deleted in {elapsed:.2f} s, "
+                f"{len(transactions)} transactions, longest {max(transactions):.2f} s, "
+                f"peak memory {peak / 2**20:.1f} MiB "
+                f"(batch size {settings.USER_DELETE_BATCH_SIZE})"
+            )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--items", type=int, default=1_000_000)
+    parser.add_argument("--modes", nargs="+", choices=list(MODES), default=list(MODES))
+    args = parser.parse_args()
+    main(args.items, args.modes)
@@ -0,0 +1,16 @@
+#!/usr/bin/env bash
+
+# Run the microbenchmarks against the database of the app. With "save", store
+# the results as a new baseline in benchmarks/baselines, one directory per
+# machine. Otherwise compare them with the latest baseline of this machine and
+# fail if the median of any benchmark regressed by more than
+# BENCHMARK_THRESHOLD percent.
+
+set -e
+set -x
+
+if [ "$1" = "save" ]; then
+    pytest benchmarks/test_hot_paths.py --benchmark-storage=benchmarks/baselines --benchmark-save=baseline
+else
+    pytest benchmarks/test_hot_paths.py --benchmark-storage=benchmarks/baselines --benchmark-compare --benchmark-compare-fail="median:${BENCHMARK_THRESHOLD-20}%"
+fi
@@ -0,0 +1,11 @@
+#! /usr/bin/env bash
+
+set -e
+
+# The workers share their metrics through files in this directory, left over
+# files of a previous run would be added to them, see app.core.metrics
+export PROMETHEUS_MULTIPROC_DIR="${PROMETHEUS_MULTIPROC_DIR:-/tmp/prometheus}"
+rm -rf "$PROMETHEUS_MULTIPROC_DIR"
+mkdir -p "$PROMETHEUS_MULTIPROC_DIR"
+
+exec fastapi run --workers 4 app/main.py
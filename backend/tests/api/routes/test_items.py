@@ -1,10 +1,19 @@
+import csv
+import io
+import json
 import uuid
+from unittest.mock import patch
 
 from fastapi.testclient import TestClient
-from sqlmodel import Session
+from sqlmodel import Session, func, select
 
+from app import crud
+from app.core.cache import MemoryCacheBackend, ResponseCache
 from app.core.config import settings
+from app.models import Item, ItemCreate, ItemsPublic, ItemUpdate, User
 from tests.utils.item import create_random_item
+from tests.utils.user import create_random_user
+from tests.utils.utils import random_lower_string
 
 
 def test_create_item(
@@ -77,6 +86,96 @@ def test_read_items(
     assert response.status_code == 200
     content = response.json()
     assert len(content["data"]) >= 2
+    # Same content as validating against the response model would produce
+    assert ItemsPublic.model_validate(content).model_dump(mode="json") == content
+
+
+def test_read_items_count_modes(
+    client: TestClient, superuser_token_headers: dict[str, str], db: Session
+) -> None:
+    create_random_item(db)
+    response = client.get(
+        f"{settings.API_V1_STR}/items/",
+        headers=superuser_token_headers,
+        params={"count": "none"},
+    )
+    assert response.status_code == 200
+    assert response.json()["count"] is None
+
+    response = client.get(
+        f"{settings.API_V1_STR}/items/",
+        headers=superuser_token_headers,
+        params={"count": "estimated"},
+    )
+    assert response.status_code == 200
+    assert response.json()["count"] >= 0
+
+    response = client.get(
+        f"{settings.API_V1_STR}/items/",
+        headers=superuser_token_headers,
+        params={"count": "exact"},
+    )
+    assert response.status_code == 200
+    assert response.json()["count"] >= 1
+
+
+def test_read_items_exact_count_etag(
+    client: TestClient, superuser_token_headers: dict[str, str], db: Session
+) -> None:
+    url = f"{settings.API_V1_STR}/items/"
+    params = {"count": "exact"}
+    first = client.get(url, headers=superuser_token_headers, params=params)
+    create_random_item(db)
+    # Within the lifetime of the cached count
+    second = client.get(url, headers=superuser_token_headers, params=params)
+    assert second.headers["ETag"] != first.headers["ETag"]
+    assert second.json()["count"] == first.json()["count"] + 1
+
+
+def test_read_items_cursor(
+    client: TestClient, normal_user_token_headers: dict[str, str]
+) -> None:
+    for i in range(5):
+        client.post(
+            f"{settings.API_V1_STR}/items/",
+            headers=normal_user_token_headers,
+            json={"title": f"Cursor {i}"},
+        )
+    response = client.get(
+        f"{settings.API_V1_STR}/items/", headers=normal_user_token_headers
+    )
+    expected = [item["id"] for item in response.json()["data"]]
+
+    ids: list[str] = []
+    cursor = None
+    while True:
+        params: dict[str, str | int] = {"limit": 2}
+        if cursor:
+            params["cursor"] = cursor
+        response = client.get(
+            f"{settings.API_V1_STR}/items/",
+            headers=normal_user_token_headers,
+            params=params,
+        )
+        assert response.status_code == 200
+        content = response.json()
+        ids.extend(item["id"] for item in content["data"])
+        cursor = content["next_cursor"]
+        if not cursor:
+            break
+    assert ids == expected
+
+
+def test_read_items_invalid_cursor(
+    client: TestClient, normal_user_token_headers: dict[str, str]
+) -> None:
+    response = client.get(
+        f"{settings.API_V1_STR}/items/",
+        headers=normal_user_token_headers,
+        params={"cursor": "not-a-cursor"},
+    )
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Invalid cursor"
 
 
 def test_update_item(
@@ -162,3 +261,421 @@ def test_delete_item_not_enough_permissions(
     assert response.status_code == 403
     content = response.json()
     assert content["detail"] == "Not enough permissions"
+
+
+def test_read_item_etag(
+    client: TestClient, superuser_token_headers: dict[str, str], db: Session
+) -> None:
+    item = create_random_item(db)
+    url = f"{settings.API_V1_STR}/items/{item.id}"
+    response = client.get(url, headers=superuser_token_headers)
+    etag = response.headers["ETag"]
+    headers = {**superuser_token_headers, "If-None-Match": etag}
+    response = client.get(url, headers=headers)
+    assert response.status_code == 304
+    assert response.headers["ETag"] == etag
+    assert not response.content
+
+    client.put(url, headers=superuser_token_headers, json={"title": "Updated"})
+    response = client.get(url, headers=headers)
+    assert response.status_code == 200
+    assert response.json()["title"] == "Updated"
+    assert response.headers["ETag"] != etag
+
+
+def test_read_item_etag_not_enough_permissions(
+    client: TestClient, normal_user_token_headers: dict[str, str], db: Session
+) -> None:
+    item = create_random_item(db)
+    response = client.get(
+        f"{settings.API_V1_STR}/items/{item.id}",
+        headers={**normal_user_token_headers, "If-None-Match": "*"},
+    )
+    assert response.status_code == 403
+
+
+def test_read_items_etag(
+    client: TestClient, normal_user_token_headers: dict[str, str]
+) -> None:
+    url = f"{settings.API_V1_STR}/items/"
+    etag = client.get(url, headers=normal_user_token_headers).headers["ETag"]
+    assert etag.startswith("W/")
+    headers = {**normal_user_token_headers, "If-None-Match": etag}
+    response = client.get(url, headers=headers)
+    assert response.status_code == 304
+
+    item = client.post(url, headers=normal_user_token_headers, json={"title": "New"})
+    response = client.get(url, headers=headers)
+    assert response.status_code == 200
+    etag = response.headers["ETag"]
+
+    client.delete(f"{url}{item.json()['id']}", headers=normal_user_token_headers)
+    response = client.get(url, headers={**headers, "If-None-Match": etag})
+    assert response.status_code == 200
+
+
+def test_read_items_etag_superuser(
+    client: TestClient, superuser_token_headers: dict[str, str], db: Session
+) -> None:
+    url = f"{settings.API_V1_STR}/items/"
+    etag = client.get(url, headers=superuser_token_headers).headers["ETag"]
+    headers = {**superuser_token_headers, "If-None-Match": etag}
+    assert client.get(url, headers=headers).status_code == 304
+    create_random_item(db)
+    assert client.get(url, headers=headers).status_code == 200
+
+
+def test_read_items_etag_superuser_deleted_user(
+    client: TestClient, superuser_token_headers: dict[str, str], db: Session
+) -> None:
+    url = f"{settings.API_V1_STR}/items/"
+    deleted_item = create_random_item(db)
+    kept_item = create_random_item(db)
+    deleted_user = db.get(User, deleted_item.owner_id)
+    assert deleted_user
+    etag = client.get(url, headers=superuser_token_headers).headers["ETag"]
+    # Raise the versions of the kept owner by as much as deleting the other
+    # owner lowers them, and keep the number of users, so that the sum and count
+    # of the versions are the same as before
+    for i in range(deleted_user.items_version):
+        crud.update_item(
+            session=db, id=kept_item.id, item_in=ItemUpdate(title=f"Kept {i}")
+        )
+    crud.delete_user(session=db, db_user=deleted_user)
+    create_random_user(db)
+    headers = {**superuser_token_headers, "If-None-Match": etag}
+    assert client.get(url, headers=headers).status_code == 200
+
+
+def test_read_items_cached(
+    client: TestClient,
+    normal_user_token_headers: dict[str, str],
+    superuser_token_headers: dict[str, str],
+) -> None:
+    cache = ResponseCache(
+        MemoryCacheBackend(maxsize=10, ttl=60), prefix="items", ttl=60
+    )
+    url = f"{settings.API_V1_STR}/items/"
+    with (
+        patch("app.api.routes.items.items_cache", cache),
+        patch("app.crud.items_cache", cache),
+    ):
+        first = client.get(url, headers=normal_user_token_headers)
+        second = client.get(url, headers=normal_user_token_headers)
+        assert second.content == first.content
+        assert second.headers["ETag"] == first.headers["ETag"]
+        headers = {**normal_user_token_headers, "If-None-Match": first.headers["ETag"]}
+        assert client.get(url, headers=headers).status_code == 304
+        assert cache.stats()["hits"] == 2
+
+        item = client.post(url, headers=normal_user_token_headers, json={"title": "A"})
+        response = client.get(url, headers=normal_user_token_headers)
+        assert item.json()["id"] in [item["id"] for item in response.json()["data"]]
+
+        # Updates by a superuser invalidate the owner's pages too
+        client.put(
+            f"{url}{item.json()['id']}",
+            headers=superuser_token_headers,
+            json={"title": "B"},
+        )
+        response = client.get(url, headers=normal_user_token_headers)
+        titles = {item["id"]: item["title"] for item in response.json()["data"]}
+        assert titles[item.json()["id"]] == "B"
+
+        # Superusers' pages aren't cached
+        lookups = cache.hits + cache.misses
+        client.get(url, headers=superuser_token_headers)
+        assert cache.hits + cache.misses == lookups
+
+
+def test_update_item_if_match(
+    client: TestClient, superuser_token_headers: dict[str, str], db: Session
+) -> None:
+    item = create_random_item(db)
+    url = f"{settings.API_V1_STR}/items/{item.id}"
+    etag = client.get(url, headers=superuser_token_headers).headers["ETag"]
+    headers = {**superuser_token_headers, "If-Match": etag}
+    response = client.put(url, headers=headers, json={"title": "First"})
+    assert response.status_code == 200
+    assert response.headers["ETag"] != etag
+
+    response = client.put(url, headers=headers, json={"title": "Second"})
+    assert response.status_code == 412
+    assert response.json()["detail"] == "Item has been modified"
+    # Weak tags never match
+    new_etag = client.get(url, headers=superuser_token_headers).headers["ETag"]
+    response = client.put(
+        url,
+        headers={**superuser_token_headers, "If-Match": f"W/{new_etag}"},
+        json={"title": "Second"},
+    )
+    assert response.status_code == 412
+    response = client.put(
+        url,
+        headers={**superuser_token_headers, "If-Match": f'"0", {new_etag}'},
+        json={"title": "Second"},
+    )
+    assert response.status_code == 200
+    assert response.json()["title"] == "Second"
+
+
+def test_update_item_if_match_not_enough_permissions(
+    client: TestClient, normal_user_token_headers: dict[str, str], db: Session
+) -> None:
+    item = create_random_item(db)
+    response = client.put(
+        f"{settings.API_V1_STR}/items/{item.id}",
+        headers={**normal_user_token_headers, "If-Match": '"0"'},
+        json={"title": "Updated"},
+    )
+    assert response.status_code == 403
+
+
+def test_item_crud_async_database(
+    client: TestClient, normal_user_token_headers: dict[str, str]
+) -> None:
+    with patch("app.core.config.settings.DB_ASYNC", True):
+        response = client.post(
+            f"{settings.API_V1_STR}/items/",
+            headers=normal_user_token_headers,
+            json={"title": "Async", "description": "Engine"},
+        )
+        assert response.status_code == 200
+        item_id = response.json()["id"]
+
+        response = client.put(
+            f"{settings.API_V1_STR}/items/{item_id}",
+            headers=normal_user_token_headers,
+            json={"title": "Async updated"},
+        )
+        assert response.status_code == 200
+        assert response.json()["title"] == "Async updated"
+        assert response.json()["description"] == "Engine"
+
+        response = client.get(
+            f"{settings.API_V1_STR}/items/", headers=normal_user_token_headers
+        )
+        assert response.status_code == 200
+        assert item_id in [item["id"] for item in response.json()["data"]]
+
+        response = client.delete(
+            f"{settings.API_V1_STR}/items/{item_id}",
+            headers=normal_user_token_headers,
+        )
+        assert response.status_code == 200
+        response = client.get(
+            f"{settings.API_V1_STR}/items/{item_id}",
+            headers=normal_user_token_headers,
+        )
+        assert response.status_code == 404
+
+
+def test_create_items_bulk(
+    client: TestClient, superuser_token_headers: dict[str, str]
+) -> None:
+    data = [{"title": f"Bulk {i}", "description": "Bulk"} for i in range(3)]
+    response = client.post(
+        f"{settings.API_V1_STR}/items/bulk",
+        headers=superuser_token_headers,
+        json=data,
+    )
+    assert response.status_code == 200
+    results = response.json()["data"]
+    assert [result["status"] for result in results] == [200, 200, 200]
+    assert [result["item"]["title"] for result in results] == [
+        "Bulk 0",
+        "Bulk 1",
+        "Bulk 2",
+    ]
+    assert [result["id"] for result in results] == [
+        result["item"]["id"] for result in results
+    ]
+
+
+def test_create_items_bulk_too_many(
+    client: TestClient, superuser_token_headers: dict[str, str]
+) -> None:
+    data = [{"title": "Bulk"}] * (settings.ITEMS_BULK_MAX_SIZE + 1)
+    response = client.post(
+        f"{settings.API_V1_STR}/items/bulk",
+        headers=superuser_token_headers,
+        json=data,
+    )
+    assert response.status_code == 422
+
+
+def test_update_items_bulk(
+    client: TestClient, normal_user_token_headers: dict[str, str], db: Session
+) -> None:
+    response = client.post(
+        f"{settings.API_V1_STR}/items/bulk",
+        headers=normal_user_token_headers,
+        json=[{"title": "Own"}],
+    )
+    own_id = response.json()["data"][0]["id"]
+    other = create_random_item(db)
+    missing_id = str(uuid.uuid4())
+    response = client.put(
+        f"{settings.API_V1_STR}/items/bulk",
+        headers=normal_user_token_headers,
+        json=[
+            {"id": own_id, "title": "Updated"},
+            {"id": str(other.id), "title": "Updated"},
+            {"id": missing_id, "title": "Updated"},
+        ],
+    )
+    assert response.status_code == 200
+    results = response.json()["data"]
+    assert [result["id"] for result in results] == [own_id, str(other.id), missing_id]
+    assert [result["status"] for result in results] == [200, 403, 404]
+    assert results[0]["item"]["title"] == "Updated"
+    assert results[1]["item"] is None
+    db_other = crud.get_item(session=db, id=other.id)
+    assert db_other
+    assert db_other.title == other.title
+
+
+def test_delete_items_bulk(
+    client: TestClient, normal_user_token_headers: dict[str, str], db: Session
+) -> None:
+    response = client.post(
+        f"{settings.API_V1_STR}/items/bulk",
+        headers=normal_user_token_headers,
+        json=[{"title": "Own"}],
+    )
+    own_id = response.json()["data"][0]["id"]
+    other = create_random_item(db)
+    missing_id = str(uuid.uuid4())
+    response = client.request(
+        "DELETE",
+        f"{settings.API_V1_STR}/items/bulk",
+        headers=normal_user_token_headers,
+        json=[own_id, str(other.id), missing_id],
+    )
+    assert response.status_code == 200
+    results = response.json()["data"]
+    assert [result["status"] for result in results] == [200, 403, 404]
+    assert crud.get_item(session=db, id=uuid.UUID(own_id)) is None
+    assert crud.get_item(session=db, id=other.id)
+
+
+def test_export_items_ndjson(
+    client: TestClient, normal_user_token_headers: dict[str, str], db: Session
+) -> None:
+    client.post(
+        f"{settings.API_V1_STR}/items/bulk",
+        headers=normal_user_token_headers,
+        json=[{"title": f"Export {i}"} for i in range(3)],
+    )
+    other = create_random_item(db)
+    response = client.get(
+        f"{settings.API_V1_STR}/items/export", headers=normal_user_token_headers
+    )
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/x-ndjson"
+    rows = [json.loads(line) for line in response.text.splitlines()]
+    assert len(rows) >= 3
+    assert {"Export 0", "Export 1", "Export 2"} <= {row["title"] for row in rows}
+    assert str(other.id) not in {row["id"] for row in rows}
+    assert len({row["owner_id"] for row in rows}) == 1
+
+
+def test_export_items_csv(
+    client: TestClient, superuser_token_headers: dict[str, str], db: Session
+) -> None:
+    item = create_random_item(db)
+    with patch("app.api.routes.items.EXPORT_BATCH_SIZE", 2):
+        response = client.get(
+            f"{settings.API_V1_STR}/items/export",
+            headers=superuser_token_headers,
+            params={"format": "csv"},
+        )
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/csv")
+    rows = list(csv.DictReader(io.StringIO(response.text)))
+    assert len(rows) == db.exec(select(func.count()).select_from(Item)).one()
+    (row,) = (row for row in rows if row["id"] == str(item.id))
+    assert row["title"] == item.title
+    assert row["owner_id"] == str(item.owner_id)
+
+
+def test_search_items(
+    client: TestClient, normal_user_token_headers: dict[str, str], db: Session
+) -> None:
+    word = random_lower_string()
+    response = client.post(
+        f"{settings.API_V1_STR}/items/bulk",
+        headers=normal_user_token_headers,
+        json=[
+            {"title": "Unrelated", "description": f"About {word}"},
+            {"title": f"Blue {word}"},
+            {"title": "Unrelated"},
+        ],
+    )
+    description_id, title_id, _ = (r["id"] for r in response.json()["data"])
+    other = crud.create_item(
+        session=db,
+        item_in=ItemCreate(title=f"Other {word}"),
+        owner_id=create_random_item(db).owner_id,
+    )
+    response = client.get(
+        f"{settings.API_V1_STR}/items/search",
+        headers=normal_user_token_headers,
+        params={"q": word},
+    )
+    assert response.status_code == 200
+    content = response.json()
+    assert [item["id"] for item in content["data"]] == [title_id, description_id]
+    assert content["count"] is None
+    assert content["next_cursor"] is None
+    assert str(other.id) not in {item["id"] for item in content["data"]}
+
+    # Fuzzy prefix match on the title
+    response = client.get(
+        f"{settings.API_V1_STR}/items/search",
+        headers=normal_user_token_headers,
+        params={"q": word[:10]},
+    )
+    assert [item["id"] for item in response.json()["data"]] == [title_id]
+
+
+def test_search_items_cursor(
+    client: TestClient, superuser_token_headers: dict[str, str]
+) -> None:
+    word = random_lower_string()
+    client.post(
+        f"{settings.API_V1_STR}/items/bulk",
+        headers=superuser_token_headers,
+        json=[{"title": f"{word} {i}"} for i in range(5)],
+    )
+    ids: list[str] = []
+    cursor = None
+    for _ in range(3):
+        response = client.get(
+            f"{settings.API_V1_STR}/items/search",
+            headers=superuser_token_headers,
+            params={"q": word, "limit": 2, **({"cursor": cursor} if cursor else {})},
+        )
+        assert response.status_code == 200
+        content = response.json()
+        ids += [item["id"] for item in content["data"]]
+        cursor = content["next_cursor"]
+    assert len(ids) == len(set(ids)) == 5
+    assert cursor is None
+
+
+def test_search_items_invalid(
+    client: TestClient, superuser_token_headers: dict[str, str]
+) -> None:
+    response = client.get(
+        f"{settings.API_V1_STR}/items/search",
+        headers=superuser_token_headers,
+        params={"q": ""},
+    )
+    assert response.status_code == 422
+    response = client.get(
+        f"{settings.API_V1_STR}/items/search",
+        headers=superuser_token_headers,
+        params={"q": "widget", "cursor": "invalid"},
+    )
+    assert response.status_code == 400
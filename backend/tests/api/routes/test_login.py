@@ -2,12 +2,15 @@ from unittest.mock import patch
 
 from fastapi.testclient import TestClient
 from pwdlib.hashers.bcrypt import BcryptHasher
-from sqlmodel import Session
+from sqlmodel import Session, select
 
+from app.api.deps import USER_CACHE_FIELDS
+from app.core.cache import user_cache
 from app.core.config import settings
+from app.core.hashing import password_hasher
 from app.core.security import get_password_hash, verify_password
-from app.crud import create_user
-from app.models import User, UserCreate
+from app.crud import create_user, revoke_token_claims
+from app.models import EmailOutbox, User, UserCreate
 from app.utils import generate_password_reset_token
 from tests.utils.user import user_authentication_headers
 from tests.utils.utils import random_email, random_lower_string
@@ -34,6 +37,21 @@ def test_get_access_token_incorrect_password(client: TestClient) -> None:
     assert r.status_code == 400
 
 
+def test_get_access_token_hash_queue_full(client: TestClient) -> None:
+    login_data = {
+        "username": settings.FIRST_SUPERUSER,
+        "password": settings.FIRST_SUPERUSER_PASSWORD,
+    }
+    with patch.object(
+        password_hasher,
+        "pending",
+        password_hasher.concurrency + password_hasher.max_queue,
+    ):
+        r = client.post(f"{settings.API_V1_STR}/login/access-token", data=login_data)
+    assert r.status_code == 503
+    assert r.headers["Retry-After"] == "1"
+
+
 def test_use_access_token(
     client: TestClient, superuser_token_headers: dict[str, str]
 ) -> None:
@@ -46,8 +64,73 @@ def test_use_access_token(
     assert "email" in result
 
 
+def test_use_access_token_trusted_claims(
+    client: TestClient, superuser_token_headers: dict[str, str], db: Session
+) -> None:
+    email = random_email()
+    password = random_lower_string()
+    user = create_user(
+        session=db, user_create=UserCreate(email=email, password=password)
+    )
+    with patch("app.core.config.settings.AUTH_TRUST_TOKEN_CLAIMS", True):
+        headers = user_authentication_headers(
+            client=client, email=email, password=password
+        )
+        r = client.post(
+            f"{settings.API_V1_STR}/items/",
+            headers=headers,
+            json={"title": "Trusted"},
+        )
+        item_id = r.json()["id"]
+
+        with patch("app.api.deps.get_user_by_subject") as get_user_by_subject:
+            r = client.get(f"{settings.API_V1_STR}/items/{item_id}", headers=headers)
+            assert r.status_code == 200
+            get_user_by_subject.assert_not_called()
+        r = client.get(f"{settings.API_V1_STR}/users/me", headers=headers)
+        assert r.json()["email"] == email
+
+        r = client.patch(
+            f"{settings.API_V1_STR}/users/{user.id}",
+            headers=superuser_token_headers,
+            json={"is_active": False},
+        )
+        assert r.status_code == 200
+        r = client.get(f"{settings.API_V1_STR}/items/{item_id}", headers=headers)
+        assert r.status_code == 400
+        assert r.json()["detail"] == "Inactive user"
+
+
+def test_use_access_token_revoked_claims_cached_user(
+    client: TestClient, db: Session
+) -> None:
+    email = random_email()
+    password = random_lower_string()
+    user = create_user(
+        session=db,
+        user_create=UserCreate(email=email, password=password, is_superuser=True),
+    )
+    with patch("app.core.config.settings.AUTH_TRUST_TOKEN_CLAIMS", True):
+        headers = user_authentication_headers(
+            client=client, email=email, password=password
+        )
+        user_id = str(user.id)
+        snapshot = user.model_dump(include=USER_CACHE_FIELDS | {"token_version"})
+        revoke_token_claims(session=db, db_user=user)
+        user.is_superuser = False
+        db.add(user)
+        db.commit()
+        # As cached by another worker before the change
+        user_cache.set(user_id, snapshot)
+        r = client.get(f"{settings.API_V1_STR}/users/", headers=headers)
+        assert r.status_code == 403
+        cached = user_cache.get(user_id)
+        assert cached
+        assert cached["is_superuser"] is False
+
+
 def test_recovery_password(
-    client: TestClient, normal_user_token_headers: dict[str, str]
+    client: TestClient, normal_user_token_headers: dict[str, str], db: Session
 ) -> None:
     with (
         patch("app.core.config.settings.SMTP_HOST", "smtp.example.com"),
@@ -62,6 +145,8 @@ def test_recovery_password(
         assert r.json() == {
             "message": "If that email is registered, we sent a password recovery link"
         }
+        statement = select(EmailOutbox).where(EmailOutbox.email_to == email)
+        assert db.exec(statement).first()
 
 
 def test_recovery_password_user_not_exits(
@@ -110,6 +195,25 @@ def test_reset_password(client: TestClient, db: Session) -> None:
     assert verified
 
 
+def test_reset_password_hash_queue_full(client: TestClient, db: Session) -> None:
+    email = random_email()
+    create_user(
+        session=db,
+        user_create=UserCreate(email=email, password=random_lower_string()),
+    )
+    data = {
+        "new_password": random_lower_string(),
+        "token": generate_password_reset_token(email=email),
+    }
+    with patch.object(
+        password_hasher,
+        "pending",
+        password_hasher.concurrency + password_hasher.max_queue,
+    ):
+        r = client.post(f"{settings.API_V1_STR}/reset-password/", json=data)
+    assert r.status_code == 503
+
+
 def test_reset_password_invalid_token(
     client: TestClient, superuser_token_headers: dict[str, str]
 ) -> None:
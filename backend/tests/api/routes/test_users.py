@@ -5,9 +5,12 @@ from fastapi.testclient import TestClient
 from sqlmodel import Session, select
 
 from app import crud
+from app.core.cache import user_cache
 from app.core.config import settings
+from app.core.hashing import password_hasher
+from app.core.revocation import token_revocations
 from app.core.security import verify_password
-from app.models import User, UserCreate
+from app.models import EmailOutbox, TokenRevocation, User, UserCreate, UsersPublic
 from tests.utils.user import create_random_user
 from tests.utils.utils import random_email, random_lower_string
 
@@ -34,11 +37,80 @@ def test_get_users_normal_user_me(
     assert current_user["email"] == settings.EMAIL_TEST_USER
 
 
+def test_get_users_me_cached(
+    client: TestClient, normal_user_token_headers: dict[str, str]
+) -> None:
+    client.get(f"{settings.API_V1_STR}/users/me", headers=normal_user_token_headers)
+    hits = user_cache.hits
+    r = client.get(f"{settings.API_V1_STR}/users/me", headers=normal_user_token_headers)
+    assert r.status_code == 200
+    assert r.json()["email"] == settings.EMAIL_TEST_USER
+    assert user_cache.hits == hits + 1
+
+
+def test_get_users_me_cached_revoked_by_other_worker(
+    client: TestClient, db: Session
+) -> None:
+    username = random_email()
+    password = random_lower_string()
+    user_in = UserCreate(email=username, password=password)
+    user = crud.create_user(session=db, user_create=user_in)
+    login_data = {"username": username, "password": password}
+    r = client.post(f"{settings.API_V1_STR}/login/access-token", data=login_data)
+    headers = {"Authorization": f"Bearer {r.json()['access_token']}"}
+    client.get(f"{settings.API_V1_STR}/users/me", headers=headers)
+    assert user_cache.get(str(user.id)) is not None
+
+    # Deactivated through another worker, whose caches this one doesn't see
+    user.is_active = False
+    user.token_version += 1
+    db.add(user)
+    db.add(TokenRevocation(user_id=user.id, token_version=user.token_version))
+    db.commit()
+    with patch.object(token_revocations, "_next_refresh", 0.0):
+        r = client.get(f"{settings.API_V1_STR}/users/me", headers=headers)
+    assert r.status_code == 400
+    assert r.json()["detail"] == "Inactive user"
+
+
+def test_get_users_me_etag(
+    client: TestClient, normal_user_token_headers: dict[str, str]
+) -> None:
+    url = f"{settings.API_V1_STR}/users/me"
+    etag = client.get(url, headers=normal_user_token_headers).headers["ETag"]
+    r = client.get(url, headers={**normal_user_token_headers, "If-None-Match": etag})
+    assert r.status_code == 304
+    r = client.get(url, headers={**normal_user_token_headers, "If-None-Match": '"x"'})
+    assert r.status_code == 200
+    assert r.headers["ETag"] == etag
+
+
+def test_update_user_me_invalidates_cache(client: TestClient, db: Session) -> None:
+    username = random_email()
+    password = random_lower_string()
+    user_in = UserCreate(email=username, password=password)
+    user = crud.create_user(session=db, user_create=user_in)
+    login_data = {"username": username, "password": password}
+    r = client.post(f"{settings.API_V1_STR}/login/access-token", data=login_data)
+    headers = {"Authorization": f"Bearer {r.json()['access_token']}"}
+
+    client.get(f"{settings.API_V1_STR}/users/me", headers=headers)
+    assert user_cache.get(str(user.id)) is not None
+    r = client.patch(
+        f"{settings.API_V1_STR}/users/me",
+        headers=headers,
+        json={"full_name": "Cached Name"},
+    )
+    assert r.status_code == 200
+    assert user_cache.get(str(user.id)) is None
+    r = client.get(f"{settings.API_V1_STR}/users/me", headers=headers)
+    assert r.json()["full_name"] == "Cached Name"
+
+
 def test_create_user_new_email(
     client: TestClient, superuser_token_headers: dict[str, str], db: Session
 ) -> None:
     with (
-        patch("app.utils.send_email", return_value=None),
         patch("app.core.config.settings.SMTP_HOST", "smtp.example.com"),
         patch("app.core.config.settings.SMTP_USER", "admin@example.com"),
     ):
@@ -55,6 +127,12 @@ def test_create_user_new_email(
         user = crud.get_user_by_email(session=db, email=username)
         assert user
         assert user.email == created_user["email"]
+        statement = select(EmailOutbox).where(EmailOutbox.email_to == username)
+        assert (
+            db.exec(statement)
+            .one()
+            .subject.endswith(f"New account for user {username}")
+        )
 
 
 def test_get_existing_user_as_superuser(
@@ -196,6 +274,32 @@ def test_retrieve_users(
     assert "count" in all_users
     for item in all_users["data"]:
         assert "email" in item
+    assert UsersPublic.model_validate(all_users).model_dump(mode="json") == all_users
+
+
+def test_retrieve_users_cursor(
+    client: TestClient, superuser_token_headers: dict[str, str]
+) -> None:
+    r = client.get(
+        f"{settings.API_V1_STR}/users/",
+        headers=superuser_token_headers,
+        params={"limit": 1},
+    )
+    first_page = r.json()
+    assert first_page["next_cursor"]
+
+    r = client.get(
+        f"{settings.API_V1_STR}/users/",
+        headers=superuser_token_headers,
+        params={"limit": 1, "cursor": first_page["next_cursor"]},
+    )
+    second_page = r.json()
+    r = client.get(
+        f"{settings.API_V1_STR}/users/",
+        headers=superuser_token_headers,
+        params={"limit": 1, "skip": 1},
+    )
+    assert second_page["data"] == r.json()["data"]
 
 
 def test_update_user_me(
@@ -221,6 +325,21 @@ def test_update_user_me(
     assert user_db.full_name == full_name
 
 
+def test_create_user_hash_queue_full(
+    client: TestClient, superuser_token_headers: dict[str, str]
+) -> None:
+    data = {"email": random_email(), "password": random_lower_string()}
+    with patch.object(
+        password_hasher,
+        "pending",
+        password_hasher.concurrency + password_hasher.max_queue,
+    ):
+        r = client.post(
+            f"{settings.API_V1_STR}/users/", headers=superuser_token_headers, json=data
+        )
+    assert r.status_code == 503
+
+
 def test_update_password_me(
     client: TestClient, superuser_token_headers: dict[str, str], db: Session
 ) -> None:
@@ -448,6 +567,35 @@ def test_delete_user_me(client: TestClient, db: Session) -> None:
     assert user_db is None
 
 
+def test_delete_user_me_cached_revokes_token_version(
+    client: TestClient, db: Session
+) -> None:
+    username = random_email()
+    password = random_lower_string()
+    user = crud.create_user(
+        session=db, user_create=UserCreate(email=username, password=password)
+    )
+    user.token_version = 3
+    db.add(user)
+    db.commit()
+    user_id = user.id
+    r = client.post(
+        f"{settings.API_V1_STR}/login/access-token",
+        data={"username": username, "password": password},
+    )
+    headers = {"Authorization": f"Bearer {r.json()['access_token']}"}
+    client.get(f"{settings.API_V1_STR}/users/me", headers=headers)
+    assert user_cache.get(str(user_id)) is not None
+
+    r = client.delete(f"{settings.API_V1_STR}/users/me", headers=headers)
+    assert r.status_code == 200
+    revocation = db.exec(
+        select(TokenRevocation).where(TokenRevocation.user_id == user_id)
+    ).one()
+    assert revocation.token_version == 4
+    assert token_revocations.is_stale(str(user_id), 3)
+
+
 def test_delete_user_me_as_superuser(
     client: TestClient, superuser_token_headers: dict[str, str]
 ) -> None:
@@ -0,0 +1,43 @@
+from fastapi.testclient import TestClient
+
+from app.core.config import settings
+
+
+def test_db_pool(client: TestClient, superuser_token_headers: dict[str, str]) -> None:
+    r = client.get(
+        f"{settings.API_V1_STR}/utils/db-pool/", headers=superuser_token_headers
+    )
+    assert r.status_code == 200
+    stats = r.json()
+    assert stats["sync"]["size"] == settings.DB_POOL_SIZE
+    assert stats["sync"]["checkouts"] > 0
+    assert stats["sync"]["checked_out"] >= 0
+    assert "async" in stats
+
+
+def test_db_pool_normal_user(
+    client: TestClient, normal_user_token_headers: dict[str, str]
+) -> None:
+    r = client.get(
+        f"{settings.API_V1_STR}/utils/db-pool/", headers=normal_user_token_headers
+    )
+    assert r.status_code == 403
+
+
+def test_items_cache_stats(
+    client: TestClient, superuser_token_headers: dict[str, str]
+) -> None:
+    r = client.get(
+        f"{settings.API_V1_STR}/utils/items-cache/", headers=superuser_token_headers
+    )
+    assert r.status_code == 200
+    stats = r.json()
+    assert stats["backend"] == settings.ITEMS_CACHE_BACKEND
+    assert stats["hits"] >= 0
+    assert 0 <= stats["hit_ratio"] <= 1
+
+
+def test_health_check(client: TestClient) -> None:
+    r = client.get(f"{settings.API_V1_STR}/utils/health-check/")
+    assert r.status_code == 200
+    assert r.json() is True
@@ -7,7 +7,7 @@ from sqlmodel import Session, delete
 from app.core.config import settings
 from app.core.db import engine, init_db
 from app.main import app
-from app.models import Item, User
+from app.models import Counter, EmailOutbox, Item, Job, TokenRevocation, User
 from tests.utils.user import authentication_token_from_email
 from tests.utils.utils import get_superuser_token_headers
 
@@ -21,6 +21,14 @@ def db() -> Generator[Session, None, None]:
         session.execute(statement)
         statement = delete(User)
         session.execute(statement)
+        statement = delete(EmailOutbox)
+        session.execute(statement)
+        statement = delete(Job)
+        session.execute(statement)
+        statement = delete(TokenRevocation)
+        session.execute(statement)
+        statement = delete(Counter)
+        session.execute(statement)
         session.commit()
 
 
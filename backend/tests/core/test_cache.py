@@ -0,0 +1,119 @@
+import uuid
+from unittest.mock import patch
+
+import fakeredis
+import pytest
+
+from app.core.cache import (
+    CacheBackend,
+    MemoryCacheBackend,
+    RedisCacheBackend,
+    ResponseCache,
+    TTLCache,
+    get_cache_backend,
+)
+
+
+def test_ttl_cache_hit_and_miss() -> None:
+    cache: TTLCache[str, int] = TTLCache(maxsize=2, ttl=60)
+    assert cache.get("a") is None
+    cache.set("a", 1)
+    assert cache.get("a") == 1
+    assert cache.stats() == {"hits": 1, "misses": 1, "size": 1}
+
+
+def test_ttl_cache_evicts_least_recently_used() -> None:
+    cache: TTLCache[str, int] = TTLCache(maxsize=2, ttl=60)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    assert cache.get("a") == 1
+    cache.set("c", 3)
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+    assert cache.get("c") == 3
+
+
+def test_ttl_cache_expires_entries() -> None:
+    cache: TTLCache[str, int] = TTLCache(maxsize=2, ttl=10)
+    with patch("app.core.cache.time.monotonic", return_value=100.0):
+        cache.set("a", 1)
+    with patch("app.core.cache.time.monotonic", return_value=111.0):
+        assert cache.get("a") is None
+    assert cache.stats()["size"] == 0
+
+
+def test_ttl_cache_delete() -> None:
+    cache: TTLCache[str, int] = TTLCache(maxsize=2, ttl=60)
+    cache.set("a", 1)
+    cache.delete("a")
+    cache.delete("missing")
+    assert cache.get("a") is None
+
+
+def test_ttl_cache_disabled() -> None:
+    cache: TTLCache[str, int] = TTLCache(maxsize=0, ttl=60)
+    cache.set("a", 1)
+    assert cache.get("a") is None
+    assert cache.stats() == {"hits": 0, "misses": 1, "size": 0}
+
+
+def test_ttl_cache_add() -> None:
+    cache: TTLCache[str, int] = TTLCache(maxsize=2, ttl=60)
+    assert cache.add("a", 1)
+    assert not cache.add("a", 2)
+    assert cache.get("a") == 1
+    with patch("app.core.cache.time.monotonic", return_value=0.0):
+        cache.set("b", 1, ttl=10)
+    assert cache.add("b", 2)
+    assert cache.get("b") == 2
+
+
+def make_response_cache(backend: CacheBackend) -> ResponseCache:
+    return ResponseCache(backend, prefix="test", ttl=60)
+
+
+@pytest.mark.parametrize(
+    "backend",
+    [MemoryCacheBackend(maxsize=10, ttl=60), RedisCacheBackend(fakeredis.FakeRedis())],
+    ids=["memory", "redis"],
+)
+def test_response_cache(backend: CacheBackend) -> None:
+    cache = make_response_cache(backend)
+    owner_id, other_owner_id = uuid.uuid4(), uuid.uuid4()
+    key, cached = cache.get(owner_id, 0, 100)
+    assert key is not None
+    assert cached is None
+    cache.set(key, 'W/"1"', b"[1]", version=1)
+    assert cache.get(owner_id, 0, 100) == (key, ('W/"1"', b"[1]"))
+    assert cache.get(owner_id, 0, 50)[1] is None
+
+    other_key, _ = cache.get(other_owner_id, 0, 100)
+    assert other_key is not None
+    cache.set(other_key, 'W/"2"', b"[2]", version=2)
+    cache.invalidate([owner_id])
+    assert cache.get(owner_id, 0, 100)[1] is None
+    assert cache.get(other_owner_id, 0, 100)[1] == ('W/"2"', b"[2]")
+    assert cache.stats() == {"hits": 2, "misses": 4, "hit_ratio": 2 / 6}
+
+
+def test_response_cache_skips_older_versions() -> None:
+    cache = make_response_cache(MemoryCacheBackend(maxsize=10, ttl=60))
+    owner_id = uuid.uuid4()
+    cache.invalidate([owner_id], {owner_id: 3})
+    key, _ = cache.get(owner_id, 0, 100)
+    assert key is not None
+    # Read from a replica that hasn't replayed the change yet
+    cache.set(key, 'W/"2"', b"[2]", version=2)
+    assert cache.get(owner_id, 0, 100)[1] is None
+    cache.set(key, 'W/"3"', b"[3]", version=3)
+    assert cache.get(owner_id, 0, 100)[1] == ('W/"3"', b"[3]")
+
+
+def test_response_cache_unreachable_redis() -> None:
+    backend = get_cache_backend(
+        "redis", redis_url="redis://localhost:1/0", maxsize=10, ttl=60
+    )
+    assert backend
+    cache = make_response_cache(backend)
+    assert cache.get(uuid.uuid4(), 0, 100) == (None, None)
+    cache.invalidate([uuid.uuid4()])
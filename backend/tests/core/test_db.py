@@ -0,0 +1,71 @@
+from unittest.mock import patch
+
+import anyio
+from sqlmodel import create_engine
+
+from app.core.config import settings
+from app.core.db import (
+    InstrumentedQueuePool,
+    PoolMetrics,
+    check_pool_capacity,
+    get_pool_stats,
+    logger,
+)
+
+
+def test_pool_metrics_observe() -> None:
+    metrics = PoolMetrics()
+    metrics.observe(0.5, timed_out=False)
+    metrics.observe(2.0, timed_out=True)
+    assert metrics.checkouts == 1
+    assert metrics.timeouts == 1
+    assert metrics.wait_seconds == 2.5
+    assert metrics.max_wait_seconds == 2.0
+
+
+async def run_check_pool_capacity() -> None:
+    check_pool_capacity()
+
+
+def test_check_pool_capacity_warns() -> None:
+    with (
+        patch("app.core.config.settings.DB_POOL_SIZE", 1),
+        patch("app.core.config.settings.DB_MAX_OVERFLOW", 0),
+        patch.object(logger, "warning") as warning,
+    ):
+        anyio.run(run_check_pool_capacity)
+    warning.assert_called_once()
+
+
+def test_check_pool_capacity_ok() -> None:
+    with (
+        patch("app.core.config.settings.DB_POOL_SIZE", 100),
+        patch.object(logger, "warning") as warning,
+    ):
+        anyio.run(run_check_pool_capacity)
+    warning.assert_not_called()
+
+
+def test_engine_uses_instrumented_pool() -> None:
+    from app.core.db import engine
+
+    assert isinstance(engine.pool, InstrumentedQueuePool)
+
+
+def test_engines_have_own_pool_metrics() -> None:
+    db_engine = create_engine(
+        str(settings.SQLALCHEMY_DATABASE_URI), poolclass=InstrumentedQueuePool
+    )
+    other_engine = create_engine(
+        str(settings.SQLALCHEMY_DATABASE_URI), poolclass=InstrumentedQueuePool
+    )
+    with db_engine.connect():
+        pass
+    assert get_pool_stats(db_engine)["checkouts"] == 1
+    assert get_pool_stats(other_engine)["checkouts"] == 0
+    # Counts are kept when the pool is recreated
+    db_engine.dispose()
+    with db_engine.connect():
+        pass
+    assert get_pool_stats(db_engine)["checkouts"] == 2
+    db_engine.dispose()
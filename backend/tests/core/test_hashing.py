@@ -0,0 +1,36 @@
+import asyncio
+
+import pytest
+
+from app.core.hashing import PasswordHasherPool, PasswordHashQueueFull
+from app.core.security import verify_password
+
+
+def test_password_hasher_pool_hash_and_verify() -> None:
+    pool = PasswordHasherPool(workers=0, max_queue=1, memory_limit_mb=128)
+
+    async def run() -> tuple[str, tuple[bool, str | None]]:
+        hashed = await pool.hash("secret-password")
+        return hashed, await pool.verify("secret-password", hashed)
+
+    try:
+        hashed, (verified, updated) = asyncio.run(run())
+    finally:
+        pool.shutdown()
+    assert verify_password("secret-password", hashed)[0]
+    assert verified
+    assert updated is None
+    assert pool.pending == 0
+
+
+def test_password_hasher_pool_concurrency_limited_by_memory() -> None:
+    pool = PasswordHasherPool(workers=8, max_queue=0, memory_limit_mb=128)
+    assert pool.concurrency == 2
+
+
+def test_password_hasher_pool_rejects_when_full() -> None:
+    pool = PasswordHasherPool(workers=0, max_queue=0, memory_limit_mb=64)
+    pool.pending = pool.concurrency
+    with pytest.raises(PasswordHashQueueFull):
+        asyncio.run(pool.hash("secret-password"))
+    assert pool.pending == pool.concurrency
@@ -0,0 +1,169 @@
+from collections.abc import Generator
+from datetime import datetime, timedelta, timezone
+from typing import Any
+from unittest.mock import patch
+
+import pytest
+from sqlmodel import Session, delete, select
+
+from app.core.db import engine
+from app.core.jobs import enqueue_job, job, retry_delay, run_next_job
+from app.jobs import (
+    TOKEN_REVOCATIONS_CLEANUP_SECONDS,
+    delete_token_revocations,
+    enqueue_periodic_jobs,
+)
+from app.models import Job, TokenRevocation, User
+from tests.utils.user import create_random_user
+
+calls: list[dict[str, Any]] = []
+
+
+@job
+def record_call(session: Session, **args: Any) -> None:  # noqa: ARG001
+    calls.append(args)
+
+
+@job
+def fail(session: Session, **args: Any) -> None:  # noqa: ARG001
+    raise ValueError("Failed")
+
+
+@job
+def deactivate_and_fail(session: Session, email: str) -> None:
+    user = session.exec(select(User).where(User.email == email)).one()
+    user.is_active = False
+    session.add(user)
+    session.flush()
+    raise ValueError("Failed")
+
+
+@pytest.fixture(autouse=True)
+def queue(db: Session) -> Generator[None, None, None]:
+    db.execute(delete(Job))
+    db.commit()
+    calls.clear()
+    yield
+    db.execute(delete(Job))
+    db.commit()
+
+
+def test_run_next_job(db: Session) -> None:
+    enqueue_job(session=db, name="record_call", args={"value": 1})
+    db.commit()
+    assert run_next_job(db)
+    assert calls == [{"value": 1}]
+    assert db.exec(select(Job)).all() == []
+    assert not run_next_job(db)
+
+
+def test_run_next_job_not_committed(db: Session) -> None:
+    enqueue_job(session=db, name="record_call")
+    with Session(engine) as session:
+        assert not run_next_job(session)
+    db.rollback()
+
+
+def test_run_next_job_priority(db: Session) -> None:
+    enqueue_job(session=db, name="record_call", args={"value": 1})
+    enqueue_job(session=db, name="record_call", args={"value": 2}, priority=1)
+    enqueue_job(session=db, name="record_call", args={"value": 3}, delay=60)
+    db.commit()
+    while run_next_job(db):
+        pass
+    assert calls == [{"value": 2}, {"value": 1}]
+
+
+def test_run_next_job_skip_locked(db: Session) -> None:
+    enqueue_job(session=db, name="record_call", args={"value": 1}, priority=1)
+    enqueue_job(session=db, name="record_call", args={"value": 2})
+    db.commit()
+    with Session(engine) as session:
+        # Claimed by another worker until its transaction ends
+        session.exec(select(Job).where(Job.priority == 1).with_for_update()).one()
+        assert run_next_job(db)
+        assert not run_next_job(db)
+    assert run_next_job(db)
+    assert calls == [{"value": 2}, {"value": 1}]
+
+
+def test_run_next_job_failure(db: Session) -> None:
+    db_job = enqueue_job(session=db, name="fail")
+    db.commit()
+    assert run_next_job(db)
+    db.refresh(db_job)
+    assert db_job.attempts == 1
+    assert db_job.last_error == "ValueError('Failed')"
+    assert db_job.failed_at is None
+    assert db_job.run_at > datetime.now(timezone.utc)
+    # Not due yet
+    assert not run_next_job(db)
+
+
+def test_run_next_job_failure_rolled_back(db: Session) -> None:
+    user = create_random_user(db)
+    enqueue_job(session=db, name="deactivate_and_fail", args={"email": user.email})
+    db.commit()
+    assert run_next_job(db)
+    db.refresh(user)
+    assert user.is_active
+
+
+def test_run_next_job_max_attempts(db: Session) -> None:
+    db_job = enqueue_job(session=db, name="fail", max_attempts=1)
+    db.commit()
+    assert run_next_job(db)
+    db.refresh(db_job)
+    assert db_job.attempts == 1
+    assert db_job.failed_at is not None
+    assert not run_next_job(db)
+
+
+def test_run_next_job_unknown(db: Session) -> None:
+    db_job = enqueue_job(session=db, name="unknown")
+    db.commit()
+    assert run_next_job(db)
+    db.refresh(db_job)
+    assert db_job.attempts == 1
+    assert db_job.last_error == "KeyError('unknown')"
+
+
+def test_retry_delay() -> None:
+    with patch("app.core.config.settings.JOB_RETRY_SECONDS", 10):
+        assert 5 <= retry_delay(1) <= 10
+        assert 20 <= retry_delay(3) <= 40
+        assert retry_delay(100) <= 60 * 60
+
+
+def test_delete_token_revocations(db: Session) -> None:
+    user = create_random_user(db)
+    old = TokenRevocation(
+        user_id=user.id,
+        token_version=1,
+        created_at=datetime.now(timezone.utc) - timedelta(days=365),
+    )
+    recent = TokenRevocation(user_id=user.id, token_version=2)
+    db.add_all([old, recent])
+    db.commit()
+    old_id, recent_id = old.id, recent.id
+    enqueue_job(session=db, name=delete_token_revocations.__name__)
+    db.commit()
+    assert run_next_job(db)
+    assert db.get(TokenRevocation, old_id) is None
+    assert db.get(TokenRevocation, recent_id) is not None
+    # Runs again later
+    next_run = db.exec(select(Job)).one()
+    assert next_run.name == delete_token_revocations.__name__
+    assert next_run.run_at > datetime.now(timezone.utc) + timedelta(
+        seconds=TOKEN_REVOCATIONS_CLEANUP_SECONDS - 60
+    )
+
+
+def test_enqueue_periodic_jobs(db: Session) -> None:
+    enqueue_periodic_jobs(db)
+    enqueue_periodic_jobs(db)
+    queued = db.exec(select(Job)).all()
+    assert [db_job.name for db_job in queued] == [delete_token_revocations.__name__]
+    assert run_next_job(db)
+    # Only the run it enqueued is left
+    assert len(db.exec(select(Job)).all()) == 1
@@ -0,0 +1,90 @@
+import os
+import subprocess
+import sys
+from pathlib import Path
+from unittest.mock import patch
+
+from fastapi.testclient import TestClient
+from prometheus_client.parser import text_string_to_metric_families
+
+from app.core.config import Settings, settings
+
+
+def sample(metrics: str, name: str, labels: dict[str, str]) -> float | None:
+    for family in text_string_to_metric_families(metrics):
+        for s in family.samples:
+            if s.name == name and all(s.labels.get(k) == v for k, v in labels.items()):
+                return s.value
+    return None
+
+
+def test_metrics(client: TestClient) -> None:
+    client.get(f"{settings.API_V1_STR}/utils/health-check/")
+    r = client.get("/metrics")
+    assert r.status_code == 200
+    assert r.headers["content-type"].startswith("text/plain")
+    count = sample(
+        r.text,
+        "http_request_duration_seconds_count",
+        {"operation": "utils-health_check", "method": "GET", "status": "200"},
+    )
+    assert count and count >= 1
+    # The scrape itself is in progress
+    labels = {"operation": "metrics-metrics", "method": "GET"}
+    assert sample(r.text, "http_requests_in_progress", labels) == 1
+    assert sample(r.text, "db_pool_size", {"engine": "sync"}) == settings.DB_POOL_SIZE
+    assert sample(r.text, "threadpool_threads", {}) == 40
+    assert sample(r.text, "password_hash_pending", {}) == 0
+
+
+def test_metrics_token(client: TestClient) -> None:
+    with patch("app.core.config.settings.METRICS_TOKEN", "secret"):
+        assert client.get("/metrics").status_code == 401
+        r = client.get("/metrics", headers={"Authorization": "Bearer wrong"})
+        assert r.status_code == 401
+        r = client.get("/metrics", headers={"Authorization": "Bearer secret"})
+        assert r.status_code == 200
+
+
+def test_metrics_enabled_outside_local_with_token() -> None:
+    def copy(**update: str | None) -> Settings:
+        return settings.model_copy(update=update)
+
+    assert copy(ENVIRONMENT="local", METRICS_TOKEN=None).metrics_enabled
+    assert not copy(ENVIRONMENT="staging", METRICS_TOKEN=None).metrics_enabled
+    assert copy(ENVIRONMENT="staging", METRICS_TOKEN="secret").metrics_enabled
+
+
+def test_metrics_unmatched(client: TestClient) -> None:
+    client.get("/not-found")
+    r = client.get("/metrics")
+    labels = {"operation": "unmatched", "method": "GET", "status": "404"}
+    assert sample(r.text, "http_request_duration_seconds_count", labels)
+
+
+WORKER = """
+from fastapi.testclient import TestClient
+from app.main import app
+
+with TestClient(app) as client:
+    client.get("/api/v1/utils/health-check/")
+    print(client.get("/metrics").text)
+"""
+
+
+def test_metrics_multiprocess(tmp_path: Path) -> None:
+    # Like the workers of `fastapi run --workers 2`, sharing a directory
+    env = {**os.environ, "PROMETHEUS_MULTIPROC_DIR": str(tmp_path)}
+    for _ in range(2):
+        result = subprocess.run(
+            [sys.executable, "-c", WORKER],
+            env=env,
+            capture_output=True,
+            check=True,
+            text=True,
+        )
+    labels = {"operation": "utils-health_check", "method": "GET", "status": "200"}
+    assert sample(result.stdout, "http_request_duration_seconds_count", labels) == 2
+    # The first worker exited, only the scraping one is in progress
+    labels = {"operation": "metrics-metrics", "method": "GET"}
+    assert sample(result.stdout, "http_requests_in_progress", labels) == 1
@@ -0,0 +1,116 @@
+import math
+import time
+from typing import Any
+from unittest.mock import patch
+
+import fakeredis
+from fastapi.testclient import TestClient
+from sqlmodel import create_engine
+from starlette.responses import PlainTextResponse
+from starlette.types import Receive, Scope, Send
+
+from app.core.cache import RedisCacheBackend
+from app.core.config import settings
+from app.core.db import async_engine, engine
+from app.core.replicas import ReadYourWritesMiddleware, ReplicaRouter
+
+
+def make_router(replicas: int = 2, **kwargs: Any) -> ReplicaRouter:
+    options = {"max_lag": 5.0, "lag_check_seconds": 60.0, "sticky_seconds": 60.0}
+    return ReplicaRouter([engine] * replicas, **{**options, **kwargs})
+
+
+def test_choose_round_robin() -> None:
+    router = make_router(replicas=2)
+    assert [router.choose(None) for _ in range(4)] == [0, 1, 0, 1]
+
+
+def test_choose_without_replicas() -> None:
+    assert make_router(replicas=0).choose(None) is None
+
+
+def test_choose_primary_after_write() -> None:
+    router = make_router()
+    router.mark_write("Bearer writer")
+    assert router.choose("Bearer writer") is None
+    assert router.choose("Bearer reader") is not None
+
+
+def test_choose_primary_after_write_on_other_worker() -> None:
+    writers = RedisCacheBackend(fakeredis.FakeRedis())
+    router = make_router(writers=writers)
+    other_worker = make_router(writers=writers)
+    other_worker.mark_write("Bearer secret")
+    assert router.choose("Bearer secret") is None
+    assert router.choose("Bearer reader") is not None
+    # Tokens aren't stored as they are
+    assert not any(b"secret" in key for key in writers.client.keys())
+
+
+def test_choose_skips_lagging_replica() -> None:
+    router = make_router(replicas=2)
+    with patch.object(ReplicaRouter, "_measure_lag", side_effect=[10.0, 0.0]):
+        assert [router.choose(None) for _ in range(3)] == [1, 1, 1]
+
+
+def test_choose_primary_when_all_replicas_lag() -> None:
+    router = make_router(replicas=2)
+    with patch.object(ReplicaRouter, "_measure_lag", return_value=10.0):
+        assert router.choose(None) is None
+
+
+def test_lag_is_cached() -> None:
+    router = make_router(replicas=1)
+    with patch.object(ReplicaRouter, "_measure_lag", return_value=0.0) as measure:
+        router.choose(None)
+        router.choose(None)
+    measure.assert_called_once()
+
+
+def test_measure_lag_of_primary() -> None:
+    # A server that isn't in recovery has nothing to replay
+    assert make_router()._measure_lag(engine) == 0
+
+
+def test_measure_lag_of_unreachable_replica() -> None:
+    unreachable = create_engine(engine.url.set(port=1))
+    assert make_router()._measure_lag(unreachable) == math.inf
+
+
+def test_measure_lag_timeout() -> None:
+    router = make_router(timeout=0.1)
+    start = time.monotonic()
+    with patch("app.core.replicas.LAG_QUERY", "SELECT pg_sleep(5)"):
+        assert router._measure_lag(engine) == math.inf
+    assert time.monotonic() - start < 2
+
+
+def test_read_your_writes_middleware() -> None:
+    async def app(scope: Scope, receive: Receive, send: Send) -> None:  # noqa: ARG001
+        await PlainTextResponse("OK")(scope, receive, send)
+
+    router = make_router()
+    client = TestClient(ReadYourWritesMiddleware(app))
+    headers = {"Authorization": "Bearer writer"}
+    with patch("app.core.replicas.replicas", router):
+        client.get("/", headers=headers)
+        assert router.choose("Bearer writer") is not None
+        client.post("/", headers=headers)
+        assert router.choose("Bearer writer") is None
+
+
+def test_read_routes_use_replica(
+    client: TestClient, superuser_token_headers: dict[str, str]
+) -> None:
+    router = make_router(replicas=1)
+    with (
+        patch("app.api.deps.replicas", router),
+        patch("app.api.deps.replica_engines", [engine]),
+        patch("app.api.deps.async_replica_engines", [async_engine]),
+        patch.object(router, "choose", wraps=router.choose) as choose,
+    ):
+        r = client.get(f"{settings.API_V1_STR}/items/", headers=superuser_token_headers)
+        assert r.status_code == 200
+        r = client.get(f"{settings.API_V1_STR}/users/", headers=superuser_token_headers)
+        assert r.status_code == 200
+    assert choose.call_count == 2
@@ -0,0 +1,94 @@
+import logging
+import re
+import uuid
+from unittest.mock import patch
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlmodel import Session, select
+
+from app.core.config import settings
+from app.core.db import engine
+from app.core.sql_stats import SQLStatsMiddleware
+from app.models import User
+
+SERVER_TIMING = re.compile(r'^db;dur=\d+\.\d;desc="(\d+) queries"$')
+
+stats_app = FastAPI()
+stats_app.add_middleware(SQLStatsMiddleware)
+
+
+@stats_app.get("/queries/{count}")
+def run_queries(count: int) -> None:
+    # Like loading the owner of every item of a page
+    with Session(engine) as session:
+        for _ in range(count):
+            session.exec(select(User).where(User.id == uuid.uuid4()))
+
+
+def sql_stats_records(
+    caplog: pytest.LogCaptureFixture, level: int
+) -> list[logging.LogRecord]:
+    return [
+        r
+        for r in caplog.records
+        if r.name == "app.core.sql_stats" and r.levelno == level
+    ]
+
+
+@pytest.fixture(scope="module")
+def stats_client() -> TestClient:
+    return TestClient(stats_app)
+
+
+def queries(server_timing: str) -> int:
+    match = SERVER_TIMING.match(server_timing)
+    assert match
+    return int(match[1])
+
+
+def test_server_timing(stats_client: TestClient) -> None:
+    r = stats_client.get("/queries/3")
+    assert queries(r.headers["Server-Timing"]) == 3
+    r = stats_client.get("/queries/0")
+    assert queries(r.headers["Server-Timing"]) == 0
+
+
+def test_server_timing_api(
+    client: TestClient, superuser_token_headers: dict[str, str]
+) -> None:
+    r = client.get(f"{settings.API_V1_STR}/items/", headers=superuser_token_headers)
+    assert r.status_code == 200
+    assert queries(r.headers["Server-Timing"]) >= 1
+
+
+def test_log(stats_client: TestClient, caplog: pytest.LogCaptureFixture) -> None:
+    with caplog.at_level(logging.INFO, logger="app.core.sql_stats"):
+        stats_client.get("/queries/2")
+    [record] = sql_stats_records(caplog, logging.INFO)
+    assert record.getMessage().startswith("GET /queries/{count} 200: 2 queries in")
+    assert record.__dict__["queries"] == 2
+    assert record.__dict__["path"] == "/queries/{count}"
+
+
+def test_repeated_statement_warning(
+    stats_client: TestClient, caplog: pytest.LogCaptureFixture
+) -> None:
+    with patch("app.core.config.settings.SQL_REPEATED_STATEMENT_THRESHOLD", 3):
+        stats_client.get("/queries/3")
+        assert not sql_stats_records(caplog, logging.WARNING)
+        stats_client.get("/queries/4")
+        [warning] = sql_stats_records(caplog, logging.WARNING)
+        assert "ran the same statement 4 times" in warning.getMessage()
+
+
+def test_repeated_statement_warning_production(
+    stats_client: TestClient, caplog: pytest.LogCaptureFixture
+) -> None:
+    with (
+        patch("app.core.config.settings.SQL_REPEATED_STATEMENT_THRESHOLD", 3),
+        patch("app.core.config.settings.ENVIRONMENT", "production"),
+    ):
+        stats_client.get("/queries/4")
+    assert not sql_stats_records(caplog, logging.WARNING)
@@ -0,0 +1,60 @@
+import uuid
+from typing import Any
+
+from app.core.config import settings
+from app.core.tracing import TracesSampler
+from app.main import app
+
+
+def make_sampler(**kwargs: Any) -> TracesSampler:
+    options = {
+        "default_rate": 1.0,
+        "rates": {},
+        "max_per_second": None,
+        "error_seconds": 60.0,
+    }
+    return TracesSampler(app.router, **{**options, **kwargs})
+
+
+def sampling_context(path: str, parent_sampled: bool | None = None) -> dict[str, Any]:
+    scope = {
+        "type": "http",
+        "method": "GET",
+        "path": f"{settings.API_V1_STR}{path}",
+        "root_path": "",
+    }
+    return {"asgi_scope": scope, "parent_sampled": parent_sampled}
+
+
+def test_route_rates() -> None:
+    sampler = make_sampler(rates={"utils-health_check": 0.0})
+    assert sampler(sampling_context("/utils/health-check/")) == 0
+    assert sampler(sampling_context("/items/")) == 1
+    sampler = make_sampler(default_rate=0.0, rates={"items-read_items": 1.0})
+    assert sampler(sampling_context("/items/")) == 1
+    assert sampler(sampling_context("/users/")) == 0
+
+
+def test_parent_sampled() -> None:
+    sampler = make_sampler(default_rate=0.0)
+    assert sampler(sampling_context("/items/", parent_sampled=True)) == 1
+    sampler = make_sampler(default_rate=1.0)
+    assert sampler(sampling_context("/items/", parent_sampled=False)) == 0
+
+
+def test_max_per_second() -> None:
+    sampler = make_sampler(max_per_second=3.0)
+    decisions = [sampler(sampling_context("/items/")) for _ in range(10)]
+    assert sum(decisions) == 3
+
+
+def test_traced_after_error() -> None:
+    sampler = make_sampler(default_rate=0.0)
+    item_path = f"/items/{uuid.uuid4()}"
+    assert sampler(sampling_context(item_path)) == 0
+    sampler.before_send({"transaction": f"{settings.API_V1_STR}/items/{{id}}"}, {})
+    assert sampler(sampling_context(item_path)) == 1
+    assert sampler(sampling_context("/items/")) == 0
+    sampler = make_sampler(default_rate=0.0, error_seconds=0.0)
+    sampler.before_send({"transaction": f"{settings.API_V1_STR}/items/{{id}}"}, {})
+    assert sampler(sampling_context(item_path)) == 0
@@ -0,0 +1,132 @@
+import uuid
+from collections.abc import Generator
+from contextlib import contextmanager
+from typing import Any
+
+from sqlalchemy import event
+from sqlmodel import Session
+
+from app import crud
+from app.models import Item, ItemBulkUpdate, ItemUpdate, User
+from tests.utils.item import create_random_item
+
+
+@contextmanager
+def record_statements(db: Session) -> Generator[list[str], None, None]:
+    statements: list[str] = []
+
+    def before_cursor_execute(*args: Any) -> None:
+        statements.append(args[2])
+
+    bind = db.get_bind()
+    event.listen(bind, "before_cursor_execute", before_cursor_execute)
+    try:
+        yield statements
+    finally:
+        event.remove(bind, "before_cursor_execute", before_cursor_execute)
+
+
+def test_update_item(db: Session) -> None:
+    item = create_random_item(db)
+    with record_statements(db) as statements:
+        updated = crud.update_item(
+            session=db,
+            id=item.id,
+            item_in=ItemUpdate(title="Updated"),
+            owner_id=item.owner_id,
+        )
+    assert updated
+    assert updated.title == "Updated"
+    assert updated.description == item.description
+    assert updated.version == item.version + 1
+    # The owner's items are marked as changed in the same statement
+    assert len(statements) == 1
+    assert statements[0].startswith("WITH changed AS \n(UPDATE item")
+
+
+def test_update_item_versions(db: Session) -> None:
+    item = create_random_item(db)
+    item_in = ItemUpdate(title="Updated")
+    stale = [item.version + 1]
+    assert not crud.update_item(session=db, id=item.id, item_in=item_in, versions=stale)
+    updated = crud.update_item(
+        session=db, id=item.id, item_in=item_in, versions=[item.version]
+    )
+    assert updated
+    assert updated.title == "Updated"
+
+
+def test_update_item_other_owner(db: Session) -> None:
+    item = create_random_item(db)
+    updated = crud.update_item(
+        session=db,
+        id=item.id,
+        item_in=ItemUpdate(title="Updated"),
+        owner_id=uuid.uuid4(),
+    )
+    assert updated is None
+    db_item = db.get(Item, item.id)
+    assert db_item
+    db.refresh(db_item)
+    assert db_item.title == item.title
+
+
+def test_update_item_empty(db: Session) -> None:
+    item = create_random_item(db)
+    updated = crud.update_item(session=db, id=item.id, item_in=ItemUpdate())
+    assert updated
+    assert updated.title == item.title
+
+
+def test_item_changes_bump_items_version(db: Session) -> None:
+    item = create_random_item(db)
+    owner = db.get(User, item.owner_id)
+    assert owner
+
+    def items_version() -> int:
+        db.refresh(owner)
+        return owner.items_version
+
+    version = items_version()
+    crud.update_item(session=db, id=item.id, item_in=ItemUpdate(title="Updated"))
+    assert items_version() == version + 1
+    crud.update_items(session=db, items_in=[ItemBulkUpdate(id=item.id, title="Bulk")])
+    assert items_version() == version + 2
+    crud.delete_item(session=db, id=item.id)
+    assert items_version() == version + 3
+
+
+def test_bulk_item_changes_bump_items_versions(db: Session) -> None:
+    items = [create_random_item(db) for _ in range(3)]
+    owners = [db.get(User, item.owner_id) for item in items]
+    versions = {owner.id: owner.items_version for owner in owners if owner}
+    assert len(versions) == 3
+    items_in = [ItemBulkUpdate(id=item.id, title="Bulk") for item in items]
+    with record_statements(db) as statements:
+        results = crud.update_items(session=db, items_in=items_in)
+    assert all(results[item.id] for item in items)
+    # All owners are marked as changed in one statement, locked in id order
+    assert [statement.split(" ")[0] for statement in statements] == [
+        "SELECT",
+        "UPDATE",
+        "UPDATE",
+    ]
+    assert "ORDER BY" in statements[2]
+    for owner in owners:
+        assert owner
+        db.refresh(owner)
+        assert owner.items_version == versions[owner.id] + 1
+    results = crud.delete_items(session=db, ids=[item.id for item in items])
+    assert all(results.values())
+    for owner in owners:
+        assert owner
+        db.refresh(owner)
+        assert owner.items_version == versions[owner.id] + 2
+
+
+def test_delete_item(db: Session) -> None:
+    item = create_random_item(db)
+    assert not crud.delete_item(session=db, id=item.id, owner_id=uuid.uuid4())
+    assert crud.delete_item(session=db, id=item.id, owner_id=item.owner_id)
+    assert crud.get_item(session=db, id=item.id) is None
+    assert not crud.delete_item(session=db, id=item.id)
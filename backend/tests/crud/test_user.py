@@ -1,10 +1,15 @@
+from unittest.mock import patch
+
 from fastapi.encoders import jsonable_encoder
 from pwdlib.hashers.bcrypt import BcryptHasher
-from sqlmodel import Session
+from sqlmodel import Session, col, delete, func, select
 
 from app import crud
+from app.core.jobs import run_next_job
 from app.core.security import verify_password
-from app.models import User, UserCreate, UserUpdate
+from app.jobs import delete_user
+from app.models import Item, ItemCreate, Job, User, UserCreate, UserUpdate
+from tests.utils.user import create_random_user
 from tests.utils.utils import random_email, random_lower_string
 
 
@@ -128,3 +133,37 @@ def test_authenticate_user_with_bcrypt_upgrades_to_argon2(db: Session) -> None:
     assert verified
     # Should not need another update since it's already argon2
     assert updated_hash is None
+
+
+def test_delete_user(db: Session) -> None:
+    user = create_random_user(db)
+    user_id = user.id
+    crud.create_items(
+        session=db, items_in=[ItemCreate(title="Item")] * 2, owner_id=user_id
+    )
+    assert crud.delete_user(session=db, db_user=user)
+    assert db.get(User, user_id) is None
+    assert not db.exec(select(Item).where(Item.owner_id == user_id)).all()
+
+
+def test_delete_user_in_batches(db: Session) -> None:
+    db.execute(delete(Job))
+    user = create_random_user(db)
+    user_id = user.id
+    crud.create_items(
+        session=db, items_in=[ItemCreate(title="Item")] * 5, owner_id=user_id
+    )
+    items = select(func.count()).where(col(Item.owner_id) == user_id)
+    with patch("app.core.config.settings.USER_DELETE_BATCH_SIZE", 2):
+        assert not crud.delete_user(session=db, db_user=user)
+        db.refresh(user)
+        assert not user.is_active
+        assert db.exec(items).one() == 3
+        job = db.exec(select(Job)).one()
+        assert job.name == delete_user.__name__
+        assert run_next_job(db)
+        assert db.exec(items).one() == 1
+        assert run_next_job(db)
+        assert not run_next_job(db)
+    assert db.get(User, user_id) is None
+    assert db.exec(items).one() == 0
@@ -0,0 +1,200 @@
+import socket
+from collections.abc import Generator
+from datetime import datetime, timezone
+from typing import Any
+from unittest.mock import patch
+
+import pytest
+from aiosmtpd.controller import Controller
+from emails.backend.smtp.backend import SMTPBackend
+from sqlmodel import Session, delete, select
+
+from app.core.config import settings
+from app.email_worker import main, retry_delay, send_batch
+from app.models import EmailOutbox
+from app.utils import get_smtp_options, queue_email, send_email
+
+
+class Handler:
+    """
+    Stand-in SMTP server, replies `reply` to every message it receives.
+    """
+
+    def __init__(self) -> None:
+        self.messages: list[Any] = []
+        self.reply = "250 OK"
+
+    async def handle_DATA(self, _server: Any, _session: Any, envelope: Any) -> str:
+        self.messages.append(envelope)
+        return self.reply
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return int(s.getsockname()[1])
+
+
+@pytest.fixture
+def port() -> int:
+    return free_port()
+
+
+@pytest.fixture
+def handler(port: int) -> Generator[Handler, None, None]:
+    handler = Handler()
+    controller = Controller(handler, hostname="127.0.0.1", port=port)
+    controller.start()
+    yield handler
+    controller.stop()
+
+
+@pytest.fixture
+def smtp(port: int) -> Generator[SMTPBackend, None, None]:
+    with (
+        patch("app.core.config.settings.SMTP_HOST", "127.0.0.1"),
+        patch("app.core.config.settings.SMTP_PORT", port),
+        patch("app.core.config.settings.SMTP_TLS", False),
+        patch("app.core.config.settings.SMTP_SSL", False),
+        patch("app.core.config.settings.SMTP_USER", None),
+        patch("app.core.config.settings.EMAILS_FROM_EMAIL", "noreply@example.com"),
+    ):
+        smtp = SMTPBackend(**get_smtp_options())
+        yield smtp
+        smtp.close()
+
+
+@pytest.fixture(autouse=True)
+def outbox(db: Session) -> Generator[None, None, None]:
+    db.execute(delete(EmailOutbox))
+    db.commit()
+    yield
+    db.execute(delete(EmailOutbox))
+    db.commit()
+
+
+def queue(db: Session, count: int = 1) -> None:
+    for i in range(count):
+        queue_email(
+            session=db,
+            email_to=f"user{i}@example.com",
+            subject="Subject",
+            html_content="<p>Hello</p>",
+        )
+    db.commit()
+
+
+def test_send_batch(db: Session, handler: Handler, smtp: SMTPBackend) -> None:
+    queue(db, count=3)
+    assert send_batch(db, smtp) == 3
+    assert sorted(envelope.rcpt_tos[0] for envelope in handler.messages) == [
+        "user0@example.com",
+        "user1@example.com",
+        "user2@example.com",
+    ]
+    assert db.exec(select(EmailOutbox)).all() == []
+    assert send_batch(db, smtp) == 0
+
+
+def test_send_batch_size(db: Session, handler: Handler, smtp: SMTPBackend) -> None:
+    queue(db, count=3)
+    with patch("app.core.config.settings.EMAIL_OUTBOX_BATCH_SIZE", 2):
+        assert send_batch(db, smtp) == 2
+        assert send_batch(db, smtp) == 1
+    assert len(handler.messages) == 3
+
+
+def test_send_batch_temporary_failure(
+    db: Session, handler: Handler, smtp: SMTPBackend
+) -> None:
+    handler.reply = "451 Try again later"
+    queue(db)
+    assert send_batch(db, smtp) == 1
+    email = db.exec(select(EmailOutbox)).one()
+    db.refresh(email)
+    assert email.attempts == 1
+    assert email.last_error
+    assert email.dead_at is None
+    assert email.next_attempt_at > datetime.now(timezone.utc)
+    # Not due yet
+    assert send_batch(db, smtp) == 0
+
+
+def test_send_batch_unreachable(db: Session, smtp: SMTPBackend) -> None:
+    queue(db)
+    assert send_batch(db, smtp) == 1
+    email = db.exec(select(EmailOutbox)).one()
+    db.refresh(email)
+    assert email.attempts == 1
+    assert email.dead_at is None
+
+
+def test_send_batch_error(db: Session, handler: Handler, smtp: SMTPBackend) -> None:
+    def send_or_fail(**kwargs: Any) -> Any:
+        if kwargs["email_to"] == "user0@example.com":
+            raise RuntimeError("Template error")
+        return send_email(**kwargs)
+
+    queue(db, count=2)
+    with patch("app.email_worker.send_email", side_effect=send_or_fail):
+        assert send_batch(db, smtp) == 2
+    # The other email of the batch is sent, the failed one retried later
+    assert [envelope.rcpt_tos[0] for envelope in handler.messages] == [
+        "user1@example.com"
+    ]
+    email = db.exec(select(EmailOutbox)).one()
+    db.refresh(email)
+    assert email.email_to == "user0@example.com"
+    assert email.attempts == 1
+    assert "Template error" in email.last_error
+    assert email.dead_at is None
+
+
+def test_send_batch_rejected(db: Session, handler: Handler, smtp: SMTPBackend) -> None:
+    handler.reply = "550 No such user"
+    queue(db)
+    assert send_batch(db, smtp) == 1
+    email = db.exec(select(EmailOutbox)).one()
+    db.refresh(email)
+    assert email.attempts == 1
+    assert email.dead_at is not None
+    assert "550" in email.last_error
+
+
+def test_send_batch_max_attempts(
+    db: Session, handler: Handler, smtp: SMTPBackend
+) -> None:
+    handler.reply = "451 Try again later"
+    queue(db)
+    email = db.exec(select(EmailOutbox)).one()
+    email.attempts = settings.EMAIL_OUTBOX_MAX_ATTEMPTS - 1
+    db.add(email)
+    db.commit()
+    assert send_batch(db, smtp) == 1
+    db.refresh(email)
+    assert email.attempts == settings.EMAIL_OUTBOX_MAX_ATTEMPTS
+    assert email.dead_at is not None
+
+
+def test_queue_email_disabled(db: Session) -> None:
+    with patch("app.core.config.settings.SMTP_HOST", None):
+        queue(db)
+    assert db.exec(select(EmailOutbox)).all() == []
+
+
+def test_main_disabled() -> None:
+    with (
+        patch("app.core.config.settings.SMTP_HOST", None),
+        patch("app.email_worker.signal.pause") as pause,
+        patch("app.email_worker.send_batch") as send_batch,
+    ):
+        main()
+    pause.assert_called_once()
+    send_batch.assert_not_called()
+
+
+def test_retry_delay() -> None:
+    with patch("app.core.config.settings.EMAIL_OUTBOX_RETRY_SECONDS", 10):
+        assert 5 <= retry_delay(1) <= 10
+        assert 20 <= retry_delay(3) <= 40
+        assert retry_delay(100) <= 60 * 60
@@ -0,0 +1,50 @@
+from collections.abc import Generator
+
+import pytest
+from sqlmodel import Session, col, delete, func, select
+
+from app.core.security import verify_password
+from app.models import Item, User
+from app.seed_data import generate_user, items_per_user, seed_data
+
+SEED = 1234
+
+
+@pytest.fixture
+def seeded(db: Session) -> Generator[None, None, None]:
+    yield
+    db.execute(delete(User).where(col(User.email).startswith(f"seed-{SEED}-")))
+    db.commit()
+
+
+def test_items_per_user() -> None:
+    counts = items_per_user(users=1000, items=10, seed=SEED)
+    assert sum(counts) == 10_000
+    assert counts == items_per_user(users=1000, items=10, seed=SEED)
+    # Skewed, the top fifth of the users own most items
+    assert sum(sorted(counts, reverse=True)[:200]) > 5000
+
+
+def test_generate_user_deterministic() -> None:
+    args = {"seed": SEED, "n": 3, "item_count": 5, "hashed_password": "hash"}
+    user, items = generate_user(**args)
+    assert (user, items) == generate_user(**args)
+    assert len(items) == 5
+    assert all(item[3] == user[0] for item in items)
+    assert generate_user(**{**args, "n": 4})[0][0] != user[0]
+
+
+@pytest.mark.usefixtures("seeded")
+def test_seed_data(db: Session) -> None:
+    seed_data(db, users=20, items=5, seed=SEED, password="seed-password")
+    users = db.exec(
+        select(User).where(col(User.email).startswith(f"seed-{SEED}-"))
+    ).all()
+    assert len(users) == 20
+    assert verify_password("seed-password", users[0].hashed_password)[0]
+    owner_ids = [user.id for user in users]
+    count = select(func.count()).where(col(Item.owner_id).in_(owner_ids))
+    assert db.exec(count).one() == 100
+    # Running it again adds nothing
+    seed_data(db, users=20, items=5, seed=SEED, password="seed-password")
+    assert db.exec(count).one() == 100
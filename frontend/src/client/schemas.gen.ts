@@ -57,6 +57,42 @@ export const Body_login_login_access_tokenSchema = {
     title: 'Body_login-login_access_token'
 } as const;
 
+export const DatabasePoolStatsSchema = {
+    properties: {
+        size: {
+            type: 'integer',
+            title: 'Size'
+        },
+        checked_out: {
+            type: 'integer',
+            title: 'Checked Out'
+        },
+        overflow: {
+            type: 'integer',
+            title: 'Overflow'
+        },
+        checkouts: {
+            type: 'integer',
+            title: 'Checkouts'
+        },
+        timeouts: {
+            type: 'integer',
+            title: 'Timeouts'
+        },
+        wait_seconds: {
+            type: 'number',
+            title: 'Wait Seconds'
+        },
+        max_wait_seconds: {
+            type: 'number',
+            title: 'Max Wait Seconds'
+        }
+    },
+    type: 'object',
+    required: ['size', 'checked_out', 'overflow', 'checkouts', 'timeouts', 'wait_seconds', 'max_wait_seconds'],
+    title: 'DatabasePoolStats'
+} as const;
+
 export const HTTPValidationErrorSchema = {
     properties: {
         detail: {
@@ -71,6 +107,71 @@ export const HTTPValidationErrorSchema = {
     title: 'HTTPValidationError'
 } as const;
 
+export const ItemBulkResultSchema = {
+    properties: {
+        id: {
+            type: 'string',
+            format: 'uuid',
+            title: 'Id'
+        },
+        status: {
+            type: 'integer',
+            title: 'Status'
+        },
+        item: {
+            anyOf: [
+                {
+                    '$ref': '#/components/schemas/ItemPublic'
+                },
+                {
+                    type: 'null'
+                }
+            ]
+        }
+    },
+    type: 'object',
+    required: ['id', 'status'],
+    title: 'ItemBulkResult'
+} as const;
+
+export const ItemBulkUpdateSchema = {
+    properties: {
+        title: {
+            anyOf: [
+                {
+                    type: 'string',
+                    maxLength: 255,
+                    minLength: 1
+                },
+                {
+                    type: 'null'
+                }
+            ],
+            title: 'Title'
+        },
+        description: {
+            anyOf: [
+                {
+                    type: 'string',
+                    maxLength: 255
+                },
+                {
+                    type: 'null'
+                }
+            ],
+            title: 'Description'
+        },
+        id: {
+            type: 'string',
+            format: 'uuid',
+            title: 'Id'
+        }
+    },
+    type: 'object',
+    required: ['id'],
+    title: 'ItemBulkUpdate'
+} as const;
+
 export const ItemCreateSchema = {
     properties: {
         title: {
@@ -177,6 +278,21 @@ export const ItemUpdateSchema = {
     title: 'ItemUpdate'
 } as const;
 
+export const ItemsBulkResultsSchema = {
+    properties: {
+        data: {
+            items: {
+                '$ref': '#/components/schemas/ItemBulkResult'
+            },
+            type: 'array',
+            title: 'Data'
+        }
+    },
+    type: 'object',
+    required: ['data'],
+    title: 'ItemsBulkResults'
+} as const;
+
 export const ItemsPublicSchema = {
     properties: {
         data: {
@@ -187,8 +303,26 @@ export const ItemsPublicSchema = {
             title: 'Data'
         },
         count: {
-            type: 'integer',
+            anyOf: [
+                {
+                    type: 'integer'
+                },
+                {
+                    type: 'null'
+                }
+            ],
             title: 'Count'
+        },
+        next_cursor: {
+            anyOf: [
+                {
+                    type: 'string'
+                },
+                {
+                    type: 'null'
+                }
+            ],
+            title: 'Next Cursor'
         }
     },
     type: 'object',
@@ -251,6 +385,30 @@ export const PrivateUserCreateSchema = {
     title: 'PrivateUserCreate'
 } as const;
 
+export const ResponseCacheStatsSchema = {
+    properties: {
+        backend: {
+            type: 'string',
+            title: 'Backend'
+        },
+        hits: {
+            type: 'integer',
+            title: 'Hits'
+        },
+        misses: {
+            type: 'integer',
+            title: 'Misses'
+        },
+        hit_ratio: {
+            type: 'number',
+            title: 'Hit Ratio'
+        }
+    },
+    type: 'object',
+    required: ['backend', 'hits', 'misses', 'hit_ratio'],
+    title: 'ResponseCacheStats'
+} as const;
+
 export const TokenSchema = {
     properties: {
         access_token: {
@@ -512,8 +670,26 @@ export const UsersPublicSchema = {
             title: 'Data'
         },
         count: {
-            type: 'integer',
+            anyOf: [
+                {
+                    type: 'integer'
+                },
+                {
+                    type: 'null'
+                }
+            ],
             title: 'Count'
+        },
+        next_cursor: {
+            anyOf: [
+                {
+                    type: 'string'
+                },
+                {
+                    type: 'null'
+                }
+            ],
+            title: 'Next Cursor'
         }
     },
     type: 'object',
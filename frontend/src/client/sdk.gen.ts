@@ -3,15 +3,18 @@
 import type { CancelablePromise } from './core/CancelablePromise';
 import { OpenAPI } from './core/OpenAPI';
 import { request as __request } from './core/request';
-import type { ItemsReadItemsData, ItemsReadItemsResponse, ItemsCreateItemData, ItemsCreateItemResponse, ItemsReadItemData, ItemsReadItemResponse, ItemsUpdateItemData, ItemsUpdateItemResponse, ItemsDeleteItemData, ItemsDeleteItemResponse, LoginLoginAccessTokenData, LoginLoginAccessTokenResponse, LoginTestTokenResponse, LoginRecoverPasswordData, LoginRecoverPasswordResponse, LoginResetPasswordData, LoginResetPasswordResponse, LoginRecoverPasswordHtmlContentData, LoginRecoverPasswordHtmlContentResponse, PrivateCreateUserData, PrivateCreateUserResponse, UsersReadUsersData, UsersReadUsersResponse, UsersCreateUserData, UsersCreateUserResponse, UsersReadUserMeResponse, UsersDeleteUserMeResponse, UsersUpdateUserMeData, UsersUpdateUserMeResponse, UsersUpdatePasswordMeData, UsersUpdatePasswordMeResponse, UsersRegisterUserData, UsersRegisterUserResponse, UsersReadUserByIdData, UsersReadUserByIdResponse, UsersUpdateUserData, UsersUpdateUserResponse, UsersDeleteUserData, UsersDeleteUserResponse, UtilsTestEmailData, UtilsTestEmailResponse, UtilsHealthCheckResponse } from './types.gen';
+import type { ItemsReadItemsData, ItemsReadItemsResponse, ItemsCreateItemData, ItemsCreateItemResponse, ItemsUpdateItemsData, ItemsUpdateItemsResponse, ItemsCreateItemsData, ItemsCreateItemsResponse, ItemsDeleteItemsData, ItemsDeleteItemsResponse, ItemsExportItemsData, ItemsExportItemsResponse, ItemsSearchItemsData, ItemsSearchItemsResponse, ItemsReadItemData, ItemsReadItemResponse, ItemsUpdateItemData, ItemsUpdateItemResponse, ItemsDeleteItemData, ItemsDeleteItemResponse, LoginLoginAccessTokenData, LoginLoginAccessTokenResponse, LoginTestTokenResponse, LoginRecoverPasswordData, LoginRecoverPasswordResponse, LoginResetPasswordData, LoginResetPasswordResponse, LoginRecoverPasswordHtmlContentData, LoginRecoverPasswordHtmlContentResponse, PrivateCreateUserData, PrivateCreateUserResponse, UsersReadUsersData, UsersReadUsersResponse, UsersCreateUserData, UsersCreateUserResponse, UsersUpdateUserMeData, UsersUpdateUserMeResponse, UsersReadUserMeData, UsersReadUserMeResponse, UsersDeleteUserMeResponse, UsersUpdatePasswordMeData, UsersUpdatePasswordMeResponse, UsersRegisterUserData, UsersRegisterUserResponse, UsersReadUserByIdData, UsersReadUserByIdResponse, UsersUpdateUserData, UsersUpdateUserResponse, UsersDeleteUserData, UsersDeleteUserResponse, UtilsTestEmailData, UtilsTestEmailResponse, UtilsDbPoolResponse, UtilsItemsCacheStatsResponse, UtilsHealthCheckResponse } from './types.gen';
 
 export class ItemsService {
     /**
      * Read Items
-     * Retrieve items.
+     * Retrieve items, pass the returned next_cursor as cursor to get the next page.
      * @param data The data for the request.
      * @param data.skip
      * @param data.limit
+     * @param data.cursor
+     * @param data.count
+     * @param data.ifNoneMatch
      * @returns ItemsPublic Successful Response
      * @throws ApiError
      */
@@ -19,11 +22,17 @@ export class ItemsService {
         return __request(OpenAPI, {
             method: 'GET',
             url: '/api/v1/items/',
+            headers: {
+                'if-none-match': data.ifNoneMatch
+            },
             query: {
                 skip: data.skip,
-                limit: data.limit
+                limit: data.limit,
+                cursor: data.cursor,
+                count: data.count
             },
             errors: {
+                304: 'Not Modified',
                 422: 'Validation Error'
             }
         });
@@ -49,11 +58,119 @@ export class ItemsService {
         });
     }
     
+    /**
+     * Update Items
+     * Update items by ID in a single transaction, with a result for each item.
+     * @param data The data for the request.
+     * @param data.requestBody
+     * @returns ItemsBulkResults Successful Response
+     * @throws ApiError
+     */
+    public static updateItems(data: ItemsUpdateItemsData): CancelablePromise<ItemsUpdateItemsResponse> {
+        return __request(OpenAPI, {
+            method: 'PUT',
+            url: '/api/v1/items/bulk',
+            body: data.requestBody,
+            mediaType: 'application/json',
+            errors: {
+                422: 'Validation Error'
+            }
+        });
+    }
+    
+    /**
+     * Create Items
+     * Create new items in a single transaction.
+     * @param data The data for the request.
+     * @param data.requestBody
+     * @returns ItemsBulkResults Successful Response
+     * @throws ApiError
+     */
+    public static createItems(data: ItemsCreateItemsData): CancelablePromise<ItemsCreateItemsResponse> {
+        return __request(OpenAPI, {
+            method: 'POST',
+            url: '/api/v1/items/bulk',
+            body: data.requestBody,
+            mediaType: 'application/json',
+            errors: {
+                422: 'Validation Error'
+            }
+        });
+    }
+    
+    /**
+     * Delete Items
+     * Delete items by ID in a single transaction, with a result for each item.
+     * @param data The data for the request.
+     * @param data.requestBody
+     * @returns ItemsBulkResults Successful Response
+     * @throws ApiError
+     */
+    public static deleteItems(data: ItemsDeleteItemsData): CancelablePromise<ItemsDeleteItemsResponse> {
+        return __request(OpenAPI, {
+            method: 'DELETE',
+            url: '/api/v1/items/bulk',
+            body: data.requestBody,
+            mediaType: 'application/json',
+            errors: {
+                422: 'Validation Error'
+            }
+        });
+    }
+    
+    /**
+     * Export Items
+     * Download all visible items as NDJSON or CSV, streamed in creation order.
+     * @param data The data for the request.
+     * @param data.format
+     * @returns unknown Successful Response
+     * @throws ApiError
+     */
+    public static exportItems(data: ItemsExportItemsData = {}): CancelablePromise<ItemsExportItemsResponse> {
+        return __request(OpenAPI, {
+            method: 'GET',
+            url: '/api/v1/items/export',
+            query: {
+                format: data.format
+            },
+            errors: {
+                422: 'Validation Error'
+            }
+        });
+    }
+    
+    /**
+     * Search Items
+     * Search items by title and description, best matches first. The count is
+     * always null, pass next_cursor as cursor to get the next page.
+     * @param data The data for the request.
+     * @param data.q
+     * @param data.limit
+     * @param data.cursor
+     * @returns ItemsPublic Successful Response
+     * @throws ApiError
+     */
+    public static searchItems(data: ItemsSearchItemsData): CancelablePromise<ItemsSearchItemsResponse> {
+        return __request(OpenAPI, {
+            method: 'GET',
+            url: '/api/v1/items/search',
+            query: {
+                q: data.q,
+                limit: data.limit,
+                cursor: data.cursor
+            },
+            errors: {
+                422: 'Validation Error'
+            }
+        });
+    }
+    
     /**
      * Read Item
      * Get item by ID.
      * @param data The data for the request.
      * @param data.id
+     * @param data.ifNoneMatch
      * @returns ItemPublic Successful Response
      * @throws ApiError
      */
@@ -64,7 +181,11 @@ export class ItemsService {
             path: {
                 id: data.id
             },
+            headers: {
+                'if-none-match': data.ifNoneMatch
+            },
             errors: {
+                304: 'Not Modified',
                 422: 'Validation Error'
             }
         });
@@ -72,9 +193,11 @@ export class ItemsService {
     
     /**
      * Update Item
-     * Update an item.
+     * Update an item. With If-Match, only if it's still at one of the given
+     * ETags, otherwise fails with 412.
      * @param data The data for the request.
      * @param data.id
+     * @param data.ifMatch
      * @param data.requestBody
      * @returns ItemPublic Successful Response
      * @throws ApiError
@@ -86,6 +209,9 @@ export class ItemsService {
             path: {
                 id: data.id
             },
+            headers: {
+                'if-match': data.ifMatch
+            },
             body: data.requestBody,
             mediaType: 'application/json',
             errors: {
@@ -238,10 +364,12 @@ export class PrivateService {
 export class UsersService {
     /**
      * Read Users
-     * Retrieve users.
+     * Retrieve users, pass the returned next_cursor as cursor to get the next page.
      * @param data The data for the request.
      * @param data.skip
      * @param data.limit
+     * @param data.cursor
+     * @param data.count
      * @returns UsersPublic Successful Response
      * @throws ApiError
      */
@@ -251,7 +379,9 @@ export class UsersService {
             url: '/api/v1/users/',
             query: {
                 skip: data.skip,
-                limit: data.limit
+                limit: data.limit,
+                cursor: data.cursor,
+                count: data.count
             },
             errors: {
                 422: 'Validation Error'
@@ -279,16 +409,45 @@ export class UsersService {
         });
     }
     
+    /**
+     * Update User Me
+     * Update own user.
+     * @param data The data for the request.
+     * @param data.requestBody
+     * @returns UserPublic Successful Response
+     * @throws ApiError
+     */
+    public static updateUserMe(data: UsersUpdateUserMeData): CancelablePromise<UsersUpdateUserMeResponse> {
+        return __request(OpenAPI, {
+            method: 'PATCH',
+            url: '/api/v1/users/me',
+            body: data.requestBody,
+            mediaType: 'application/json',
+            errors: {
+                422: 'Validation Error'
+            }
+        });
+    }
+    
     /**
      * Read User Me
      * Get current user.
+     * @param data The data for the request.
+     * @param data.ifNoneMatch
      * @returns UserPublic Successful Response
      * @throws ApiError
      */
-    public static readUserMe(): CancelablePromise<UsersReadUserMeResponse> {
+    public static readUserMe(data: UsersReadUserMeData = {}): CancelablePromise<UsersReadUserMeResponse> {
         return __request(OpenAPI, {
             method: 'GET',
-            url: '/api/v1/users/me'
+            url: '/api/v1/users/me',
+            headers: {
+                'if-none-match': data.ifNoneMatch
+            },
+            errors: {
+                304: 'Not Modified',
+                422: 'Validation Error'
+            }
         });
     }
     
@@ -305,26 +464,6 @@ export class UsersService {
         });
     }
     
-    /**
-     * Update User Me
-     * Update own user.
-     * @param data The data for the request.
-     * @param data.requestBody
-     * @returns UserPublic Successful Response
-     * @throws ApiError
-     */
-    public static updateUserMe(data: UsersUpdateUserMeData): CancelablePromise<UsersUpdateUserMeResponse> {
-        return __request(OpenAPI, {
-            method: 'PATCH',
-            url: '/api/v1/users/me',
-            body: data.requestBody,
-            mediaType: 'application/json',
-            errors: {
-                422: 'Validation Error'
-            }
-        });
-    }
-    
     /**
      * Update Password Me
      * Update own password.
@@ -454,6 +593,32 @@ export class UtilsService {
         });
     }
     
+    /**
+     * Db Pool
+     * Connection pool usage of this worker, for the sync and async engines.
+     * @returns unknown Successful Response
+     * @throws ApiError
+     */
+    public static dbPool(): CancelablePromise<UtilsDbPoolResponse> {
+        return __request(OpenAPI, {
+            method: 'GET',
+            url: '/api/v1/utils/db-pool/'
+        });
+    }
+    
+    /**
+     * Items Cache Stats
+     * Lookups of the GET /items/ cache made by this worker.
+     * @returns ResponseCacheStats Successful Response
+     * @throws ApiError
+     */
+    public static itemsCacheStats(): CancelablePromise<UtilsItemsCacheStatsResponse> {
+        return __request(OpenAPI, {
+            method: 'GET',
+            url: '/api/v1/utils/items-cache/'
+        });
+    }
+    
     /**
      * Health Check
      * @returns boolean Successful Response
@@ -9,10 +9,32 @@ export type Body_login_login_access_token = {
     client_secret?: (string | null);
 };
 
+export type DatabasePoolStats = {
+    size: number;
+    checked_out: number;
+    overflow: number;
+    checkouts: number;
+    timeouts: number;
+    wait_seconds: number;
+    max_wait_seconds: number;
+};
+
 export type HTTPValidationError = {
     detail?: Array<ValidationError>;
 };
 
+export type ItemBulkResult = {
+    id: string;
+    status: number;
+    item?: (ItemPublic | null);
+};
+
+export type ItemBulkUpdate = {
+    title?: (string | null);
+    description?: (string | null);
+    id: string;
+};
+
 export type ItemCreate = {
     title: string;
     description?: (string | null);
@@ -26,9 +48,14 @@ export type ItemPublic = {
     created_at?: (string | null);
 };
 
+export type ItemsBulkResults = {
+    data: Array<ItemBulkResult>;
+};
+
 export type ItemsPublic = {
     data: Array<ItemPublic>;
-    count: number;
+    count: (number | null);
+    next_cursor?: (string | null);
 };
 
 export type ItemUpdate = {
@@ -52,6 +79,13 @@ export type PrivateUserCreate = {
     is_verified?: boolean;
 };
 
+export type ResponseCacheStats = {
+    backend: string;
+    hits: number;
+    misses: number;
+    hit_ratio: number;
+};
+
 export type Token = {
     access_token: string;
     token_type?: string;
@@ -87,7 +121,8 @@ export type UserRegister = {
 
 export type UsersPublic = {
     data: Array<UserPublic>;
-    count: number;
+    count: (number | null);
+    next_cursor?: (string | null);
 };
 
 export type UserUpdate = {
@@ -114,6 +149,9 @@ export type ValidationError = {
 };
 
 export type ItemsReadItemsData = {
+    count?: ('exact' | 'estimated' | 'none' | null);
+    cursor?: (string | null);
+    ifNoneMatch?: (string | null);
     limit?: number;
     skip?: number;
 };
@@ -126,14 +164,48 @@ export type ItemsCreateItemData = {
 
 export type ItemsCreateItemResponse = (ItemPublic);
 
+export type ItemsUpdateItemsData = {
+    requestBody: Array<ItemBulkUpdate>;
+};
+
+export type ItemsUpdateItemsResponse = (ItemsBulkResults);
+
+export type ItemsCreateItemsData = {
+    requestBody: Array<ItemCreate>;
+};
+
+export type ItemsCreateItemsResponse = (ItemsBulkResults);
+
+export type ItemsDeleteItemsData = {
+    requestBody: Array<(string)>;
+};
+
+export type ItemsDeleteItemsResponse = (ItemsBulkResults);
+
+export type ItemsExportItemsData = {
+    format?: 'ndjson' | 'csv';
+};
+
+export type ItemsExportItemsResponse = (unknown);
+
+export type ItemsSearchItemsData = {
+    cursor?: (string | null);
+    limit?: number;
+    q: string;
+};
+
+export type ItemsSearchItemsResponse = (ItemsPublic);
+
 export type ItemsReadItemData = {
     id: string;
+    ifNoneMatch?: (string | null);
 };
 
 export type ItemsReadItemResponse = (ItemPublic);
 
 export type ItemsUpdateItemData = {
     id: string;
+    ifMatch?: (string | null);
     requestBody: ItemUpdate;
 };
 
@@ -178,6 +250,8 @@ export type PrivateCreateUserData = {
 export type PrivateCreateUserResponse = (UserPublic);
 
 export type UsersReadUsersData = {
+    count?: ('exact' | 'estimated' | 'none' | null);
+    cursor?: (string | null);
     limit?: number;
     skip?: number;
 };
@@ -190,16 +264,20 @@ export type UsersCreateUserData = {
 
 export type UsersCreateUserResponse = (UserPublic);
 
-export type UsersReadUserMeResponse = (UserPublic);
-
-export type UsersDeleteUserMeResponse = (Message);
-
 export type UsersUpdateUserMeData = {
     requestBody: UserUpdateMe;
 };
 
 export type UsersUpdateUserMeResponse = (UserPublic);
 
+export type UsersReadUserMeData = {
+    ifNoneMatch?: (string | null);
+};
+
+export type UsersReadUserMeResponse = (UserPublic);
+
+export type UsersDeleteUserMeResponse = (Message);
+
 export type UsersUpdatePasswordMeData = {
     requestBody: UpdatePassword;
 };
@@ -237,4 +315,10 @@ export type UtilsTestEmailData = {
 
 export type UtilsTestEmailResponse = (Message);
 
+export type UtilsDbPoolResponse = ({
+    [key: string]: DatabasePoolStats;
+});
+
+export type UtilsItemsCacheStatsResponse = (ResponseCacheStats);
+
 export type UtilsHealthCheckResponse = (boolean);
\ No newline at end of file
@@ -11,7 +11,8 @@ import useAuth from "@/hooks/useAuth"
 
 function getUsersQueryOptions() {
   return {
-    queryFn: () => UsersService.readUsers({ skip: 0, limit: 100 }),
+    // The table pages through the rows itself, the total count isn't needed
+    queryFn: () => UsersService.readUsers({ limit: 100, count: "none" }),
     queryKey: ["users"],
   }
 }
@@ -11,7 +11,8 @@ import PendingItems from "@/components/Pending/PendingItems"
 
 function getItemsQueryOptions() {
   return {
-    queryFn: () => ItemsService.readItems({ skip: 0, limit: 100 }),
+    // The table pages through the rows itself, the total count isn't needed
+    queryFn: () => ItemsService.readItems({ limit: 100, count: "none" }),
     queryKey: ["items"],
   }
 }